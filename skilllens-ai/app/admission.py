@@ -0,0 +1,188 @@
+"""
+Admission control for the CPU-heavy endpoints
+
+At most ADMISSION_CONCURRENCY requests run analysis work at a time; up to
+ADMISSION_QUEUE more wait, first come first served. Anything beyond that is
+refused straight away with 503 and a Retry-After estimate, so under a burst
+the requests that are accepted still finish in bounded time instead of
+everyone slowing down until the client timeout fires.
+
+Every request has a deadline: REQUEST_DEADLINE_SECONDS after it arrived, or
+sooner if the client sends X-Request-Timeout (seconds). A request still
+waiting when its deadline passes, or whose deadline has passed by the time
+it gets a slot, is dropped before any work starts: the client has given up
+on it already.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Optional
+
+from app.executor import EXECUTOR_WORKERS
+from app.metrics import (
+    ADMISSION_ACTIVE,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    ADMISSION_WAIT_SECONDS,
+    current_request,
+)
+
+# Requests doing analysis work at once (0 disables admission control).
+# Defaults to twice the executor workers, so the next request's upload and
+# parsing overlap with the current analyses.
+ADMISSION_CONCURRENCY = int(os.environ.get(
+    "SKILLLENS_ADMISSION_CONCURRENCY", str(2 * EXECUTOR_WORKERS)
+))
+
+# Requests allowed to wait for a slot
+ADMISSION_QUEUE = int(os.environ.get("SKILLLENS_ADMISSION_QUEUE", "64"))
+
+# Longest time a request may wait for a slot
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("SKILLLENS_ADMISSION_QUEUE_TIMEOUT", "10"))
+
+# Deadline of requests that don't send X-Request-Timeout, matching the
+# backend's 30 s HTTP timeout
+REQUEST_DEADLINE_SECONDS = float(os.environ.get("SKILLLENS_REQUEST_DEADLINE", "30"))
+
+# Weight of the latest request in the average service time
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class Overloaded(Exception):
+    """A request was not admitted; retry_after is a hint in seconds"""
+
+    def __init__(self, reason: str, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.reason = reason
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Concurrency limit with a bounded FIFO wait queue
+
+    Runs on the event loop of one API process; each process has its own.
+    """
+
+    def __init__(self, concurrency: int = ADMISSION_CONCURRENCY, queue_size: int = ADMISSION_QUEUE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.service_seconds = 1.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.concurrency > 0
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue is likely to have drained"""
+        backlog = len(self.waiters) + 1
+        return max(1, math.ceil(backlog * self.service_seconds / max(self.concurrency, 1)))
+
+    def _update_gauges(self) -> None:
+        ADMISSION_ACTIVE.set(self.active)
+        ADMISSION_QUEUE_DEPTH.set(len(self.waiters))
+
+    def _reject(self, reason: str, detail: str) -> Overloaded:
+        ADMISSION_REJECTED.inc(reason=reason)
+        return Overloaded(reason, detail, self.retry_after())
+
+    async def acquire(self, deadline: float) -> None:
+        """
+        Wait for a slot
+
+        Args:
+            deadline: time.perf_counter() value after which the request is
+                no longer worth starting
+
+        Raises:
+            Overloaded: If the queue is full or the deadline passes first
+        """
+        if deadline <= time.perf_counter():
+            raise self._reject("deadline", "Request deadline passed before analysis started")
+
+        if self.active < self.concurrency and not self.waiters:
+            self.active += 1
+            self._update_gauges()
+            return
+
+        if len(self.waiters) >= self.queue_size:
+            raise self._reject("queue_full", "Server is busy, retry later")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self._update_gauges()
+        timeout = min(self.queue_timeout, deadline - time.perf_counter())
+        try:
+            await asyncio.wait_for(waiter, max(timeout, 0))
+        except asyncio.TimeoutError:
+            if deadline <= time.perf_counter():
+                raise self._reject("deadline", "Request deadline passed before analysis started")
+            raise self._reject("queue_timeout", "Server is busy, retry later")
+        except asyncio.CancelledError:
+            # The client went away; pass on a slot that was already handed over
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+            self._update_gauges()
+
+        if deadline <= time.perf_counter():
+            self.release()
+            raise self._reject("deadline", "Request deadline passed before analysis started")
+
+    def release(self, service_seconds: Optional[float] = None) -> None:
+        """Free a slot, handing it to the oldest waiting request"""
+        if service_seconds is not None:
+            self.service_seconds += SERVICE_TIME_SMOOTHING * (service_seconds - self.service_seconds)
+
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+        self.active -= 1
+        self._update_gauges()
+
+    @asynccontextmanager
+    async def admit(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of the block
+
+        Args:
+            timeout: Client's time budget in seconds, counted from when the
+                request arrived; capped at REQUEST_DEADLINE_SECONDS
+        """
+        if not self.enabled:
+            yield
+            return
+
+        request = current_request.get()
+        arrived = request.started if request is not None else time.perf_counter()
+        budget = REQUEST_DEADLINE_SECONDS if timeout is None else min(timeout, REQUEST_DEADLINE_SECONDS)
+
+        waiting = time.perf_counter()
+        await self.acquire(arrived + budget)
+        started = time.perf_counter()
+        ADMISSION_WAIT_SECONDS.observe(started - waiting)
+        if request is not None:
+            request.add_stage("admission_wait", started - waiting)
+
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+
+limiter = AdmissionLimiter()
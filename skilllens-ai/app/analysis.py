@@ -0,0 +1,172 @@
+from typing import Dict, List, Optional
+
+from app import metrics
+from app.document import Document
+from app.errors import AnalysisError
+from app.jobs import decode_vector
+from app.parsers import extract_text_from_docx, extract_text_from_pdf
+from app.skill_extractor import extract_document_skills
+from app.matcher import calculate_match, document_similarity, text_similarity
+from app.recommender import get_recommendations
+
+
+def extract_resume_text(filename: str, file_bytes: bytes) -> str:
+    """
+    Extract and validate the text of an uploaded resume
+
+    Args:
+        filename: Original file name, used to pick the parser
+        file_bytes: Raw file contents
+
+    Returns:
+        Extracted resume text
+    """
+    if filename.endswith('.pdf'):
+        resume_text = extract_text_from_pdf(file_bytes)
+    else:
+        resume_text = extract_text_from_docx(file_bytes)
+
+    if len(resume_text.strip()) < 50:
+        raise AnalysisError(
+            400, "Resume text is too short or could not be extracted properly"
+        )
+
+    return resume_text
+
+
+def analyze_resume_text(resume_text: str, job_description: str,
+                        job_skills: Optional[List[str]] = None,
+                        job_vector=None,
+                        resume_skills: Optional[List[str]] = None) -> Dict:
+    """
+    Run skill extraction, matching and recommendations on resume text
+
+    Args:
+        resume_text: Extracted resume text
+        job_description: Text of the job posting
+        job_skills: Skills already extracted from job_description, if known
+        job_vector: job_description transformed with vectorize_text, if known
+        resume_skills: Skills already extracted from resume_text, if known
+
+    Returns:
+        Analysis payload as returned in the "data" field of /analyze
+    """
+    return analyze_documents(
+        Document(resume_text, resume_skills), Document(job_description, job_skills), job_vector
+    )
+
+
+def analyze_documents(resume: Document, job: Document, job_vector=None) -> Dict:
+    """
+    Run skill extraction, matching and recommendations on a resume and a job
+
+    Each document is lowercased, tokenized and vectorized once, and only
+    if a stage needs it; a resume analyzed against several jobs reuses its
+    skills and vector.
+
+    Args:
+        resume: Resume document
+        job: Job description document
+        job_vector: job transformed with vectorize_text, if known
+
+    Returns:
+        Analysis payload as returned in the "data" field of /analyze
+    """
+    # Extract skills from both documents, unless already known
+    resume_skills, job_skills = extract_document_skills([resume, job])
+
+    # Calculate matching
+    with metrics.stage("matching"):
+        match_result = calculate_match(resume_skills, job_skills)
+    with metrics.stage("similarity"):
+        similarity_score = document_similarity(resume, job, job_vector)
+
+    # Get learning recommendations for missing skills
+    with metrics.stage("recommendations"):
+        recommendations = get_recommendations(match_result["missing_skills"])
+
+    return assemble_analysis(
+        resume_skills, job_skills, match_result, similarity_score, recommendations
+    )
+
+
+def job_similarity(resume_text: str, job_description: str, job: Optional[Dict] = None) -> float:
+    """
+    text_similarity against a job description, using a registered job's
+    stored vector when it was made with the current model
+    """
+    with metrics.stage("similarity"):
+        job_vector = decode_vector(job) if job is not None else None
+        return text_similarity(resume_text, job_description, job_vector)
+
+
+def assemble_analysis(resume_skills: List[str], job_skills: List[str], match_result: Dict,
+                      similarity_score: float, recommendations: List[Dict]) -> Dict:
+    """Combine the output of each stage into the payload of /analyze"""
+    return {
+        "resume_skills": resume_skills,
+        "job_skills": job_skills,
+        "matched_skills": match_result["matched_skills"],
+        "missing_skills": match_result["missing_skills"],
+        "match_percentage": match_result["match_percentage"],
+        "similarity_score": similarity_score,
+        "recommendations": recommendations,
+        "analysis_summary": {
+            "total_job_skills": len(job_skills),
+            "total_resume_skills": len(resume_skills),
+            "matched_count": len(match_result["matched_skills"]),
+            "missing_count": len(match_result["missing_skills"])
+        }
+    }
+
+
+def analyze_resume_for_job(resume_text: str, job: Dict,
+                           resume_skills: Optional[List[str]] = None) -> Dict:
+    """
+    Analyze resume text against a registered job posting
+
+    The job's stored skills and TF-IDF vector are used as they are, so only
+    the resume is processed.
+
+    Args:
+        resume_text: Extracted resume text
+        job: Registered job as returned by app.store.get_job
+        resume_skills: Skills already extracted from resume_text, if known
+    """
+    return analyze_resume_text(
+        resume_text, job["text"], job["skills"], decode_vector(job), resume_skills
+    )
+
+
+def analyze_resume_file(filename: str, file_bytes: bytes, job_description: str,
+                        job_skills: Optional[List[str]] = None,
+                        job_vector=None) -> Dict:
+    """
+    Full resume analysis: parse the uploaded file, then analyze its text
+
+    Runs entirely on CPU, so the API calls it through app.executor.
+    """
+    resume_text = extract_resume_text(filename, file_bytes)
+    return analyze_resume_text(resume_text, job_description, job_skills, job_vector)
+
+
+def analyze_batch_item(filename: str, file_bytes: bytes, job_description: str,
+                       job_skills: List[str], job_vector=None) -> Dict:
+    """
+    Analyze one resume of a batch against a pre-processed job description
+
+    Failures are reported in the result instead of raised, so one bad file
+    doesn't fail the whole batch.
+
+    Returns:
+        Dictionary with filename, success flag and either data or error
+    """
+    try:
+        data = analyze_resume_file(
+            filename, file_bytes, job_description, job_skills, job_vector
+        )
+        return {"filename": filename, "success": True, "data": data}
+    except AnalysisError as e:
+        return {"filename": filename, "success": False, "error": e.detail}
+    except Exception as e:
+        return {"filename": filename, "success": False, "error": f"Analysis failed: {str(e)}"}
@@ -0,0 +1,726 @@
+"""
+Skill bitmap index for boolean candidate search
+
+Every analyzed resume is stored as a packed bitset over the taxonomy's
+skills (bit i set if the resume has the skill with dense id i, see
+SkillIndex.skill_ids), so a resume costs one bit per skill plus its 32 byte
+hash. Next to the rows the file keeps the inverted index: for each skill, a
+bitset over all resumes, packed into 64-bit words. Queries combine those
+with bitwise AND / OR / NOT, and a match-percentage threshold is evaluated
+with bit-sliced counters, so nothing is decoded per resume until the
+results are picked.
+
+    python AND (kubernetes OR docker) AND NOT java
+
+The index is one uncompressed file that every worker memory-maps, so all
+workers share a single copy through the page cache. The file has room for
+more resumes than it holds: new resumes are written into the free space
+in place, and only when it is full is the file rewritten, with twice the
+room, so adding a resume costs amortized O(1). Rebuild it from the
+document store with:
+
+    python -m app.bitmap build
+"""
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from app import metrics, store
+from app.corpus import CorpusRow, stored_rows, write_lock
+from app.errors import AnalysisError
+from app.taxonomy import get_taxonomy, taxonomy_version
+
+# Index file shared by every worker; set to an empty string to disable
+BITMAP_PATH = os.environ.get(
+    "SKILLLENS_SKILL_BITMAP",
+    str(Path(__file__).resolve().parent.parent / "models" / "skills.bitmap")
+)
+
+MAX_RESULTS = 1000
+
+# Words of the inverted index rebuilt at a time (64 resumes per word)
+POSTINGS_CHUNK_WORDS = 1024
+
+_MAGIC = b"SKLBMAP2"
+_ALIGN = 64
+
+# Number of resumes in the file, updated in place after the magic
+_COUNT_OFFSET = len(_MAGIC)
+_HEADER_START = _COUNT_OFFSET + 16
+
+# numpy is imported on first use to keep startup fast
+if TYPE_CHECKING:
+    import numpy as np
+
+# Parsed query: ("skill", name), ("not", node), ("and", [nodes]) or ("or", [nodes])
+QueryNode = Tuple
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+_OPERATORS = {"and", "or", "not"}
+
+
+def bitmap_enabled() -> bool:
+    return bool(BITMAP_PATH)
+
+
+def parse_query(query: str) -> QueryNode:
+    """
+    Parse a boolean skill expression
+
+    Operators are AND, OR and NOT (any case) with the usual precedence, and
+    parentheses. Consecutive words form one skill name ("machine learning");
+    quote a name to be explicit. Names and aliases are canonicalized with
+    the taxonomy.
+
+    Raises:
+        ValueError: If the expression is malformed or names an unknown skill
+    """
+    index = get_taxonomy()
+    tokens: List[Tuple[str, str]] = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+        if match is None:
+            raise ValueError(f"Unbalanced quote at position {position}")
+        position = match.end()
+        opening, closing, quoted, word = match.groups()
+        if opening or closing:
+            tokens.append((opening or closing, ""))
+        elif quoted is not None:
+            tokens.append(("skill", quoted))
+        elif word.lower() in _OPERATORS:
+            tokens.append((word.lower(), ""))
+        elif tokens and tokens[-1][0] == "word":
+            # Continue a multi-word skill name
+            tokens[-1] = ("word", tokens[-1][1] + " " + word)
+        else:
+            tokens.append(("word", word))
+
+    def skill(name: str) -> QueryNode:
+        canonical = index.canonicalize(name)
+        if canonical is None:
+            raise ValueError(f"Unknown skill: {name}")
+        return ("skill", canonical)
+
+    def expression(i: int) -> Tuple[QueryNode, int]:
+        terms = []
+        node, i = conjunction(i)
+        terms.append(node)
+        while i < len(tokens) and tokens[i][0] == "or":
+            node, i = conjunction(i + 1)
+            terms.append(node)
+        return (terms[0] if len(terms) == 1 else ("or", terms)), i
+
+    def conjunction(i: int) -> Tuple[QueryNode, int]:
+        terms = []
+        node, i = factor(i)
+        terms.append(node)
+        while i < len(tokens) and tokens[i][0] == "and":
+            node, i = factor(i + 1)
+            terms.append(node)
+        return (terms[0] if len(terms) == 1 else ("and", terms)), i
+
+    def factor(i: int) -> Tuple[QueryNode, int]:
+        if i >= len(tokens):
+            raise ValueError("Query ends unexpectedly")
+        kind, value = tokens[i]
+        if kind == "not":
+            node, i = factor(i + 1)
+            return ("not", node), i
+        if kind == "(":
+            node, i = expression(i + 1)
+            if i >= len(tokens) or tokens[i][0] != ")":
+                raise ValueError("Missing closing parenthesis")
+            return node, i + 1
+        if kind in ("skill", "word"):
+            return skill(value), i + 1
+        raise ValueError(f"Unexpected {kind.upper()!r}")
+
+    if not tokens:
+        raise ValueError("Empty query")
+    node, i = expression(0)
+    if i != len(tokens):
+        raise ValueError(f"Unexpected {tokens[i][0].upper()!r} after a complete expression")
+    return node
+
+
+def _popcount(words: "np.ndarray") -> int:
+    import numpy as np
+
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return int(table[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+def _row_numbers(words: "np.ndarray", limit: Optional[int] = None) -> "np.ndarray":
+    """Positions of the set bits of a bitset, ascending"""
+    import numpy as np
+
+    nonzero = np.flatnonzero(words)
+    if limit is not None:
+        # Each word holds at least one row, so this many words are enough
+        nonzero = nonzero[:limit]
+    bits = np.unpackbits(words[nonzero].view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    word, bit = np.nonzero(bits)
+    rows = nonzero[word].astype(np.int64) * 64 + bit
+    return rows[:limit] if limit is not None else rows
+
+
+class SkillBitmap:
+    """
+    Read-only, memory-mapped form of the bitmap file
+
+    rows[r] is the packed skill bitset of resume r (bit i for skill id i),
+    postings[i] the packed bitset of the resumes having skill i. Column
+    order is the skill_names the file was built with, so a file built under
+    an older taxonomy still answers queries consistently until it is rebuilt.
+    Only the first count resumes of the file's arrays are used.
+    """
+
+    def __init__(self, arrays: Dict):
+        import numpy as np
+
+        count = arrays["count"]
+        self.ids = np.asarray(arrays["ids"][:count])
+        self.rows = np.asarray(arrays["rows"][:count])
+        self.postings = np.asarray(arrays["postings"][:, :-(-count // 64)])
+        self.taxonomy_version = arrays["taxonomy_version"]
+        self.skill_names: List[str] = arrays["skill_names"]
+        self.skill_ids = {name: i for i, name in enumerate(self.skill_names)}
+
+        # Bits past the last resume must stay clear under NOT
+        words = self.postings.shape[1]
+        self.all_rows = np.full(words, np.iinfo(np.uint64).max, dtype=np.uint64)
+        if self.size % 64:
+            self.all_rows[-1] = np.uint64((1 << (self.size % 64)) - 1)
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def posting(self, skill: str) -> "np.ndarray":
+        import numpy as np
+
+        column = self.skill_ids.get(skill)
+        if column is None:
+            # In the taxonomy, but not when the index was built
+            return np.zeros_like(self.all_rows)
+        return self.postings[column]
+
+    def evaluate(self, node: QueryNode) -> "np.ndarray":
+        """Bitset of the resumes matching a parsed query"""
+        kind = node[0]
+        if kind == "skill":
+            return self.posting(node[1])
+        if kind == "not":
+            return ~self.evaluate(node[1]) & self.all_rows
+        result = self.evaluate(node[1][0]).copy()
+        for child in node[1][1:]:
+            if kind == "and":
+                result &= self.evaluate(child)
+            else:
+                result |= self.evaluate(child)
+        return result
+
+    def skill_counts(self, skills: List[str]) -> List["np.ndarray"]:
+        """
+        Number of the given skills each resume has, as bit-sliced counters
+
+        Returns:
+            Bitsets holding bit j of every resume's count, least significant first
+        """
+        import numpy as np
+
+        planes = [np.zeros_like(self.all_rows) for _ in range(len(skills).bit_length())]
+        for skill in skills:
+            carry = self.posting(skill)
+            for j, plane in enumerate(planes):
+                planes[j], carry = plane ^ carry, plane & carry
+        return planes
+
+    def count_equals(self, planes: List["np.ndarray"], value: int) -> "np.ndarray":
+        """Bitset of the resumes whose counter equals value"""
+        result = self.all_rows.copy()
+        for j, plane in enumerate(planes):
+            result &= plane if value >> j & 1 else ~plane
+        return result
+
+    def count_at_least(self, planes: List["np.ndarray"], value: int) -> "np.ndarray":
+        """Bitset of the resumes whose counter is at least value"""
+        import numpy as np
+
+        greater = np.zeros_like(self.all_rows)
+        equal = self.all_rows.copy()
+        for j in reversed(range(len(planes))):
+            if value >> j & 1:
+                equal &= planes[j]
+            else:
+                greater |= equal & planes[j]
+                equal &= ~planes[j]
+        return greater | equal
+
+    def resume(self, row: int) -> Tuple[str, List[str]]:
+        """SHA-256 and skills of one resume"""
+        import numpy as np
+
+        flags = np.unpackbits(self.rows[row], count=len(self.skill_names), bitorder="little")
+        skills = [self.skill_names[i] for i in np.flatnonzero(flags)]
+        return bytes(self.ids[row]).ljust(32, b"\0").hex(), skills
+
+    def search(self, query: Optional[QueryNode] = None, match_skills: Optional[List[str]] = None,
+               min_match: float = 0.0, limit: int = 100) -> Dict:
+        """
+        Find the resumes matching a query and a match-percentage threshold
+
+        Args:
+            query: Parsed boolean expression, or None for every resume
+            match_skills: Skills to compute the match percentage on (as in
+                calculate_match, the share of these the resume has)
+            min_match: Lowest match percentage to return
+            limit: Number of results
+
+        Returns:
+            Dictionary with the number of matching resumes and the first
+            results, best match first when match_skills is given
+        """
+        candidates = self.evaluate(query) if query is not None else self.all_rows
+
+        if not match_skills:
+            total = _popcount(candidates)
+            results = []
+            for row in _row_numbers(candidates, limit):
+                sha256, skills = self.resume(row)
+                results.append({"resume_sha256": sha256, "skills": skills})
+            return {"total": total, "results": results}
+
+        # Smallest number of matched skills that reaches min_match, with the
+        # rounding of calculate_match
+        k = len(match_skills)
+        percentage = {c: round(c / k * 100, 2) for c in range(k + 1)}
+        needed = next((c for c in range(k + 1) if percentage[c] >= min_match), None)
+        if needed is None:
+            return {"total": 0, "results": []}
+
+        planes = self.skill_counts(match_skills)
+        total = _popcount(self.count_at_least(planes, needed) & candidates)
+
+        # Best first: walk down from all skills matched until limit is reached
+        wanted = set(match_skills)
+        results = []
+        for count in range(k, needed - 1, -1):
+            if len(results) >= limit:
+                break
+            rows = _row_numbers(self.count_equals(planes, count) & candidates,
+                                limit - len(results))
+            for row in rows:
+                sha256, skills = self.resume(row)
+                results.append({
+                    "resume_sha256": sha256,
+                    "match_percentage": percentage[count],
+                    "matched_skills": sorted(wanted.intersection(skills)),
+                    "missing_skills": sorted(wanted.difference(skills)),
+                    "skills": skills,
+                })
+        return {"total": total, "results": results}
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def read_bitmap_arrays(path: str = BITMAP_PATH, mode: Optional[str] = "r") -> Optional[Dict]:
+    """
+    Arrays of the bitmap file, or None if it doesn't exist yet
+
+    The arrays have room for the file's capacity; "count" is the number of
+    resumes they hold.
+
+    Args:
+        path: Index file
+        mode: Memory-map the arrays with this np.memmap mode, or None to
+            read them into memory
+
+    Raises:
+        ValueError: If the file is not a bitmap file of this version
+    """
+    import numpy as np
+
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+
+    with f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path} is not a skill bitmap file of this version")
+        count = int.from_bytes(f.read(8), "little")
+        length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(length))
+        data_start = _align(_HEADER_START + length)
+
+        arrays = {
+            "file_id": header["file_id"],
+            "taxonomy_version": header["taxonomy_version"],
+            "skill_names": header["skill_names"],
+            "count": count,
+        }
+        for name, spec in header["arrays"].items():
+            dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+            offset = data_start + spec["offset"]
+            if mode and all(shape):
+                arrays[name] = np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=shape)
+            else:
+                f.seek(offset)
+                size = int(np.prod(shape))
+                arrays[name] = np.fromfile(f, dtype=dtype, count=size).reshape(shape)
+    return arrays
+
+
+def write_bitmap_arrays(arrays: Dict, path: str = BITMAP_PATH, capacity: int = 0) -> None:
+    """
+    Write the bitmap file, atomically replacing the old one
+
+    Args:
+        arrays: Arrays holding exactly the indexed resumes
+        path: Index file
+        capacity: Number of resumes to leave room for (at least the ones
+            written, rounded up to whole postings words)
+    """
+    import numpy as np
+
+    count = len(arrays["ids"])
+    words = -(-max(capacity, count, 1) // 64)
+    row_bytes = arrays["rows"].shape[1]
+    skill_count = len(arrays["skill_names"])
+    layout = {
+        "ids": ("|S32", [words * 64]),
+        "rows": ("|u1", [words * 64, row_bytes]),
+        "postings": ("<u8", [skill_count, words]),
+    }
+
+    specs = {}
+    offset = 0
+    for name, (dtype, shape) in layout.items():
+        specs[name] = {"dtype": dtype, "shape": shape, "offset": offset}
+        offset = _align(offset + np.dtype(dtype).itemsize * int(np.prod(shape)))
+    header = json.dumps({
+        # Changes whenever the file is rewritten, unlike its inode number
+        "file_id": uuid.uuid4().hex,
+        "taxonomy_version": arrays["taxonomy_version"],
+        "skill_names": arrays["skill_names"],
+        "arrays": specs,
+    }).encode("utf-8")
+    data_start = _align(_HEADER_START + len(header))
+
+    # The used words of each posting, at the start of its row in the file
+    postings = np.zeros((skill_count, words), dtype=np.uint64)
+    postings[:, :arrays["postings"].shape[1]] = arrays["postings"]
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAGIC + count.to_bytes(8, "little") + len(header).to_bytes(8, "little") + header)
+            for name, data in (("ids", arrays["ids"]), ("rows", arrays["rows"]), ("postings", postings)):
+                f.seek(data_start + specs[name]["offset"])
+                f.write(np.ascontiguousarray(data).tobytes())
+            # The free space is left as a hole
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _postings(rows: "np.ndarray", skill_count: int, start: int, stop: int) -> "np.ndarray":
+    """Inverted index words start to stop (64 resumes each) of packed skill rows"""
+    import numpy as np
+
+    postings = np.zeros((skill_count, stop - start), dtype=np.uint64)
+    for first in range(start, stop, POSTINGS_CHUNK_WORDS):
+        last = min(first + POSTINGS_CHUNK_WORDS, stop)
+        block = np.unpackbits(rows[first * 64:last * 64], axis=1, count=skill_count,
+                              bitorder="little")
+        flags = np.zeros((skill_count, (last - first) * 64), dtype=np.uint8)
+        flags[:, :len(block)] = block.T
+        packed = np.packbits(flags, axis=1, bitorder="little")
+        postings[:, first - start:last - start] = packed.view("<u8")
+    return postings
+
+
+def _empty_arrays() -> Dict:
+    import numpy as np
+
+    index = get_taxonomy()
+    return {
+        "taxonomy_version": index.version,
+        "skill_names": list(index.skills),
+        "ids": np.zeros(0, dtype="S32"),
+        "rows": np.zeros((0, -(-len(index.skills) // 8)), dtype=np.uint8),
+        "postings": np.zeros((len(index.skills), 0), dtype=np.uint64),
+    }
+
+
+def _encode_rows(skill_names: List[str], rows: Iterable[CorpusRow]) -> Dict[bytes, "np.ndarray"]:
+    """Packed skill bitset of each resume, by hash"""
+    import numpy as np
+
+    skill_ids = {name: i for i, name in enumerate(skill_names)}
+    encoded: Dict[bytes, np.ndarray] = {}
+    for sha256, _, skills in rows:
+        flags = np.zeros(len(skill_ids), dtype=np.uint8)
+        flags[[skill_ids[s] for s in skills if s in skill_ids]] = 1
+        # The key as read back from an S32 array, which drops trailing zero bytes
+        encoded[bytes.fromhex(sha256).rstrip(b"\0")] = np.packbits(flags, bitorder="little")
+    return encoded
+
+
+def _append_rows(arrays: Dict, rows: Iterable[CorpusRow]) -> Dict:
+    """Add resumes to in-memory bitmap arrays, replacing rows with the same hash"""
+    import numpy as np
+
+    skill_count = len(arrays["skill_names"])
+    new = _encode_rows(arrays["skill_names"], rows)
+    if not new:
+        return arrays
+
+    ids, bits = arrays["ids"], arrays["rows"]
+    new_ids = np.array(list(new), dtype="S32")
+    new_bits = np.array(list(new.values()), dtype=np.uint8).reshape(len(new), -1)
+
+    # Resumes already in the index are updated in place
+    position = np.zeros(len(new_ids), dtype=np.int64)
+    existing = np.zeros(len(new_ids), dtype=bool)
+    if len(ids):
+        order = np.argsort(ids)
+        found = np.searchsorted(ids, new_ids, sorter=order).clip(max=len(ids) - 1)
+        position = order[found]
+        existing = ids[position] == new_ids
+    bits[position[existing]] = new_bits[existing]
+
+    old_count = len(ids)
+    ids = np.concatenate([ids, new_ids[~existing]])
+    bits = np.concatenate([bits, new_bits[~existing]])
+
+    # Rebuild only the inverted index words holding changed resumes
+    words = -(-len(ids) // 64)
+    postings = np.zeros((skill_count, words), dtype=np.uint64)
+    first_new = old_count // 64
+    postings[:, :first_new] = arrays["postings"][:, :first_new]
+    postings[:, first_new:] = _postings(bits, skill_count, first_new, words)
+    for word in np.unique(position[existing] // 64):
+        if word < first_new:
+            postings[:, word] = _postings(bits, skill_count, word, word + 1)[:, 0]
+
+    return dict(arrays, ids=ids, rows=bits, postings=postings)
+
+
+def _in_memory(arrays: Dict) -> Dict:
+    """Copy of the used part of mapped bitmap arrays, for _append_rows"""
+    import numpy as np
+
+    count = arrays["count"]
+    return dict(
+        arrays,
+        ids=np.array(arrays["ids"][:count]),
+        rows=np.array(arrays["rows"][:count]),
+        postings=np.array(arrays["postings"][:, :-(-count // 64)]),
+    )
+
+
+# Row number of each hash in the bitmap file, kept by the writing process
+# as (file id, positions); rows are only ever appended to a file
+_positions: Optional[Tuple[str, Dict[bytes, int]]] = None
+
+
+def _row_positions(arrays: Dict) -> Dict[bytes, int]:
+    global _positions
+
+    if _positions is None or _positions[0] != arrays["file_id"]:
+        _positions = (arrays["file_id"], {})
+    positions = _positions[1]
+    ids = arrays["ids"]
+    for row in range(len(positions), arrays["count"]):
+        positions[bytes(ids[row])] = row
+    return positions
+
+
+def _write_rows_in_place(arrays: Dict, rows: Dict[int, "np.ndarray"]) -> None:
+    """Set the skill bitsets of the given row numbers in mapped arrays"""
+    import numpy as np
+
+    skill_count = len(arrays["skill_names"])
+    postings = arrays["postings"]
+    for row, bits in rows.items():
+        word, mask = row // 64, np.uint64(1 << (row % 64))
+        postings[:, word] &= ~mask
+        flags = np.unpackbits(bits, count=skill_count, bitorder="little")
+        postings[np.flatnonzero(flags), word] |= mask
+        arrays["rows"][row] = bits
+
+
+def add_to_bitmap(rows: List[CorpusRow], path: str = BITMAP_PATH) -> int:
+    """
+    Add analyzed resumes to the skill bitmap index
+
+    New resumes are written into the file's free space, and resumes already
+    indexed are updated, in place; workers see them after their next
+    remap. When the file is full it is rewritten with twice the room. Bit
+    positions are the taxonomy's skill ids, so if the taxonomy has changed
+    since the index was written it is rebuilt from the document store
+    first.
+
+    Args:
+        rows: (sha256, resume text, skills) of each resume
+        path: Index file
+
+    Returns:
+        Number of resumes in the index
+    """
+    import numpy as np
+
+    with write_lock(path):
+        try:
+            arrays = read_bitmap_arrays(path, mode="r+")
+        except ValueError as e:
+            print(f"{e}, rebuilding the skill bitmap index")
+            arrays = None
+        if arrays is not None and arrays["taxonomy_version"] != taxonomy_version():
+            print("Skill taxonomy changed, rebuilding the skill bitmap index")
+            arrays = None
+        if arrays is None:
+            rebuilt = _append_rows(_empty_arrays(), stored_rows())
+            write_bitmap_arrays(rebuilt, path)
+            arrays = read_bitmap_arrays(path, mode="r+")
+
+        count = arrays["count"]
+        new = _encode_rows(arrays["skill_names"], rows)
+        positions = _row_positions(arrays)
+        added = [sha256 for sha256 in new if sha256 not in positions]
+        if count + len(added) > len(arrays["ids"]):
+            grown = _append_rows(_in_memory(arrays), rows)
+            write_bitmap_arrays(grown, path, capacity=2 * len(grown["ids"]))
+            return len(grown["ids"])
+        if not new:
+            return count
+
+        # Rows and postings first, then the count, so a worker remapping
+        # meanwhile never sees a resume before its bits
+        for i, sha256 in enumerate(added):
+            arrays["ids"][count + i] = sha256
+            positions[sha256] = count + i
+        _write_rows_in_place(arrays, {positions[sha256]: bits for sha256, bits in new.items()})
+        for name in ("ids", "rows", "postings"):
+            if isinstance(arrays[name], np.memmap):
+                arrays[name].flush()
+        count += len(added)
+        with open(path, "r+b") as f:
+            f.seek(_COUNT_OFFSET)
+            f.write(count.to_bytes(8, "little"))
+        # Writes through the mapping don't reliably update the mtime workers watch
+        os.utime(path)
+    return count
+
+
+def build_bitmap(path: str = BITMAP_PATH) -> int:
+    """Rebuild the skill bitmap index from every resume in the document store"""
+    with write_lock(path):
+        arrays = _append_rows(_empty_arrays(), stored_rows())
+        write_bitmap_arrays(arrays, path)
+    return len(arrays["ids"])
+
+
+_bitmap: Optional[SkillBitmap] = None
+_loaded_mtime: Optional[int] = None
+
+
+def get_bitmap() -> Optional[SkillBitmap]:
+    """
+    Return the skill bitmap index, remapping it whenever the file is replaced
+
+    Returns:
+        Bitmap index, or None if no resumes have been indexed
+    """
+    global _bitmap, _loaded_mtime
+
+    if not bitmap_enabled():
+        return None
+
+    try:
+        mtime = os.stat(BITMAP_PATH).st_mtime_ns
+    except OSError:
+        return _bitmap
+
+    if mtime != _loaded_mtime:
+        try:
+            _bitmap = SkillBitmap(read_bitmap_arrays(BITMAP_PATH))
+            _loaded_mtime = mtime
+        except Exception as e:
+            print(f"Error loading skill bitmap index: {e}")
+
+    return _bitmap
+
+
+def search_candidates(query: Optional[str] = None, match_skills: Optional[List[str]] = None,
+                      min_match: float = 0.0, limit: int = 100) -> Dict:
+    """
+    Search the analyzed resumes by skills
+
+    Args:
+        query: Boolean skill expression, see parse_query
+        match_skills: Skill names or aliases to compute the match percentage on
+        min_match: Lowest match percentage to return
+        limit: Number of results
+
+    Returns:
+        Dictionary with the index size, the number of matches and the results
+
+    Raises:
+        AnalysisError: 400 if the query is malformed or names an unknown skill
+    """
+    try:
+        node = parse_query(query) if query else None
+    except ValueError as e:
+        raise AnalysisError(400, f"Invalid query: {e}")
+
+    index = get_taxonomy()
+    canonical: List[str] = []
+    for name in match_skills or []:
+        skill = index.canonicalize(name)
+        if skill is None:
+            raise AnalysisError(400, f"Unknown skill: {name}")
+        if skill not in canonical:
+            canonical.append(skill)
+
+    bitmap = get_bitmap()
+    if bitmap is None or bitmap.size == 0:
+        return {"index_size": 0, "total": 0, "results": []}
+
+    with metrics.stage("skill_search"):
+        found = bitmap.search(node, canonical, min_match, limit)
+    return {"index_size": bitmap.size, **found}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the skill bitmap index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="Rebuild the index from the document store")
+
+    parser.parse_args(argv)
+
+    if not bitmap_enabled() or not store.store_enabled():
+        parser.error("SKILLLENS_SKILL_BITMAP and SKILLLENS_DOCUMENT_STORE must both be set")
+
+    count = build_bitmap()
+    print(f"Indexed {count} resumes -> {BITMAP_PATH}")
+
+
+if __name__ == "__main__":
+    main()
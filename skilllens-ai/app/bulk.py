@@ -0,0 +1,279 @@
+"""
+Offline bulk analysis of a directory of resumes against job descriptions
+
+    python -m app.bulk resumes/ --job backend.txt --job jobs/ --output results.jsonl
+
+Every PDF and DOCX file under the resume directory is parsed and analyzed
+against each job description (a .txt file, or every .txt file in a
+directory) in a pool of worker processes, with the same functions /analyze
+uses, so each analysis equals the "data" field /analyze would return. The
+job descriptions are processed once, in the parent, before the workers are
+forked.
+
+Results are written as one JSON line per resume as soon as it finishes,
+in completion order. Only a bounded number of files are in flight at once,
+so memory does not grow with the size of the directory. The output file is
+also the checkpoint: run the same command again after an interruption and
+resumes already analyzed in it are skipped. Files that failed, possibly for
+a transient reason such as the PDF time budget, are tried again, and the
+last line written for a file is the one that counts.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from app import warmup
+from app.analysis import analyze_documents, extract_resume_text
+from app.cache import content_hash, normalize_text
+from app.document import Document
+from app.errors import AnalysisError
+from app.skill_extractor import extract_document_skills
+from app.taxonomy import taxonomy_version
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+
+# Files handed to the pool ahead of the ones being analyzed, per worker
+IN_FLIGHT_PER_WORKER = 4
+
+# Output is flushed after every line and synced to disk this often
+SYNC_EVERY = 100
+PROGRESS_SECONDS = 10.0
+
+# Job descriptions of this worker process, set by _init_worker
+_jobs: List[Tuple[str, Document, object]] = []
+
+
+def load_jobs(paths: List[str]) -> List[Dict]:
+    """
+    Read and pre-process the job descriptions
+
+    Args:
+        paths: .txt files, or directories whose .txt files are all used
+
+    Returns:
+        One dictionary per job with its name (file path without the
+        extension, relative to a given directory), text, skills and vector
+    """
+    files: List[Tuple[str, str]] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for full_path, relative in iter_files(path, ('.txt',)):
+                files.append((os.path.splitext(relative)[0], full_path))
+        else:
+            files.append((os.path.splitext(os.path.basename(path))[0], path))
+
+    jobs = []
+    names: Set[str] = set()
+    for name, path in files:
+        if name in names:
+            raise ValueError(f"Two job descriptions are named {name!r}")
+        names.add(name)
+        with open(path, encoding="utf-8") as f:
+            # Normalized like the job descriptions sent to /analyze
+            text = normalize_text(f.read())
+        if not text:
+            raise ValueError(f"Job description {path} is empty")
+        document = Document(text)
+        jobs.append({
+            "name": name,
+            "text": text,
+            "skills": extract_document_skills([document])[0],
+            "vector": document.vector(),
+        })
+    return jobs
+
+
+def iter_files(directory: str, extensions: Tuple[str, ...] = SUPPORTED_EXTENSIONS) -> Iterator[Tuple[str, str]]:
+    """
+    Walk a directory in a stable order
+
+    Yields:
+        (full path, path relative to directory) of each file with one of
+        the extensions, compared case-insensitively
+    """
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in sorted(names):
+            if name.lower().endswith(extensions):
+                full_path = os.path.join(root, name)
+                yield full_path, os.path.relpath(full_path, directory)
+
+
+def _init_worker(jobs: List[Dict]) -> None:
+    global _jobs
+
+    _jobs = [(job["name"], Document(job["text"], job["skills"]), job["vector"]) for job in jobs]
+    warmup.warm_up()
+
+
+def analyze_file(path: str, relative: str) -> Dict:
+    """
+    Analyze one resume against every job description of this worker
+
+    The resume is parsed, and its skills extracted and vector computed
+    once, then matched against each job with analyze_documents, as
+    /analyze does. Failures are reported in the record instead of
+    raised, like analyze_batch_item.
+
+    Returns:
+        Output record: the file, its SHA-256 and either an analysis per job
+        name or an error
+    """
+    record: Dict = {"file": relative}
+    try:
+        with open(path, "rb") as f:
+            file_bytes = f.read()
+        record["resume_sha256"] = content_hash(file_bytes)
+
+        # The parser is picked from the extension, as in /analyze
+        resume = Document(extract_resume_text(relative.lower(), file_bytes))
+        extract_document_skills([resume])
+        record["success"] = True
+        record["analyses"] = {
+            name: analyze_documents(resume, job, vector) for name, job, vector in _jobs
+        }
+    except AnalysisError as e:
+        record["success"] = False
+        record["error"] = e.detail
+    except Exception as e:
+        record["success"] = False
+        record["error"] = f"Analysis failed: {str(e)}"
+    return record
+
+
+def read_checkpoint(output: str, job_names: List[str]) -> Set[str]:
+    """
+    Files already analyzed in an output file from an earlier run
+
+    Only files whose last line in the file is a success count; failed
+    files are analyzed again. A line cut short by an interruption is
+    removed from the file, so the run can append to it.
+
+    Raises:
+        ValueError: If the file was written for different job descriptions
+    """
+    succeeded: Dict[str, bool] = {}
+    if not os.path.exists(output):
+        return set()
+
+    valid_bytes = 0
+    with open(output, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            if record.get("success") and sorted(record["analyses"]) != job_names:
+                raise ValueError(
+                    f"{output} was written for other job descriptions, use --restart or another --output"
+                )
+            succeeded[record["file"]] = bool(record.get("success"))
+            valid_bytes += len(line)
+
+    if valid_bytes < os.path.getsize(output):
+        with open(output, "r+b") as f:
+            f.truncate(valid_bytes)
+    return {file for file, success in succeeded.items() if success}
+
+
+def run(resume_dir: str, jobs: List[Dict], output: str, workers: int, restart: bool = False) -> Dict:
+    """
+    Analyze every resume under resume_dir not already in the output file
+
+    Args:
+        resume_dir: Directory searched recursively for PDF and DOCX files
+        jobs: Job descriptions from load_jobs
+        output: JSONL file appended to
+        workers: Number of worker processes
+        restart: Discard an existing output file instead of resuming
+
+    Returns:
+        Counts of analyzed, failed and skipped files
+    """
+    if restart and os.path.exists(output):
+        os.remove(output)
+    done = read_checkpoint(output, sorted(job["name"] for job in jobs))
+
+    counts = {"analyzed": 0, "failed": 0, "skipped": 0}
+    started = last_progress = time.monotonic()
+    max_in_flight = workers * IN_FLIGHT_PER_WORKER
+    pending: Set[Future] = set()
+
+    def write(future: Future) -> None:
+        record = future.result()
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+        counts["analyzed" if record["success"] else "failed"] += 1
+        if (counts["analyzed"] + counts["failed"]) % SYNC_EVERY == 0:
+            os.fsync(out.fileno())
+
+    with open(output, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(jobs,)) as pool:
+        for path, relative in iter_files(resume_dir):
+            if relative in done:
+                counts["skipped"] += 1
+                continue
+
+            while len(pending) >= max_in_flight:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    write(future)
+
+            pending.add(pool.submit(analyze_file, path, relative))
+
+            if time.monotonic() - last_progress >= PROGRESS_SECONDS:
+                last_progress = time.monotonic()
+                processed = counts["analyzed"] + counts["failed"]
+                print(f"{processed} resumes analyzed ({counts['failed']} failed), "
+                      f"{processed / (last_progress - started):.1f}/s", file=sys.stderr)
+
+        for future in wait(pending).done:
+            write(future)
+        os.fsync(out.fileno())
+
+    counts["seconds"] = round(time.monotonic() - started, 3)
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Analyze a directory of resumes against job descriptions")
+    parser.add_argument("resume_dir", help="Directory searched recursively for PDF and DOCX resumes")
+    parser.add_argument("--job", action="append", required=True,
+                        help="Job description .txt file, or directory of them (repeatable)")
+    parser.add_argument("--output", required=True, help="JSONL file, also used as the checkpoint")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--restart", action="store_true",
+                        help="Overwrite the output file instead of resuming from it")
+
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.resume_dir):
+        parser.error(f"{args.resume_dir} is not a directory")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    try:
+        jobs = load_jobs(args.job)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not jobs:
+        parser.error("No job descriptions found")
+
+    print(f"Analyzing {args.resume_dir} against {len(jobs)} job descriptions "
+          f"with {args.workers} workers (taxonomy {taxonomy_version()})", file=sys.stderr)
+    try:
+        counts = run(args.resume_dir, jobs, args.output, args.workers, args.restart)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Analyzed {counts['analyzed']} resumes, {counts['failed']} failed, "
+          f"{counts['skipped']} already done, in {counts['seconds']}s -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# Entry limits and time-to-live (seconds) for the analysis caches
+RESULT_CACHE_SIZE = int(os.environ.get("SKILLLENS_RESULT_CACHE_SIZE", "1024"))
+TEXT_CACHE_SIZE = int(os.environ.get("SKILLLENS_TEXT_CACHE_SIZE", "256"))
+SKILLS_CACHE_SIZE = int(os.environ.get("SKILLLENS_SKILLS_CACHE_SIZE", "4096"))
+JOB_CACHE_SIZE = int(os.environ.get("SKILLLENS_JOB_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.environ.get("SKILLLENS_CACHE_TTL", "3600"))
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest used as a content address"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies of a text share a key"""
+    return " ".join(text.split())
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache with a time-to-live
+
+    Entries past their TTL are dropped on access. Only used from the event
+    loop thread, so no locking is needed.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class AsyncCache(LRUCache):
+    """LRU cache that also collapses concurrent computations of the same key"""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        super().__init__(maxsize, ttl)
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self.deduplicated = 0
+
+    async def get_or_compute(self, key: Hashable,
+                             compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for key, computing it at most once
+
+        Callers arriving while the value is being computed wait for that
+        computation instead of starting their own. Failures are not cached.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is not sentinel:
+            return value
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(pending)
+
+        task = asyncio.ensure_future(compute())
+        self._pending[key] = task
+        try:
+            value = await asyncio.shield(task)
+        finally:
+            self._pending.pop(key, None)
+
+        self.set(key, value)
+        return value
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats["in_flight"] = len(self._pending)
+        stats["deduplicated"] = self.deduplicated
+        return stats
+
+
+# Final /analyze payloads, keyed on (resume file hash, job description
+# hash, taxonomy version, TF-IDF model version)
+result_cache = AsyncCache(RESULT_CACHE_SIZE, CACHE_TTL)
+
+# Extracted resume text, keyed on the resume file hash
+text_cache = AsyncCache(TEXT_CACHE_SIZE, CACHE_TTL)
+
+# Extracted skill lists, keyed on ("file", file hash, taxonomy version) or
+# ("text", text hash, taxonomy version)
+skills_cache = AsyncCache(SKILLS_CACHE_SIZE, CACHE_TTL)
+
+# Registered job postings, keyed on (job id, taxonomy version)
+job_cache = AsyncCache(JOB_CACHE_SIZE, CACHE_TTL)
+
+
+def cache_stats() -> Dict:
+    """Counters for every analysis cache"""
+    return {
+        "result": result_cache.stats(),
+        "text": text_cache.stats(),
+        "skills": skills_cache.stats(),
+        "jobs": job_cache.stats(),
+    }
@@ -0,0 +1,584 @@
+"""
+Corpus of analyzed resumes for ranking candidates against a job description
+
+Every analyzed resume is added to an on-disk index holding its TF-IDF
+vector (from the shared model in app.vectorizer) and its skills as two
+sparse matrices. Ranking scores a job description against every stored
+resume at once, with the weighting of advanced_match_score:
+
+    overall = skill match % * SKILL_WEIGHT + text similarity % * TEXT_WEIGHT
+
+Each term is one sparse matrix-vector product over the columns that occur
+in the job description. Without a fitted TF-IDF model only the skill term
+is scored.
+
+The index is a directory of immutable segment files listed by a manifest.
+Each batch of new resumes is written as a new segment, and the newest
+segments are merged while the one before is no larger, so there are
+O(log n) segments and each resume is rewritten O(log n) times. Workers
+load only the segments they haven't seen yet. A resume analyzed again
+replaces its row in older segments. Rebuild the index from the document
+store with:
+
+    python -m app.corpus build
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app import metrics, store
+from app.matcher import SKILL_WEIGHT, TEXT_WEIGHT, get_match_level
+from app.skill_extractor import extract_skills
+from app.taxonomy import taxonomy_version
+from app.vectorizer import get_vectorizer, model_version
+
+# Index directory shared by every worker; set to an empty string to disable
+CORPUS_PATH = os.environ.get(
+    "SKILLLENS_CORPUS_INDEX",
+    str(Path(__file__).resolve().parent.parent / "models" / "corpus")
+)
+
+MANIFEST_NAME = "manifest.json"
+
+# Resumes are vectorized this many at a time when building the index
+INDEX_CHUNK_SIZE = 1000
+
+MAX_TOP_K = 1000
+
+# numpy and scipy are imported on first use to keep startup fast
+if TYPE_CHECKING:
+    import numpy as np
+    from scipy import sparse
+
+# (sha256, resume text, skills)
+CorpusRow = Tuple[str, str, List[str]]
+
+
+def corpus_enabled() -> bool:
+    return bool(CORPUS_PATH)
+
+
+def _csr(arrays: Dict, name: str) -> "sparse.csr_matrix":
+    from scipy import sparse
+
+    return sparse.csr_matrix(
+        (arrays[f"{name}_data"], arrays[f"{name}_indices"], arrays[f"{name}_indptr"]),
+        shape=tuple(arrays[f"{name}_shape"])
+    )
+
+
+def _csr_arrays(name: str, matrix: "sparse.csr_matrix") -> Dict:
+    import numpy as np
+
+    return {
+        f"{name}_data": matrix.data,
+        f"{name}_indices": matrix.indices,
+        f"{name}_indptr": matrix.indptr,
+        f"{name}_shape": np.array(matrix.shape),
+    }
+
+
+def top_rows(scores: "np.ndarray", top_k: int) -> "np.ndarray":
+    """Indices of the top_k highest scores, best first, ties in row order"""
+    import numpy as np
+
+    count = len(scores)
+    k = min(top_k, count)
+    top = np.argpartition(-scores, k - 1)[:k] if k < count else np.arange(count)
+    return top[np.lexsort((top, -scores[top]))]
+
+
+class CorpusSegment:
+    """
+    Read-only, in-memory form of one segment file
+
+    Columns of the text matrix are the shared model's vocabulary, columns
+    of the skill matrix are the segment's skill names. Both are kept
+    column-major for scoring, so a job description only touches the
+    columns it contains.
+    """
+
+    def __init__(self, arrays: Dict):
+        self.ids = arrays["ids"]
+        self.replaced = arrays["replaced"]
+        self.skill_names = [str(name) for name in arrays["skill_names"]]
+        self.skill_columns = {name: i for i, name in enumerate(self.skill_names)}
+        self.skills = _csr(arrays, "skills")
+        self.skills_by_column = self.skills.tocsc()
+        self.vectors = _csr(arrays, "vectors").tocsc()
+
+    def scores(self, job_skills: List[str], job_vector=None) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Skill match % and text similarity % of every row"""
+        import numpy as np
+
+        count = len(self.ids)
+
+        # Skill match %: resume skills among the job's skills
+        columns = [self.skill_columns[s] for s in job_skills if s in self.skill_columns]
+        if columns:
+            overlap = self.skills_by_column[:, columns].sum(axis=1)
+            overlap = np.asarray(overlap, dtype=np.float64).ravel()
+            skill_scores = np.round(overlap / len(job_skills) * 100, 2)
+        else:
+            skill_scores = np.zeros(count)
+
+        # Text similarity %: rows and job vector are L2-normalized, so the
+        # dot product is the cosine. The transpose of the column-major matrix
+        # is row-major by term, so the product only reads the job's terms.
+        if job_vector is not None and job_vector.nnz and self.vectors.shape[1]:
+            cosine = (job_vector.astype(np.float32) @ self.vectors.T).toarray().ravel()
+            text_scores = np.round(cosine.astype(np.float64) * 100, 2)
+        else:
+            text_scores = np.zeros(count)
+
+        return skill_scores, text_scores
+
+    def resume_skills(self, row: int) -> Set[str]:
+        start, end = self.skills.indptr[row], self.skills.indptr[row + 1]
+        return {self.skill_names[c] for c in self.skills.indices[start:end]}
+
+
+class CorpusIndex:
+    """
+    The segments listed by one version of the manifest
+
+    Rows replaced by a newer segment are masked out rather than removed,
+    so segments can be shared between versions.
+    """
+
+    def __init__(self, manifest: Dict, segments: List[CorpusSegment]):
+        import numpy as np
+
+        self.model_version = manifest["model_version"]
+        self.taxonomy_version = manifest["taxonomy_version"]
+        self.segments = segments
+        self.offsets = np.cumsum([0] + [len(segment.ids) for segment in segments])
+
+        self.live = np.ones(self.offsets[-1], dtype=bool)
+        for i, segment in enumerate(segments):
+            if len(segment.replaced):
+                for j, older in enumerate(segments[:i]):
+                    dead = np.isin(older.ids, segment.replaced)
+                    self.live[self.offsets[j]:self.offsets[j + 1]] &= ~dead
+
+    @property
+    def size(self) -> int:
+        return int(self.live.sum())
+
+    def rank(self, job_skills: List[str], job_vector=None, top_k: int = 10) -> List[Dict]:
+        """
+        Score every resume against a job description and return the best
+
+        Args:
+            job_skills: Skills extracted from the job description
+            job_vector: Job description transformed with the model the
+                index was built with, or None to score skills only
+            top_k: Number of results
+
+        Returns:
+            Best matches first, in the shape of advanced_match_score
+        """
+        import numpy as np
+
+        count = self.size
+        if count == 0 or top_k <= 0:
+            return []
+
+        parts = [segment.scores(job_skills, job_vector) for segment in self.segments]
+        skill_scores = np.concatenate([part[0] for part in parts])
+        text_scores = np.concatenate([part[1] for part in parts])
+
+        overall = skill_scores * SKILL_WEIGHT + text_scores * TEXT_WEIGHT
+        overall[~self.live] = -np.inf
+
+        job_set = set(job_skills)
+        results = []
+        for row in top_rows(overall, min(top_k, count)):
+            i = int(np.searchsorted(self.offsets, row, side="right")) - 1
+            segment = self.segments[i]
+            local = row - self.offsets[i]
+            resume_skills = segment.resume_skills(local)
+            score = round(float(overall[row]), 2)
+            results.append({
+                "resume_sha256": _hex(segment.ids[local]),
+                "overall_score": score,
+                "skill_match_score": float(skill_scores[row]),
+                "text_similarity_score": float(text_scores[row]),
+                "match_level": get_match_level(score),
+                "matched_skills": sorted(job_set & resume_skills),
+                "missing_skills": sorted(job_set - resume_skills),
+            })
+        return results
+
+
+def _hex(sha256: bytes) -> str:
+    # Fixed-width bytes arrays drop trailing zero bytes
+    return bytes(sha256).ljust(32, b"\0").hex()
+
+
+def read_manifest(path: str = CORPUS_PATH) -> Optional[Dict]:
+    """
+    Manifest of the index directory, or None if nothing was indexed yet
+
+    Lists the segments in order, oldest first, with their row counts, and
+    the model and taxonomy versions they were built with.
+    """
+    try:
+        with open(Path(path) / MANIFEST_NAME, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def read_segment_arrays(name: str, path: str = CORPUS_PATH, keys: Optional[List[str]] = None) -> Dict:
+    """Raw arrays of a segment file, or only the given ones"""
+    import numpy as np
+
+    with np.load(Path(path) / name, allow_pickle=False) as data:
+        return {key: data[key] for key in keys or data.files}
+
+
+def _write_atomic(target: Path, write) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_segment_arrays(arrays: Dict, path: str = CORPUS_PATH) -> str:
+    """Write a new segment file and return its name"""
+    import numpy as np
+
+    name = f"segment-{uuid.uuid4().hex}.npz"
+    _write_atomic(Path(path) / name, lambda f: np.savez(f, **arrays))
+    return name
+
+
+def write_manifest(manifest: Dict, path: str = CORPUS_PATH) -> None:
+    """
+    Replace the manifest atomically, then delete the segment files it no
+    longer lists
+    """
+    directory = Path(path)
+    _write_atomic(directory / MANIFEST_NAME,
+                  lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+
+    listed = {segment["name"] for segment in manifest["segments"]}
+    for file in directory.glob("segment-*.npz"):
+        if file.name not in listed:
+            file.unlink(missing_ok=True)
+
+
+@contextmanager
+def write_lock(path: str) -> Iterator[None]:
+    """Serialize read-modify-write of an index across processes"""
+    lock_path = Path(str(path) + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _index_rows(rows: Iterable[CorpusRow], vectorizer,
+                skill_names: List[str]) -> Tuple["np.ndarray", "sparse.csr_matrix", "sparse.csr_matrix"]:
+    """
+    Vectorize resumes and encode their skills
+
+    Rows are consumed in chunks, so building from the whole store never
+    holds every text at once. New skill names are appended to skill_names.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    columns = {name: i for i, name in enumerate(skill_names)}
+    ids: List[str] = []
+    blocks = []
+    indices: List[int] = []
+    indptr = [0]
+
+    chunk: List[str] = []
+    for sha256, text, skills in rows:
+        ids.append(sha256)
+        chunk.append(text)
+        for skill in sorted(set(skills)):
+            if skill not in columns:
+                columns[skill] = len(skill_names)
+                skill_names.append(skill)
+            indices.append(columns[skill])
+        indptr.append(len(indices))
+        if len(chunk) >= INDEX_CHUNK_SIZE:
+            blocks.append(vectorizer.transform(chunk) if vectorizer is not None else None)
+            chunk = []
+    if chunk:
+        blocks.append(vectorizer.transform(chunk) if vectorizer is not None else None)
+
+    if vectorizer is not None and blocks:
+        vectors = sparse.vstack(blocks, format="csr").astype(np.float32)
+    else:
+        width = len(vectorizer.vocabulary_) if vectorizer is not None else 0
+        vectors = sparse.csr_matrix((len(ids), width), dtype=np.float32)
+    skill_matrix = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int32),
+         np.array(indptr, dtype=np.int64)),
+        shape=(len(ids), len(skill_names))
+    )
+    ids = np.array([bytes.fromhex(sha256) for sha256 in ids], dtype="S32")
+    return ids, vectors, skill_matrix
+
+
+def _segment(rows: Iterable[CorpusRow], replaced: Iterable[str] = ()) -> Dict:
+    """Arrays of a new segment holding the given resumes"""
+    import numpy as np
+
+    skill_names: List[str] = []
+    ids, vectors, skills = _index_rows(rows, get_vectorizer(), skill_names)
+    return {
+        "ids": ids,
+        "replaced": np.array(sorted(replaced), dtype="S32"),
+        "skill_names": np.array(skill_names, dtype=str),
+        **_csr_arrays("vectors", vectors),
+        **_csr_arrays("skills", skills),
+    }
+
+
+def _merge(older: Dict, newer: Dict) -> Dict:
+    """One segment equal to older followed by newer, without replaced rows"""
+    import numpy as np
+    from scipy import sparse
+
+    skill_names = [str(name) for name in older["skill_names"]]
+    columns = {name: i for i, name in enumerate(skill_names)}
+    for name in newer["skill_names"]:
+        if str(name) not in columns:
+            columns[str(name)] = len(skill_names)
+            skill_names.append(str(name))
+
+    # Renumber the newer segment's skill columns into the merged names
+    newer_skills = _csr(newer, "skills")
+    mapping = np.array([columns[str(name)] for name in newer["skill_names"]], dtype=np.int32)
+    newer_skills = sparse.csr_matrix(
+        (newer_skills.data, mapping[newer_skills.indices] if len(mapping) else newer_skills.indices,
+         newer_skills.indptr),
+        shape=(newer_skills.shape[0], len(skill_names))
+    )
+    older_skills = _csr(older, "skills")
+    older_skills.resize((older_skills.shape[0], len(skill_names)))
+
+    keep = ~np.isin(older["ids"], newer["ids"])
+    vectors = sparse.vstack([_csr(older, "vectors")[keep], _csr(newer, "vectors")], format="csr")
+    skills = sparse.vstack([older_skills[keep], newer_skills], format="csr")
+    return {
+        "ids": np.concatenate([older["ids"][keep], newer["ids"]]),
+        "replaced": np.union1d(older["replaced"], newer["replaced"]).astype("S32"),
+        "skill_names": np.array(skill_names, dtype=str),
+        **_csr_arrays("vectors", vectors),
+        **_csr_arrays("skills", skills),
+    }
+
+
+# Hashes in each segment file, kept by the writing process; segment files
+# never change, so entries stay valid until the segment is merged away
+_segment_ids: Dict[str, Set[bytes]] = {}
+
+
+def _stored_ids(manifest: Dict, path: str) -> Set[bytes]:
+    names = [segment["name"] for segment in manifest["segments"]]
+    for name in set(_segment_ids) - set(names):
+        del _segment_ids[name]
+
+    stored: Set[bytes] = set()
+    for name in names:
+        if name not in _segment_ids:
+            ids = read_segment_arrays(name, path, ["ids"])["ids"]
+            _segment_ids[name] = {bytes(sha256) for sha256 in ids}
+        stored |= _segment_ids[name]
+    return stored
+
+
+def _new_manifest(rows: Iterable[CorpusRow], path: str) -> Dict:
+    """Write the given resumes as the only segment of a new manifest"""
+    arrays = _segment(rows)
+    manifest = {
+        "model_version": model_version(),
+        "taxonomy_version": taxonomy_version(),
+        "segments": [{"name": write_segment_arrays(arrays, path), "rows": len(arrays["ids"])}],
+    }
+    write_manifest(manifest, path)
+    return manifest
+
+
+def stored_rows() -> Iterator[CorpusRow]:
+    """Every resume in the document store, with skills for the current taxonomy"""
+    current = taxonomy_version()
+    for sha256, text, skills, skills_taxonomy in store.iter_documents():
+        if skills is None or skills_taxonomy != current:
+            skills = extract_skills(text)
+        yield sha256, text, skills
+
+
+def add_to_corpus(rows: List[CorpusRow], path: str = CORPUS_PATH) -> int:
+    """
+    Add analyzed resumes to the corpus index
+
+    The resumes are written as a new segment, which is then merged into
+    the segments before it while the previous one is no larger. If the
+    TF-IDF model has been refitted or the taxonomy changed since the index
+    was written, the stored vectors or skills no longer match the ones
+    computed now, so the index is rebuilt from the document store first.
+
+    Args:
+        rows: (sha256, resume text, skills) of each resume
+        path: Index directory
+
+    Returns:
+        Number of resumes in the index
+    """
+    # A resume queued twice keeps its last row
+    rows = list({row[0]: row for row in rows}.values())
+    Path(path).mkdir(parents=True, exist_ok=True)
+    with write_lock(path):
+        manifest = read_manifest(path)
+        if manifest is not None and (manifest["model_version"] != model_version() or
+                                     manifest["taxonomy_version"] != taxonomy_version()):
+            print("TF-IDF model or skill taxonomy changed, rebuilding the corpus index")
+            manifest = None
+        if manifest is None:
+            manifest = _new_manifest(stored_rows(), path)
+
+        stored = _stored_ids(manifest, path)
+        added = {bytes.fromhex(row[0]) for row in rows}
+        if not added:
+            return len(stored)
+        arrays = _segment(rows, added & stored)
+        segments = manifest["segments"] + [{"name": None, "rows": len(arrays["ids"])}]
+
+        # Merge into the previous segment while it is no larger, like
+        # carrying in a binary counter
+        while len(segments) > 1 and segments[-2]["rows"] <= segments[-1]["rows"]:
+            older = read_segment_arrays(segments[-2]["name"], path)
+            arrays = _merge(older, arrays)
+            segments[-2:] = [{"name": None, "rows": len(arrays["ids"])}]
+        if len(segments) == 1:
+            # Nothing older left to replace rows in
+            arrays["replaced"] = arrays["replaced"][:0]
+
+        segments[-1]["name"] = write_segment_arrays(arrays, path)
+        manifest = dict(manifest, segments=segments)
+        write_manifest(manifest, path)
+    return len(stored | added)
+
+
+def build_corpus(path: str = CORPUS_PATH) -> int:
+    """Rebuild the corpus index from every resume in the document store"""
+    Path(path).mkdir(parents=True, exist_ok=True)
+    with write_lock(path):
+        manifest = _new_manifest(stored_rows(), path)
+    return manifest["segments"][0]["rows"]
+
+
+_corpus: Optional[CorpusIndex] = None
+_segments: Dict[str, CorpusSegment] = {}
+_loaded_mtime: Optional[int] = None
+
+
+def get_corpus() -> Optional[CorpusIndex]:
+    """
+    Return the corpus index, reloading it whenever the manifest is replaced
+
+    Segments already loaded are reused, so a reload only reads the new ones.
+
+    Returns:
+        Corpus index, or None if no resumes have been indexed
+    """
+    global _corpus, _segments, _loaded_mtime
+
+    if not corpus_enabled():
+        return None
+
+    try:
+        mtime = os.stat(Path(CORPUS_PATH) / MANIFEST_NAME).st_mtime_ns
+    except OSError:
+        return _corpus
+
+    if mtime != _loaded_mtime:
+        try:
+            manifest = read_manifest(CORPUS_PATH)
+            segments = {}
+            for entry in manifest["segments"]:
+                name = entry["name"]
+                segments[name] = _segments.get(name) or CorpusSegment(read_segment_arrays(name, CORPUS_PATH))
+            _corpus = CorpusIndex(manifest, [segments[entry["name"]] for entry in manifest["segments"]])
+            _segments = segments
+            _loaded_mtime = mtime
+        except Exception as e:
+            print(f"Error loading corpus index: {e}")
+
+    return _corpus
+
+
+def rank_corpus(job_description: str, top_k: int = 10,
+                job_skills: Optional[List[str]] = None) -> Dict:
+    """
+    Rank the stored resumes against a job description
+
+    Args:
+        job_description: Text of the job posting
+        top_k: Number of results
+        job_skills: Skills already extracted from job_description, if known
+
+    Returns:
+        Dictionary with the job's skills, corpus size and the top matches
+    """
+    if job_skills is None:
+        job_skills = extract_skills(job_description)
+
+    corpus = get_corpus()
+    if corpus is None:
+        return {"job_skills": job_skills, "corpus_size": 0,
+                "text_similarity": False, "results": []}
+
+    job_vector = None
+    if corpus.model_version is not None and corpus.model_version == model_version():
+        job_vector = get_vectorizer().transform([job_description])
+
+    with metrics.stage("ranking"):
+        results = corpus.rank(job_skills, job_vector, top_k)
+
+    return {
+        "job_skills": job_skills,
+        "corpus_size": corpus.size,
+        "text_similarity": job_vector is not None,
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the resume corpus index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="Rebuild the index from the document store")
+
+    parser.parse_args(argv)
+
+    if not corpus_enabled() or not store.store_enabled():
+        parser.error("SKILLLENS_CORPUS_INDEX and SKILLLENS_DOCUMENT_STORE must both be set")
+
+    count = build_corpus()
+    print(f"Indexed {count} resumes -> {CORPUS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+One input text and the representations derived from it
+
+A resume or job description is read by several stages: the skill regex and
+the TF-IDF analyzer both need it lowercased, spaCy needs the original, and
+similarity needs its n-grams or model vector. A Document is built once per
+input and computes each representation on first use, so every stage of an
+analysis shares one lowercased copy, one n-gram list and one vector instead
+of deriving its own from the raw string.
+
+Documents live for one analysis in the process that runs it; they are not
+cached or sent between processes.
+"""
+
+from functools import cached_property
+from typing import TYPE_CHECKING, List, Optional
+
+from app.vectorizer import get_vectorizer, ngram_analyzer, ngram_model
+
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+class Document:
+    """
+    Text of a resume or job description with its derived representations
+
+    Attributes:
+        text: The text as given
+        skills: Skills found in the text, set by
+            app.skill_extractor.extract_document_skills (or by the caller
+            when already known)
+        nlp_docs: spaCy docs of the text's segments, set with skills when
+            the spaCy model is loaded
+    """
+
+    def __init__(self, text: str, skills: Optional[List[str]] = None):
+        self.text = text
+        self.skills = skills
+        self.nlp_docs: Optional[List] = None
+        self._vector = None
+        self._vector_model: Optional["TfidfVectorizer"] = None
+
+    @cached_property
+    def lower(self) -> str:
+        """Lowercased text, as read by the skill regex and the TF-IDF analyzer"""
+        return self.text.lower()
+
+    @cached_property
+    def ngrams(self) -> List[str]:
+        """Unigrams and bigrams without stop words, as the TF-IDF vectorizer counts them"""
+        return ngram_analyzer()(self.lower)
+
+    def vector(self, vectorizer: Optional["TfidfVectorizer"] = None):
+        """
+        Row of the text in the shared TF-IDF model
+
+        Args:
+            vectorizer: Fitted model to use, defaults to get_vectorizer()
+
+        Returns:
+            L2-normalized sparse row vector, or None if no model has been
+            fitted
+        """
+        if vectorizer is None:
+            vectorizer = get_vectorizer()
+            if vectorizer is None:
+                return None
+
+        if self._vector_model is not vectorizer:
+            model = ngram_model(vectorizer)
+            if model is not None:
+                self._vector = model.transform([self.ngrams])
+            else:
+                self._vector = vectorizer.transform([self.text])
+            self._vector_model = vectorizer
+        return self._vector
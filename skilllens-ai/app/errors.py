@@ -0,0 +1,12 @@
+class AnalysisError(Exception):
+    """
+    Analysis failure that maps to an HTTP error response
+
+    Unlike HTTPException this can be pickled, so it survives the trip back
+    from a worker process.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
@@ -0,0 +1,106 @@
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app import warmup
+from app.metrics import collect, current_request
+
+# Where CPU-bound analysis runs: "process" (default), "thread" or "inline"
+# ("inline" runs on the event loop, useful for debugging)
+EXECUTOR_MODE = os.environ.get("SKILLLENS_EXECUTOR", "process")
+
+# Number of workers, defaults to one per core
+EXECUTOR_WORKERS = int(os.environ.get("SKILLLENS_EXECUTOR_WORKERS", "0")) or os.cpu_count() or 1
+
+_executor: Optional[Executor] = None
+_started = False
+
+
+def start_executor(mode: str = EXECUTOR_MODE, workers: int = EXECUTOR_WORKERS) -> Optional[Executor]:
+    """
+    Create the analysis executor and pre-warm its workers
+
+    Every worker loads the models and runs a dummy analysis before the
+    executor is returned; the results are recorded for the /ready probe.
+
+    Args:
+        mode: "process", "thread" or "inline"
+        workers: Number of workers in the pool
+
+    Returns:
+        The executor, or None in inline mode
+    """
+    global _executor, _started
+
+    if _started:
+        return _executor
+
+    started = time.perf_counter()
+
+    if mode == "process":
+        _executor = ProcessPoolExecutor(max_workers=workers, initializer=warmup.warm_up)
+        # Submitting one task per worker up front spawns every process now,
+        # so the first real requests don't pay for model loading
+        futures = [_executor.submit(warmup.worker_status) for _ in range(workers)]
+        statuses = {}
+        for future in futures:
+            status = future.result()
+            statuses[status["pid"]] = status
+        worker_statuses = list(statuses.values())
+    else:
+        worker_statuses = [warmup.worker_status()]
+        if mode == "thread":
+            _executor = ThreadPoolExecutor(max_workers=workers)
+
+    warmup.record_startup(
+        warmup_seconds=time.perf_counter() - started, workers=worker_statuses
+    )
+    _started = True
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the analysis executor and its workers"""
+    global _executor, _started
+
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+    _started = False
+    warmup.reset_readiness()
+
+
+async def run_cpu_bound(func: Callable, *args: Any) -> Any:
+    """
+    Run a CPU-bound function off the event loop
+
+    Args:
+        func: Module-level (picklable) function to call
+        *args: Positional arguments for func
+
+    Returns:
+        Whatever func returns; exceptions are re-raised in the caller
+    """
+    executor = _executor if _started else start_executor()
+
+    request = current_request.get()
+    if request is not None:
+        # Run through metrics.collect so the stage timings recorded in the
+        # worker come back with the result
+        args = (func, args, request.profile_path(func))
+        func = collect
+
+    if executor is None:
+        result = func(*args)
+    else:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(executor, functools.partial(func, *args))
+
+    if request is not None:
+        result, collected = result
+        request.merge(collected)
+
+    return result
@@ -0,0 +1,278 @@
+"""
+Index of job postings for matching one resume against many jobs
+
+Postings are registered once (POST /jobs): their skills and TF-IDF vector
+are extracted and kept in the document store. Every worker holds the
+postings as two sparse matrices and picks up new ones incrementally by
+reading only the rows registered since its last refresh, so adding a
+posting never rebuilds the index.
+
+A resume is scored against every posting in one pass, with the semantics
+of calculate_match (the share of each job's skills the resume has) and
+text_similarity (cosine of the TF-IDF vectors), combined with the weights
+of advanced_match_score.
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+from app import metrics, store
+from app.corpus import top_rows
+from app.document import Document
+from app.matcher import SKILL_WEIGHT, TEXT_WEIGHT, get_match_level
+from app.skill_extractor import extract_document_skills
+from app.taxonomy import taxonomy_version
+from app.vectorizer import get_vectorizer, model_version
+
+
+def job_features(text: str, skills: Optional[List[str]] = None) -> Dict:
+    """
+    Extract what matching needs from a job description
+
+    Args:
+        text: Normalized job description
+        skills: Skills already extracted from text, if known
+
+    Returns:
+        Dictionary with skills, the TF-IDF vector as (indices, data) bytes
+        (None without a fitted model), and the taxonomy and model versions
+    """
+    # numpy and scipy are imported on first use to keep startup fast
+    import numpy as np
+
+    document = Document(text, skills)
+    row = document.vector()
+    vector = None
+    if row is not None:
+        vector = (row.indices.astype(np.int32).tobytes(),
+                  row.data.astype(np.float32).tobytes())
+    return {
+        "skills": extract_document_skills([document])[0],
+        "vector": vector,
+        "taxonomy": taxonomy_version(),
+        "model_version": model_version(),
+    }
+
+
+def decode_vector(job: Dict):
+    """
+    Stored TF-IDF vector of a job as a sparse row
+
+    Returns:
+        1 x vocabulary sparse row, or None if the job was vectorized with
+        another model (or none), in which case its text must be transformed
+    """
+    import numpy as np
+    from scipy import sparse
+
+    if job["vector"] is None or job["model_version"] != model_version():
+        return None
+    indices = np.frombuffer(job["vector"][0], dtype=np.int32)
+    data = np.frombuffer(job["vector"][1], dtype=np.float32).astype(np.float64)
+    return sparse.csr_matrix(
+        (data, indices, [0, len(indices)]), shape=(1, len(get_vectorizer().vocabulary_))
+    )
+
+
+class JobIndex:
+    """
+    Registered job postings of one worker, as of its last refresh
+
+    An index is never modified once built; refreshed() returns a new one
+    holding the postings registered since. It is rebuilt from scratch only
+    when the taxonomy or TF-IDF model changes; postings stored with an
+    older taxonomy or model are then re-extracted and written back.
+    """
+
+    def __init__(self):
+        self.taxonomy = None
+        self.model_version = None
+        self.last_id = 0
+        self.ids: List[str] = []
+        self.titles: List[Optional[str]] = []
+        self.skill_names: List[str] = []
+        self.skill_columns: Dict[str, int] = {}
+        self.job_skill_counts = None
+        self.skills = None
+        self.skills_by_column = None
+        self.vectors = None
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def refreshed(self) -> "JobIndex":
+        """
+        Index with the postings registered since this one was built
+
+        The index itself is never modified, so a match running on it in
+        another thread is unaffected; the caller swaps in the result.
+
+        Returns:
+            A new index, or this one if nothing changed
+        """
+        import numpy as np
+        from scipy import sparse
+
+        taxonomy, model = taxonomy_version(), model_version()
+        base = self
+        if (taxonomy, model) != (self.taxonomy, self.model_version):
+            base = JobIndex()
+            base.taxonomy, base.model_version = taxonomy, model
+
+        jobs = list(store.iter_jobs(base.last_id))
+        if not jobs:
+            return base
+
+        index = JobIndex()
+        index.taxonomy, index.model_version = taxonomy, model
+        index.ids, index.titles = list(base.ids), list(base.titles)
+        index.skill_names, index.skill_columns = list(base.skill_names), dict(base.skill_columns)
+
+        vocabulary = len(get_vectorizer().vocabulary_) if model is not None else 0
+        skill_indices: List[int] = []
+        skill_indptr = [0]
+        vector_blocks = []
+        for job in jobs:
+            if job["skills_taxonomy"] != taxonomy or job["model_version"] != model:
+                features = job_features(job["text"])
+                store.update_job_features(job["sha256"], features)
+                job["skills"], job["vector"] = features["skills"], features["vector"]
+
+            index.ids.append(job["sha256"])
+            index.titles.append(job["title"])
+            for skill in job["skills"]:
+                if skill not in index.skill_columns:
+                    index.skill_columns[skill] = len(index.skill_names)
+                    index.skill_names.append(skill)
+                skill_indices.append(index.skill_columns[skill])
+            skill_indptr.append(len(skill_indices))
+
+            indices, data = np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+            if job["vector"] is not None:
+                indices = np.frombuffer(job["vector"][0], dtype=np.int32)
+                data = np.frombuffer(job["vector"][1], dtype=np.float32)
+            vector_blocks.append(sparse.csr_matrix(
+                (data, indices, [0, len(indices)]), shape=(1, vocabulary), dtype=np.float32
+            ))
+        index.last_id = jobs[-1]["id"]
+
+        new_skills = sparse.csr_matrix(
+            (np.ones(len(skill_indices), dtype=np.float32),
+             np.array(skill_indices, dtype=np.int32), np.array(skill_indptr)),
+            shape=(len(jobs), len(index.skill_names))
+        )
+        new_vectors = sparse.vstack(vector_blocks, format="csc")
+        new_counts = np.diff(new_skills.indptr).astype(np.float64)
+
+        if base.skills is None:
+            index.skills, index.vectors, index.job_skill_counts = new_skills, new_vectors, new_counts
+        else:
+            old_skills = base.skills.copy()
+            old_skills.resize((old_skills.shape[0], len(index.skill_names)))
+            index.skills = sparse.vstack([old_skills, new_skills], format="csr")
+            index.vectors = sparse.vstack([base.vectors, new_vectors], format="csc")
+            index.job_skill_counts = np.concatenate([base.job_skill_counts, new_counts])
+        index.skills_by_column = index.skills.tocsc()
+        return index
+
+    def match(self, resume_skills: List[str], resume_vector=None, top_k: int = 10) -> List[Dict]:
+        """
+        Score a resume against every posting and return the best fits
+
+        Args:
+            resume_skills: Skills extracted from the resume
+            resume_vector: Resume transformed with the shared TF-IDF model,
+                or None to score skills only
+            top_k: Number of results
+
+        Returns:
+            Best fitting jobs first, with matched and missing skills
+        """
+        import numpy as np
+
+        count = self.size
+        if count == 0 or top_k <= 0:
+            return []
+
+        # Match %: share of each job's skills found in the resume
+        columns = [self.skill_columns[s] for s in set(resume_skills) if s in self.skill_columns]
+        match_scores = np.zeros(count)
+        if columns:
+            overlap = self.skills_by_column[:, columns].sum(axis=1)
+            overlap = np.asarray(overlap, dtype=np.float64).ravel()
+            np.divide(overlap * 100, self.job_skill_counts, out=match_scores,
+                      where=self.job_skill_counts > 0)
+            match_scores = np.round(match_scores, 2)
+
+        # Similarity %: cosine of the L2-normalized TF-IDF vectors
+        if resume_vector is not None and resume_vector.nnz and self.vectors.shape[1]:
+            cosine = (resume_vector.astype(np.float32) @ self.vectors.T).toarray().ravel()
+            similarity_scores = np.round(cosine.astype(np.float64) * 100, 2)
+        else:
+            similarity_scores = np.zeros(count)
+
+        overall = match_scores * SKILL_WEIGHT + similarity_scores * TEXT_WEIGHT
+
+        resume_set = set(resume_skills)
+        results = []
+        for row in top_rows(overall, top_k):
+            start, end = self.skills.indptr[row], self.skills.indptr[row + 1]
+            job_skills = {self.skill_names[c] for c in self.skills.indices[start:end]}
+            score = round(float(overall[row]), 2)
+            results.append({
+                "job_id": self.ids[row],
+                "title": self.titles[row],
+                "overall_score": score,
+                "match_percentage": float(match_scores[row]),
+                "similarity_score": float(similarity_scores[row]),
+                "match_level": get_match_level(score),
+                "matched_skills": sorted(job_skills & resume_set),
+                "missing_skills": sorted(job_skills - resume_set),
+            })
+        return results
+
+
+_index = JobIndex()
+_lock = threading.Lock()
+
+
+def get_job_index() -> JobIndex:
+    """
+    Return this worker's job index, refreshed with any new postings
+
+    Threads refresh one at a time and each gets a complete index, which
+    stays valid while they use it.
+    """
+    global _index
+
+    with _lock:
+        _index = _index.refreshed()
+        return _index
+
+
+def match_jobs(resume_text: str, resume_skills: List[str], top_k: int = 10) -> Dict:
+    """
+    Rank every registered job posting for one resume
+
+    Args:
+        resume_text: Extracted resume text
+        resume_skills: Skills extracted from resume_text
+        top_k: Number of results
+
+    Returns:
+        Dictionary with the resume's skills, index size and the top jobs
+    """
+    index = get_job_index()
+    vectorizer = get_vectorizer()
+    resume_vector = vectorizer.transform([resume_text]) if vectorizer is not None else None
+
+    with metrics.stage("job_matching"):
+        results = index.match(resume_skills, resume_vector, top_k)
+
+    return {
+        "resume_skills": resume_skills,
+        "jobs_indexed": index.size,
+        "text_similarity": resume_vector is not None,
+        "results": results,
+    }
@@ -1,19 +1,93 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+import json
+import os
+import re
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import PyPDF2
-import docx
-import io
-from typing import Optional
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from typing import Dict, List, Optional
 
+from app.analysis import AnalysisError, analyze_batch_item
+from app.cache import cache_stats, content_hash, normalize_text
+from app.admission import Overloaded, limiter
+from app.bitmap import MAX_RESULTS
+from app.corpus import MAX_TOP_K
+from app.executor import run_cpu_bound, shutdown_executor, start_executor
+from app.jobs import decode_vector
+from app.matcher import vectorize_text
+from app.metrics import (
+    STARTUP_SECONDS,
+    RequestMetrics,
+    current_request,
+    render_metrics,
+    request_stage,
+)
+from app.pipeline import (
+    analyze_by_hash,
+    analyze_stages,
+    analyze_upload,
+    extract_text_skills,
+    flush_indexes,
+    get_registered_job,
+    match_resume_to_jobs,
+    rank_resumes,
+    register_job,
+    search_resumes,
+)
+from app.recommender import compact_analysis, resource_catalog
 from app.skill_extractor import extract_skills
-from app.matcher import calculate_match, text_similarity
-from app.recommender import get_recommendations
+from app.tasks import (
+    MAX_WAIT_SECONDS,
+    get_task_status,
+    start_task_workers,
+    stop_task_workers,
+    submit_analysis,
+)
+from app.warmup import readiness, record_startup
+
+record_startup(import_seconds=time.perf_counter() - _import_started)
+
+# Maximum number of resumes accepted by /analyze/batch
+MAX_BATCH_FILES = int(os.environ.get("SKILLLENS_MAX_BATCH_FILES", "500"))
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+
+SHA256_PATTERN = re.compile(r'^[0-9a-fA-F]{64}$')
+
+TASK_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# How long clients may reuse the /resources catalog before revalidating
+RESOURCES_MAX_AGE = int(os.environ.get("SKILLLENS_RESOURCES_MAX_AGE", "3600"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start the analysis workers (and load the model in each) before
+    # accepting requests
+    start_executor()
+    state = readiness()
+    STARTUP_SECONDS.set(state["import_seconds"], phase="import")
+    STARTUP_SECONDS.set(state["warmup_seconds"], phase="warmup")
+    print(f"SkillLens AI ready: import {state['import_seconds']}s, "
+          f"warm-up {state['warmup_seconds']}s, spaCy loaded: {state['nlp_loaded']}")
+    start_task_workers()
+    yield
+    await stop_task_workers()
+    await flush_indexes()
+    shutdown_executor()
+
 
 app = FastAPI(
     title="SkillLens AI Service",
     description="AI-powered resume analysis and skill gap detection",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS - Allow frontend to connect
@@ -26,6 +100,57 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Per-stage timings, Server-Timing header and request metrics"""
+    metrics = RequestMetrics(profile=request.query_params.get("profile") == "1")
+    token = current_request.set(metrics)
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["Server-Timing"] = metrics.server_timing()
+        return response
+    finally:
+        current_request.reset(token)
+        endpoint = request.scope.get("endpoint")
+        metrics.finish(endpoint.__name__ if endpoint else "unmatched", status_code)
+
+
+async def admission(request: Request):
+    """
+    Admission control for the CPU-heavy endpoints, see app.admission
+    
+    Holds an analysis slot until the response has been sent, or fails fast
+    with 503 and Retry-After when the server is saturated.
+    """
+    timeout = request.headers.get("x-request-timeout")
+    try:
+        timeout = float(timeout) if timeout else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="X-Request-Timeout must be a number of seconds")
+    
+    try:
+        async with limiter.admit(timeout):
+            yield
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503, detail=e.detail, headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+def response_format(format: str = "full") -> bool:
+    """
+    The ?format= query parameter of the analysis endpoints
+    
+    "compact" replaces the courses of each recommendation with the id of its
+    entry in the /resources catalog, see app.recommender.compact_recommendations.
+    """
+    if format not in ("full", "compact"):
+        raise HTTPException(status_code=400, detail='format must be "full" or "compact"')
+    return format == "compact"
+
+
 @app.get("/")
 def home():
     return {
@@ -37,20 +162,93 @@ def home():
 
 @app.get("/health")
 def health_check():
+    """Liveness: the process is up and serving requests"""
     return {"status": "healthy"}
 
 
-@app.post("/analyze")
+@app.get("/ready")
+def readiness_check():
+    """Readiness: workers warmed up and models loaded"""
+    state = readiness()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics: per-stage latency, document sizes, skill counts, errors"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Hit, miss and eviction counters of the analysis caches"""
+    return {"success": True, "caches": cache_stats()}
+
+
+@app.get("/resources")
+def get_resources(request: Request):
+    """
+    Learning resource catalog referenced by compact analysis responses
+    
+    Returns:
+    - resources: the courses and priority of each resource id
+    - generic: courses for skills without a resource id; in each field,
+      {skill} stands for the skill name and {query} for the name with
+      spaces replaced by "+"
+    
+    Served with an ETag and Cache-Control, so clients fetch it once and
+    then revalidate with If-None-Match (304 while unchanged).
+    """
+    body, etag = resource_catalog()
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={RESOURCES_MAX_AGE}"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def resolve_job(job_description: Optional[str], job_id: Optional[str]) -> Optional[Dict]:
+    """
+    Check that exactly one of job_description and job_id was sent
+    
+    Returns:
+    - The registered posting for job_id, or None when raw text was sent
+    """
+    
+    if (job_description is None) == (job_id is None):
+        raise HTTPException(status_code=400, detail="Send either job_description or job_id")
+    if job_id is None:
+        return None
+    if not SHA256_PATTERN.match(job_id):
+        raise HTTPException(status_code=400, detail="job_id must be a SHA-256 hex digest")
+    
+    try:
+        return await get_registered_job(job_id)
+    except AnalysisError as ae:
+        raise HTTPException(status_code=ae.status_code, detail=ae.detail)
+
+
+@app.post("/analyze", dependencies=[Depends(admission)])
 async def analyze_resume(
     resume: UploadFile = File(...),
-    job_description: str = Form(...)
+    job_description: Optional[str] = Form(None),
+    job_id: Optional[str] = Form(None),
+    compact: bool = Depends(response_format)
 ):
     """
     Main endpoint for resume analysis
     
     Parameters:
     - resume: PDF or DOCX file
-    - job_description: Text input of job posting
+    - job_description: Text input of job posting; runs of whitespace,
+      including line breaks, are collapsed to single spaces before it is
+      analyzed, as for registered postings
+    - job_id: Or the id of a posting registered with /jobs
+    - format (query): "compact" to reference learning resources by id in
+      the /resources catalog instead of embedding their courses
     
     Returns:
     - Skill match analysis
@@ -60,53 +258,305 @@ async def analyze_resume(
     
     try:
         # Validate file type
-        if not resume.filename.endswith(('.pdf', '.docx')):
+        if not resume.filename.endswith(SUPPORTED_EXTENSIONS):
             raise HTTPException(
                 status_code=400, 
                 detail="Only PDF and DOCX files are supported"
             )
         
-        # Extract text from resume
+        job = await resolve_job(job_description, job_id)
+        
+        with request_stage("upload_read"):
+            file_bytes = await resume.read()
+        
+        # Parsing, skill extraction and scoring run in the executor so the
+        # event loop stays free for other requests; repeats hit the cache
+        analysis = await analyze_upload(resume.filename, file_bytes, job_description, job)
+        
+        return JSONResponse(content={
+            "success": True,
+            "resume_sha256": content_hash(file_bytes),
+            "data": compact_analysis(analysis) if compact else analysis
+        })
+        
+    except AnalysisError as ae:
+        raise HTTPException(status_code=ae.status_code, detail=ae.detail)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+
+def encode_event(event: str, payload: Dict, ndjson: bool = False) -> bytes:
+    """One streamed stage, as a server-sent event or an NDJSON line"""
+    if ndjson:
+        return (json.dumps({"event": event, "data": payload}) + "\n").encode("utf-8")
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+
+
+@app.post("/analyze/stream", dependencies=[Depends(admission)])
+async def analyze_resume_stream(
+    request: Request,
+    resume: UploadFile = File(...),
+    job_description: Optional[str] = Form(None),
+    job_id: Optional[str] = Form(None),
+    compact: bool = Depends(response_format)
+):
+    """
+    Resume analysis that streams each stage's output as soon as it is ready
+    
+    Takes the same parameters as /analyze, including format. The response is a stream of
+    server-sent events, or NDJSON lines ({"event": ..., "data": ...}) when
+    the request sends "Accept: application/x-ndjson".
+    
+    Events, in order:
+    - text: resume_sha256 and the size of the extracted text
+    - resume_skills: the skills found by pattern matching (complete: false),
+      then the full list (complete: true)
+    - job_skills, match, similarity, recommendations
+    - result: the same data as /analyze
+    - error: status_code and detail, if the analysis fails midway
+    """
+    
+    if not resume.filename.endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Only PDF and DOCX files are supported")
+    
+    job = await resolve_job(job_description, job_id)
+    ndjson = "application/x-ndjson" in request.headers.get("accept", "")
+    
+    # The resume is parsed before the response starts, so an unreadable
+    # file still gets a plain HTTP error
+    try:
         file_bytes = await resume.read()
+        stages = analyze_stages(resume.filename, file_bytes, job_description, job)
+        first = await stages.__anext__()
+    except AnalysisError as ae:
+        raise HTTPException(status_code=ae.status_code, detail=ae.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+    
+    async def body():
+        yield encode_event(*first, ndjson=ndjson)
+        try:
+            async for event, payload in stages:
+                if compact and event in ("recommendations", "result"):
+                    payload = compact_analysis(payload)
+                yield encode_event(event, payload, ndjson)
+        except AnalysisError as ae:
+            yield encode_event("error", {"status_code": ae.status_code, "detail": ae.detail}, ndjson)
+        except Exception as e:
+            yield encode_event("error", {"status_code": 500, "detail": f"Analysis failed: {str(e)}"}, ndjson)
+    
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson" if ndjson else "text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/analyze/async", status_code=202)
+async def analyze_resume_async(
+    resume: UploadFile = File(...),
+    job_description: Optional[str] = Form(None),
+    job_id: Optional[str] = Form(None)
+):
+    """
+    Queue a resume analysis and return at once
+    
+    Takes the same parameters as /analyze. Poll /tasks/{task_id} for the
+    result.
+    
+    Returns:
+    - task_id and the number of analyses queued ahead of it
+    """
+    
+    if not resume.filename.endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Only PDF and DOCX files are supported")
+    
+    # Unknown postings are reported now rather than when the task runs
+    await resolve_job(job_description, job_id)
+    
+    try:
+        file_bytes = await resume.read()
+        task = await submit_analysis(resume.filename, file_bytes, job_description, job_id)
+        return JSONResponse(status_code=202, content={
+            "success": True,
+            "resume_sha256": content_hash(file_bytes),
+            **task
+        })
+    except AnalysisError as ae:
+        raise HTTPException(status_code=ae.status_code, detail=ae.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not queue analysis: {str(e)}")
+
+
+@app.get("/tasks/{task_id}")
+async def get_task(task_id: str, wait: float = 0.0, compact: bool = Depends(response_format)):
+    """
+    Status of a queued analysis
+    
+    Parameters:
+    - task_id: Id returned by /analyze/async
+    - wait: Seconds (up to 25) to wait for the analysis to finish
+    - format: "compact" for the compact analysis format of /analyze
+    
+    Returns:
+    - status ("queued", "running", "done" or "failed"), with the analysis
+      in data once done or the error once failed
+    """
+    
+    if not TASK_ID_PATTERN.match(task_id):
+        raise HTTPException(status_code=400, detail="task_id must be 32 hex digits")
+    if not 0 <= wait <= MAX_WAIT_SECONDS:
+        raise HTTPException(status_code=400, detail=f"wait must be between 0 and {MAX_WAIT_SECONDS:g}")
+    
+    try:
+        task = await get_task_status(task_id, wait)
+    except AnalysisError as ae:
+        raise HTTPException(status_code=ae.status_code, detail=ae.detail)
+    
+    content = {"success": task["status"] != "failed", "task_id": task_id, "status": task["status"]}
+    if task["status"] == "queued":
+        content["position"] = task["position"]
+    elif task["status"] == "done":
+        content["data"] = compact_analysis(task["result"]) if compact else task["result"]
+    elif task["status"] == "failed":
+        content["error"] = task["error"]
+        content["error_status"] = task["error_status"]
+    return JSONResponse(content=content)
+
+
+@app.post("/analyze/by-hash", dependencies=[Depends(admission)])
+async def analyze_resume_by_hash(
+    resume_sha256: str = Form(...),
+    job_description: Optional[str] = Form(None),
+    job_id: Optional[str] = Form(None),
+    compact: bool = Depends(response_format)
+):
+    """
+    Analyze a previously uploaded resume without re-sending the file
+    
+    Parameters:
+    - resume_sha256: SHA-256 hex digest of the resume file bytes
+    - job_description: Text input of job posting
+    - job_id: Or the id of a posting registered with /jobs
+    - format (query): "compact", as for /analyze
+    
+    Returns:
+    - The /analyze response if the resume is known
+    - 404 with upload_required if the client must upload it to /analyze
+    """
+    
+    if not SHA256_PATTERN.match(resume_sha256):
+        raise HTTPException(status_code=400, detail="resume_sha256 must be a SHA-256 hex digest")
+    
+    job = await resolve_job(job_description, job_id)
+    
+    try:
+        analysis = await analyze_by_hash(resume_sha256, job_description, job)
         
-        if resume.filename.endswith('.pdf'):
-            resume_text = extract_text_from_pdf(file_bytes)
-        else:
-            resume_text = extract_text_from_docx(file_bytes)
+        return JSONResponse(content={
+            "success": True,
+            "resume_sha256": resume_sha256.lower(),
+            "data": compact_analysis(analysis) if compact else analysis
+        })
         
-        # Validate extracted text
-        if len(resume_text.strip()) < 50:
+    except AnalysisError as ae:
+        if ae.status_code == 404:
+            return JSONResponse(status_code=404, content={
+                "success": False,
+                "upload_required": True,
+                "detail": ae.detail
+            })
+        raise HTTPException(status_code=ae.status_code, detail=ae.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+
+@app.post("/analyze/batch", dependencies=[Depends(admission)])
+async def analyze_resume_batch(
+    resumes: List[UploadFile] = File(...),
+    job_description: Optional[str] = Form(None),
+    job_id: Optional[str] = Form(None),
+    compact: bool = Depends(response_format)
+):
+    """
+    Analyze many resumes against one job description
+    
+    The job description's skills and TF-IDF vector are computed once and
+    shared by every resume; resumes are parsed and scored in parallel in the executor.
+    
+    Parameters:
+    - resumes: PDF or DOCX files
+    - job_description: Text input of job posting
+    - job_id: Or the id of a posting registered with /jobs
+    - format (query): "compact", as for /analyze
+    
+    Returns:
+    - Per-resume results in the /analyze shape, best match first
+    """
+    
+    try:
+        if len(resumes) > MAX_BATCH_FILES:
             raise HTTPException(
                 status_code=400,
-                detail="Resume text is too short or could not be extracted properly"
+                detail=f"At most {MAX_BATCH_FILES} resumes can be analyzed per batch"
             )
         
-        # Extract skills from both documents
-        resume_skills = extract_skills(resume_text)
-        job_skills = extract_skills(job_description)
+        job = await resolve_job(job_description, job_id)
+        if job is not None:
+            job_description = job["text"]
+            job_skills = job["skills"]
+            job_vector = await run_cpu_bound(decode_vector, job)
+        else:
+            # Normalized like the job descriptions sent to /analyze
+            job_description = normalize_text(job_description)
+            job_skills = await run_cpu_bound(extract_skills, job_description)
+            job_vector = None
+        if job_vector is None:
+            job_vector = await run_cpu_bound(vectorize_text, job_description)
+        
+        tasks = []
+        for resume in resumes:
+            if not resume.filename.endswith(SUPPORTED_EXTENSIONS):
+                tasks.append(asyncio.sleep(0, result={
+                    "filename": resume.filename,
+                    "success": False,
+                    "error": "Only PDF and DOCX files are supported"
+                }))
+                continue
+            
+            with request_stage("upload_read"):
+                file_bytes = await resume.read()
+            tasks.append(run_cpu_bound(
+                analyze_batch_item, resume.filename, file_bytes,
+                job_description, job_skills, job_vector
+            ))
+        
+        results = await asyncio.gather(*tasks)
         
-        # Calculate matching
-        match_result = calculate_match(resume_skills, job_skills)
-        similarity_score = text_similarity(resume_text, job_description)
+        # Best match first, failed files last
+        results.sort(key=lambda r: (
+            r["success"],
+            r["data"]["match_percentage"] if r["success"] else 0.0,
+            r["data"]["similarity_score"] if r["success"] else 0.0
+        ), reverse=True)
         
-        # Get learning recommendations for missing skills
-        recommendations = get_recommendations(match_result["missing_skills"])
+        succeeded = sum(1 for r in results if r["success"])
+        if compact:
+            for r in results:
+                if r["success"]:
+                    r["data"] = compact_analysis(r["data"])
         
         return JSONResponse(content={
             "success": True,
             "data": {
-                "resume_skills": resume_skills,
                 "job_skills": job_skills,
-                "matched_skills": match_result["matched_skills"],
-                "missing_skills": match_result["missing_skills"],
-                "match_percentage": match_result["match_percentage"],
-                "similarity_score": similarity_score,
-                "recommendations": recommendations,
-                "analysis_summary": {
-                    "total_job_skills": len(job_skills),
-                    "total_resume_skills": len(resume_skills),
-                    "matched_count": len(match_result["matched_skills"]),
-                    "missing_count": len(match_result["missing_skills"])
+                "results": results,
+                "summary": {
+                    "total": len(results),
+                    "succeeded": succeeded,
+                    "failed": len(results) - succeeded
                 }
             }
         })
@@ -114,40 +564,170 @@ async def analyze_resume(
     except HTTPException as he:
         raise he
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch analysis failed: {str(e)}")
+
+
+@app.post("/rank", dependencies=[Depends(admission)])
+async def rank_candidates(
+    job_description: str = Form(...),
+    top_k: int = Form(10)
+):
+    """
+    Rank every analyzed resume against a job description
+    
+    Scores use the weighting of advanced_match_score (60% skill match, 40%
+    text similarity) and are computed for the whole corpus at once.
+    
+    Parameters:
+    - job_description: Text input of job posting
+    - top_k: Number of candidates to return
+    
+    Returns:
+    - Best matching resumes by SHA-256, with their scores and skill gaps
+    """
+    
+    if not 1 <= top_k <= MAX_TOP_K:
+        raise HTTPException(status_code=400, detail=f"top_k must be between 1 and {MAX_TOP_K}")
+    
+    try:
+        ranking = await rank_resumes(job_description, top_k)
+        return JSONResponse(content={"success": True, "data": ranking})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ranking failed: {str(e)}")
 
 
-def extract_text_from_pdf(file_bytes: bytes) -> str:
-    """Extract text from PDF file"""
+@app.post("/candidates/search")
+async def search_candidates(
+    query: Optional[str] = Form(None),
+    match_skills: Optional[str] = Form(None),
+    min_match: float = Form(0.0),
+    limit: int = Form(100)
+):
+    """
+    Search every analyzed resume by skills
+    
+    Parameters:
+    - query: Boolean skill expression, e.g. "python AND (kubernetes OR docker) AND NOT java"
+    - match_skills: Comma-separated skills to compute the match percentage on
+    - min_match: Lowest match percentage (0-100) to return
+    - limit: Number of resumes to return
+    
+    Returns:
+    - Number of matching resumes and the first results by SHA-256, best
+      match first when match_skills is given
+    """
+    
+    skills = [s.strip() for s in match_skills.split(",") if s.strip()] if match_skills else []
+    if not query and not skills:
+        raise HTTPException(status_code=400, detail="Send a query or match_skills")
+    if not 0 <= min_match <= 100:
+        raise HTTPException(status_code=400, detail="min_match must be between 0 and 100")
+    if not 1 <= limit <= MAX_RESULTS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_RESULTS}")
+    
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        found = await search_resumes(query, skills, min_match, limit)
+        return JSONResponse(content={"success": True, "data": found})
+    except AnalysisError as ae:
+        raise HTTPException(status_code=ae.status_code, detail=ae.detail)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"PDF extraction failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 
-def extract_text_from_docx(file_bytes: bytes) -> str:
-    """Extract text from DOCX file"""
+@app.post("/jobs", dependencies=[Depends(admission)])
+async def register_job_posting(
+    job_description: str = Form(...),
+    title: Optional[str] = Form(None)
+):
+    """
+    Register a job posting for matching against resumes
+    
+    Parameters:
+    - job_description: Text input of job posting
+    - title: Optional title shown in match results
+    
+    Returns:
+    - job_id (SHA-256 of the normalized text) and the extracted skills
+    """
+    
     try:
-        doc = docx.Document(io.BytesIO(file_bytes))
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
+        job = await register_job(job_description, title)
+        return JSONResponse(content={"success": True, "job_id": job["job_id"], "data": job})
+    except AnalysisError as ae:
+        raise HTTPException(status_code=ae.status_code, detail=ae.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Job registration failed: {str(e)}")
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_posting(job_id: str):
+    """
+    Look up a registered job posting
+    
+    Returns:
+    - The posting's title and extracted skills
+    """
+    
+    job = await resolve_job(None, job_id)
+    return {
+        "success": True,
+        "job_id": job["sha256"],
+        "data": {"job_id": job["sha256"], "title": job["title"], "job_skills": job["skills"]}
+    }
+
+
+@app.post("/jobs/match", dependencies=[Depends(admission)])
+async def match_jobs_for_resume(
+    resume: UploadFile = File(...),
+    top_k: int = Form(10)
+):
+    """
+    Find the best fitting registered job postings for one resume
+    
+    Parameters:
+    - resume: PDF or DOCX file
+    - top_k: Number of jobs to return
+    
+    Returns:
+    - Best fitting jobs with match percentage, similarity and skill gaps
+    """
+    
+    if not 1 <= top_k <= MAX_TOP_K:
+        raise HTTPException(status_code=400, detail=f"top_k must be between 1 and {MAX_TOP_K}")
+    
+    try:
+        if not resume.filename.endswith(SUPPORTED_EXTENSIONS):
+            raise HTTPException(
+                status_code=400,
+                detail="Only PDF and DOCX files are supported"
+            )
+        
+        with request_stage("upload_read"):
+            file_bytes = await resume.read()
+        
+        matches = await match_resume_to_jobs(resume.filename, file_bytes, top_k)
+        
+        return JSONResponse(content={
+            "success": True,
+            "resume_sha256": content_hash(file_bytes),
+            "data": matches
+        })
+        
+    except AnalysisError as ae:
+        raise HTTPException(status_code=ae.status_code, detail=ae.detail)
+    except HTTPException as he:
+        raise he
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"DOCX extraction failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Job matching failed: {str(e)}")
 
 
-@app.post("/extract-skills")
+@app.post("/extract-skills", dependencies=[Depends(admission)])
 async def extract_skills_endpoint(text: str = Form(...)):
     """
     Endpoint to extract skills from any text
     """
     try:
-        skills = extract_skills(text)
+        skills = await extract_text_skills(text)
         return {
             "success": True,
             "skills": skills,
@@ -1,7 +1,13 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from typing import List, Dict
 
+from app.document import Document
+from app.skill_extractor import extract_document_skills
+from app.vectorizer import build_ngram_vectorizer, get_vectorizer
+
+# Weights of the overall match score
+SKILL_WEIGHT = 0.6
+TEXT_WEIGHT = 0.4
+
 
 def calculate_match(resume_skills: List[str], job_skills: List[str]) -> Dict:
     """
@@ -43,34 +49,59 @@ def calculate_match(resume_skills: List[str], job_skills: List[str]) -> Dict:
     }
 
 
-def text_similarity(resume_text: str, job_text: str) -> float:
+def vectorize_text(text: str):
+    """
+    Transform text with the shared TF-IDF model
+
+    Args:
+        text: Text to vectorize
+
+    Returns:
+        L2-normalized sparse row vector, or None if no model has been fitted
+    """
+    return Document(text).vector()
+
+
+def document_similarity(resume: Document, job: Document, job_vector=None) -> float:
     """
     Calculate text similarity using TF-IDF and Cosine Similarity
     
+    Uses the shared corpus model from app.vectorizer when one has been
+    fitted, so only the documents' vectors are computed. Without a model, a
+    vectorizer is fitted on the two documents' n-grams.
+    
     Args:
-        resume_text: Full resume text
-        job_text: Full job description text
+        resume: Resume document
+        job: Job description document
+        job_vector: job already transformed with vectorize_text, if known
         
     Returns:
         Similarity score as percentage (0-100)
     """
     
     try:
-        # Create TF-IDF vectors
-        vectorizer = TfidfVectorizer(
-            max_features=500,
-            stop_words='english',
-            ngram_range=(1, 2)  # Consider unigrams and bigrams
-        )
-        
-        # Fit and transform both texts
-        tfidf_matrix = vectorizer.fit_transform([resume_text, job_text])
+        vectorizer = get_vectorizer()
         
-        # Calculate cosine similarity
-        similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
+        if vectorizer is not None:
+            resume_vector = resume.vector(vectorizer)
+            if job_vector is None:
+                job_vector = job.vector(vectorizer)
+            # Rows are L2-normalized, so the dot product is the cosine
+            similarity = resume_vector.multiply(job_vector).sum()
+        else:
+            # Create TF-IDF vectors
+            vectorizer = build_ngram_vectorizer()
+            
+            # Fit and transform both documents
+            tfidf_matrix = vectorizer.fit_transform([resume.ngrams, job.ngrams])
+            
+            # Calculate cosine similarity
+            from sklearn.metrics.pairwise import cosine_similarity
+
+            similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
         
         # Convert to percentage
-        similarity_percentage = similarity * 100
+        similarity_percentage = float(similarity) * 100
         
         return round(similarity_percentage, 2)
     
@@ -79,51 +110,97 @@ def text_similarity(resume_text: str, job_text: str) -> float:
         return 0.0
 
 
-def advanced_match_score(resume_skills: List[str], job_skills: List[str], 
-                         resume_text: str, job_text: str) -> Dict:
+def text_similarity(resume_text: str, job_text: str, job_vector=None) -> float:
     """
-    Calculate comprehensive match score combining multiple factors
+    Calculate text similarity using TF-IDF and Cosine Similarity
     
     Args:
-        resume_skills: List of skills from resume
-        job_skills: List of skills from job description
         resume_text: Full resume text
         job_text: Full job description text
+        job_vector: job_text already transformed with vectorize_text, if known
+        
+    Returns:
+        Similarity score as percentage (0-100)
+    """
+    return document_similarity(Document(resume_text), Document(job_text), job_vector)
+
+
+def document_match_score(resume: Document, job: Document) -> Dict:
+    """
+    Calculate comprehensive match score combining multiple factors
+    
+    Skills are extracted from whichever document has none yet, in one batch.
+    
+    Args:
+        resume: Resume document
+        job: Job description document
         
     Returns:
         Dictionary with detailed scoring breakdown
     """
     
+    resume_skills, job_skills = extract_document_skills([resume, job])
+    
     # Basic skill match
     skill_match = calculate_match(resume_skills, job_skills)
     
     # Text similarity
-    text_sim = text_similarity(resume_text, job_text)
+    text_sim = document_similarity(resume, job)
     
     # Weighted overall score (60% skills, 40% text similarity)
-    overall_score = (skill_match["match_percentage"] * 0.6) + (text_sim * 0.4)
-    
-    # Determine match level
-    if overall_score >= 80:
-        match_level = "Excellent Match"
-    elif overall_score >= 60:
-        match_level = "Good Match"
-    elif overall_score >= 40:
-        match_level = "Fair Match"
-    else:
-        match_level = "Poor Match"
+    overall_score = (skill_match["match_percentage"] * SKILL_WEIGHT) + (text_sim * TEXT_WEIGHT)
     
     return {
         "overall_score": round(overall_score, 2),
         "skill_match_score": skill_match["match_percentage"],
         "text_similarity_score": text_sim,
-        "match_level": match_level,
+        "match_level": get_match_level(overall_score),
         "matched_skills": skill_match["matched_skills"],
         "missing_skills": skill_match["missing_skills"],
         "recommendation": get_match_recommendation(overall_score)
     }
 
 
+def advanced_match_score(resume_skills: List[str], job_skills: List[str], 
+                         resume_text: str, job_text: str) -> Dict:
+    """
+    Calculate comprehensive match score combining multiple factors
+    
+    Args:
+        resume_skills: List of skills from resume
+        job_skills: List of skills from job description
+        resume_text: Full resume text
+        job_text: Full job description text
+        
+    Returns:
+        Dictionary with detailed scoring breakdown
+    """
+    return document_match_score(
+        Document(resume_text, resume_skills), Document(job_text, job_skills)
+    )
+
+
+def get_match_level(score: float) -> str:
+    """
+    Describe an overall match score
+    
+    Args:
+        score: Overall match score
+        
+    Returns:
+        Match level label
+    """
+    
+    if score >= 80:
+        return "Excellent Match"
+    elif score >= 60:
+        return "Good Match"
+    elif score >= 40:
+        return "Fair Match"
+    else:
+        return "Poor Match"
+
+
 def get_match_recommendation(score: float) -> str:
     """
     Provide recommendation based on match score
@@ -0,0 +1,312 @@
+import cProfile
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Setting SKILLLENS_PROFILE_DIR lets a request ask for a cProfile dump of
+# its CPU-bound work with ?profile=1; the .prof files are written there
+PROFILE_DIR = os.environ.get("SKILLLENS_PROFILE_DIR", "")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+PAGE_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+BYTE_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000,
+                2_500_000, 5_000_000, 10_000_000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + inner + "}"
+
+
+class Counter:
+    """Monotonic counter in the Prometheus text format"""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus text format"""
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(
+                        f"{self.name}_bucket{_format_labels(key + (('le', le),))} {cumulative}"
+                    )
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+REGISTRY: List[Any] = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+REQUESTS = register(Counter(
+    "skilllens_requests_total", "Requests handled, by endpoint and status code"))
+ERRORS = register(Counter(
+    "skilllens_errors_total", "Requests that failed, by endpoint and status code"))
+REQUEST_SECONDS = register(Histogram(
+    "skilllens_request_duration_seconds", "End-to-end request latency", LATENCY_BUCKETS))
+STAGE_SECONDS = register(Histogram(
+    "skilllens_stage_duration_seconds", "Time spent in each analysis stage", LATENCY_BUCKETS))
+DOCUMENT_PAGES = register(Histogram(
+    "skilllens_document_pages", "Pages extracted per PDF", PAGE_BUCKETS))
+PDF_PAGE_SECONDS = register(Histogram(
+    "skilllens_pdf_page_duration_seconds", "Text extraction time of each PDF page", LATENCY_BUCKETS))
+DOCUMENT_BYTES = register(Histogram(
+    "skilllens_document_bytes", "Size of parsed resume files", BYTE_BUCKETS))
+SKILLS_FOUND = register(Histogram(
+    "skilllens_skills_found", "Skills extracted per text", COUNT_BUCKETS))
+STARTUP_SECONDS = register(Gauge(
+    "skilllens_startup_seconds", "Time spent in each startup phase"))
+PROCESS_MEMORY = register(Gauge(
+    "skilllens_process_memory_bytes", "Memory of the process serving the scrape, by kind"))
+ADMISSION_ACTIVE = register(Gauge(
+    "skilllens_admission_active", "Requests holding an analysis slot"))
+ADMISSION_QUEUE_DEPTH = register(Gauge(
+    "skilllens_admission_queue_depth", "Requests waiting for an analysis slot"))
+ADMISSION_REJECTED = register(Counter(
+    "skilllens_admission_rejected_total", "Requests refused by admission control, by reason"))
+ADMISSION_WAIT_SECONDS = register(Histogram(
+    "skilllens_admission_wait_seconds", "Time requests waited for an analysis slot",
+    LATENCY_BUCKETS))
+TASKS = register(Counter(
+    "skilllens_tasks_total", "Asynchronous analyses finished, by status"))
+TASK_QUEUE_SECONDS = register(Histogram(
+    "skilllens_task_queue_seconds", "Time asynchronous analyses waited in the queue",
+    LATENCY_BUCKETS))
+
+_OBSERVATIONS = {
+    "document_pages": DOCUMENT_PAGES,
+    "pdf_page_seconds": PDF_PAGE_SECONDS,
+    "document_bytes": DOCUMENT_BYTES,
+    "skills_found": SKILLS_FOUND,
+}
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, int]:
+    """
+    Memory use of a process, in bytes (Linux only, empty elsewhere)
+
+    Returns:
+        rss (resident), pss (resident, with pages shared by several
+        processes divided among them), shared and private
+    """
+    path = f"/proc/{pid or 'self'}/smaps_rollup"
+    values: Dict[str, int] = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if rest.strip().endswith("kB"):
+                    values[name] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError):
+        return {}
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "shared": values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0),
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    for kind, value in process_memory().items():
+        PROCESS_MEMORY.set(value, kind=kind)
+
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Stage timings and observations of the code running in this context. Set
+# around every CPU-bound call, in whichever process runs it.
+_collector: ContextVar[Optional[Dict]] = ContextVar("skilllens_collector", default=None)
+
+
+def _new_collector() -> Dict:
+    return {"stages": {}, "values": {}}
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block of code as the named stage of the current request"""
+    collector = _collector.get()
+    if collector is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = collector["stages"]
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - started
+
+
+def observe(name: str, value: float) -> None:
+    """Record a value (page count, byte size, ...) for the current request"""
+    collector = _collector.get()
+    if collector is not None:
+        collector["values"].setdefault(name, []).append(value)
+
+
+def collect(func: Callable, args: Tuple, profile_path: Optional[str] = None) -> Tuple[Any, Dict]:
+    """
+    Call func and return its result along with the stages it recorded
+
+    Runs in the executor worker; with profile_path, the call is profiled
+    and the stats are dumped to that file.
+    """
+    token = _collector.set(_new_collector())
+    try:
+        if profile_path:
+            profiler = cProfile.Profile()
+            try:
+                result = profiler.runcall(func, *args)
+            finally:
+                profiler.dump_stats(profile_path)
+        else:
+            result = func(*args)
+        return result, _collector.get()
+    finally:
+        _collector.reset(token)
+
+
+class RequestMetrics:
+    """Stage timings gathered while handling one request"""
+
+    def __init__(self, profile: bool = False):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.values: Dict[str, List[float]] = {}
+        self.profile_prefix = None
+        self._profiles = 0
+        if profile and PROFILE_DIR:
+            Path(PROFILE_DIR).mkdir(parents=True, exist_ok=True)
+            self.profile_prefix = str(Path(PROFILE_DIR) / f"{int(time.time() * 1000)}-{os.getpid()}")
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def merge(self, collected: Dict) -> None:
+        for name, seconds in collected["stages"].items():
+            self.add_stage(name, seconds)
+        for name, values in collected["values"].items():
+            self.values.setdefault(name, []).extend(values)
+
+    def profile_path(self, func: Callable) -> Optional[str]:
+        if self.profile_prefix is None:
+            return None
+        self._profiles += 1
+        return f"{self.profile_prefix}-{self._profiles}-{func.__name__}.prof"
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+    def finish(self, endpoint: str, status_code: int) -> None:
+        """Record this request in the process-wide metrics"""
+        status = str(status_code)
+        REQUESTS.inc(endpoint=endpoint, status=status)
+        if status_code >= 400:
+            ERRORS.inc(endpoint=endpoint, status=status)
+        REQUEST_SECONDS.observe(time.perf_counter() - self.started, endpoint=endpoint)
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.observe(seconds, stage=name)
+        for name, values in self.values.items():
+            histogram = _OBSERVATIONS.get(name)
+            if histogram is not None:
+                for value in values:
+                    histogram.observe(value)
+
+
+# Metrics of the request being handled, set by the middleware in app.main
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar(
+    "skilllens_request", default=None
+)
+
+
+@contextmanager
+def request_stage(name: str) -> Iterator[None]:
+    """Time a block of code in the request handler itself (e.g. upload read)"""
+    request = current_request.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if request is not None:
+            request.add_stage(name, time.perf_counter() - started)
@@ -0,0 +1,489 @@
+import io
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import re
+import threading
+import time
+import zipfile
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from xml.parsers import expat
+
+from app import metrics
+from app.errors import AnalysisError
+
+logger = logging.getLogger(__name__)
+
+# Limits for PDF ingestion
+PDF_MAX_BYTES = int(os.environ.get("SKILLLENS_PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.environ.get("SKILLLENS_PDF_MAX_PAGES", "50"))
+
+# Stop reading pages once this much text has been collected
+PDF_MAX_CHARS = int(os.environ.get("SKILLLENS_PDF_MAX_CHARS", "200000"))
+
+# Wall-clock budget for one document, in seconds
+PDF_TIME_BUDGET = float(os.environ.get("SKILLLENS_PDF_TIME_BUDGET", "15"))
+
+# Every PDF is extracted in a long-lived child process, which is killed if
+# the document runs past its time budget. Each process keeps at most
+# PDF_CHILDREN of them; a document waits (within its budget) for a free one.
+PDF_CHILDREN = int(os.environ.get("SKILLLENS_PDF_CHILDREN", "4"))
+
+# Documents with at least this many pages are split across up to
+# PDF_PARALLEL_WORKERS children (no more than there are CPUs), using only
+# children that are idle, so under load extraction stays sequential. Each
+# extra child is sent the file once and parses it again (about two pages'
+# worth of work), which shorter documents don't make up for.
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("SKILLLENS_PDF_PARALLEL_MIN_PAGES", "16"))
+PDF_PARALLEL_WORKERS = int(os.environ.get("SKILLLENS_PDF_PARALLEL_WORKERS", "4"))
+PDF_PAGES_PER_TASK = 4
+
+# Limit on the uncompressed size of the XML parts read from a DOCX
+DOCX_MAX_XML_BYTES = int(os.environ.get("SKILLLENS_DOCX_MAX_XML_BYTES", str(50 * 1024 * 1024)))
+
+_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main "
+_W_P = _W + "p"
+_W_R = _W + "r"
+_W_T = _W + "t"
+_W_TAB = _W + "tab"
+_W_LINE_BREAKS = (_W + "br", _W + "cr")
+_MC_FALLBACK = "http://schemas.openxmlformats.org/markup-compatibility/2006 Fallback"
+_DOCX_EXTRA_PARTS = re.compile(r'^word/(header\d*|footer\d*|footnotes|endnotes)\.xml$')
+
+
+def _open_pdf(file_bytes: bytes):
+    # Imported here so PyPDF2 only loads when a PDF is actually parsed
+    import PyPDF2
+
+    return PyPDF2.PdfReader(io.BytesIO(file_bytes))
+
+
+def iter_pdf_pages(file_bytes: bytes, start: int = 0,
+                   stop: Optional[int] = None) -> Iterator[Tuple[int, str, float]]:
+    """
+    Extract PDF pages one at a time
+
+    Args:
+        file_bytes: Raw PDF contents
+        start: Index of the first page
+        stop: Index after the last page (defaults to the end of the document)
+
+    Yields:
+        (page index, page text, extraction time in seconds)
+    """
+    return _read_pages(_open_pdf(file_bytes), start, stop)
+
+
+def _read_pages(reader, start: int, stop: Optional[int]) -> Iterator[Tuple[int, str, float]]:
+    pages = reader.pages
+    stop = len(pages) if stop is None else min(stop, len(pages))
+    for index in range(start, stop):
+        started = time.perf_counter()
+        text = pages[index].extract_text() or ""
+        yield index, text, time.perf_counter() - started
+
+
+def _extraction_child(conn) -> None:
+    """
+    Main loop of a PDF extraction child
+
+    Requests are ("open", file_bytes), answered with the page count, and
+    ("pages", start, stop), answered with iter_pdf_pages output for the
+    last opened file. Answers are ("ok", value) or ("error", message). The
+    child exits when the parent closes its end of the pipe.
+    """
+    reader = None
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            if request[0] == "open":
+                reader = None
+                reader = _open_pdf(request[1])
+                conn.send(("ok", len(reader.pages)))
+            else:
+                _, start, stop = request
+                conn.send(("ok", list(_read_pages(reader, start, stop))))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+def _child_context():
+    # The calling worker may be multithreaded (thread executor, prefork
+    # server), so children are never plainly forked from it
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class _ExtractionChild:
+    """One extraction child process and the parent's end of its pipe"""
+
+    def __init__(self):
+        context = _child_context()
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_extraction_child, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.busy = False
+
+    def send(self, request: Tuple) -> None:
+        self.conn.send(request)
+        self.busy = True
+
+    def receive(self) -> Any:
+        status, value = self.conn.recv()
+        self.busy = False
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+    def call(self, request: Tuple, deadline: float) -> Any:
+        """Send a request and wait for its answer until deadline"""
+        self.send(request)
+        if not self.conn.poll(max(deadline - time.monotonic(), 0)):
+            raise multiprocessing.TimeoutError()
+        return self.receive()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class _ExtractionPool:
+    """
+    The extraction children of this process
+
+    Children are started on first use and reused across documents. A
+    child still busy when its document's deadline passes is killed and
+    replaced later, so a pathological page never holds up the next
+    document.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.idle: List[_ExtractionChild] = []
+        self.count = 0
+        self.available = threading.Condition()
+        self.pid = os.getpid()
+
+    def _check_fork(self) -> None:
+        # Children and pipes inherited from a parent process are not ours
+        if self.pid != os.getpid():
+            self.idle = []
+            self.count = 0
+            self.pid = os.getpid()
+
+    def acquire(self, deadline: float) -> _ExtractionChild:
+        """
+        Take a child, waiting until deadline for one to be free
+
+        Raises:
+            multiprocessing.TimeoutError: If no child frees up in time
+        """
+        while True:
+            with self.available:
+                self._check_fork()
+                while not self.idle and self.count >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self.available.wait(remaining):
+                        raise multiprocessing.TimeoutError()
+            # Another document may take the free child first
+            children = self.take_idle(1)
+            if children:
+                return children[0]
+
+    def take_idle(self, wanted: int) -> List[_ExtractionChild]:
+        """Take up to wanted children without waiting, starting new ones if under the limit"""
+        children: List[_ExtractionChild] = []
+        spawn = 0
+        with self.available:
+            self._check_fork()
+            while len(children) + spawn < wanted:
+                if self.idle:
+                    children.append(self.idle.pop())
+                elif self.count < self.size:
+                    self.count += 1
+                    spawn += 1
+                else:
+                    break
+
+        # Started outside the lock, so other documents aren't held up
+        try:
+            for _ in range(spawn):
+                children.append(_ExtractionChild())
+                spawn -= 1
+        except BaseException:
+            self.release(children, lost=spawn)
+            raise
+        return children
+
+    def release(self, children: List[_ExtractionChild], lost: int = 0) -> None:
+        """Return children; those still busy are killed"""
+        with self.available:
+            if self.pid != os.getpid():
+                return
+            for child in children:
+                if child.busy or not child.process.is_alive():
+                    child.kill()
+                    self.count -= 1
+                else:
+                    self.idle.append(child)
+            self.count -= lost
+            self.available.notify_all()
+
+
+_pool = _ExtractionPool(PDF_CHILDREN)
+_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+
+def _iter_pages(children: List[_ExtractionChild], file_bytes: bytes, page_count: int,
+                deadline: float) -> Iterator[Tuple[int, str, float]]:
+    """
+    Extract pages with children, yielding them in document order
+
+    The first child has already opened the file; the others are sent it
+    once each. Page ranges go to whichever child is free. If the consumer
+    stops early, the ranges still running are waited for (within the
+    deadline) so the children can be reused.
+
+    Raises:
+        multiprocessing.TimeoutError: When the deadline passes
+    """
+    ranges = deque(
+        (start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    )
+    running: Dict[Any, Tuple[_ExtractionChild, Optional[int]]] = {}
+    done: Dict[int, List[Tuple[int, str, float]]] = {}
+
+    def assign(child: _ExtractionChild) -> None:
+        if ranges:
+            start, stop = ranges.popleft()
+            child.send(("pages", start, stop))
+            running[child.conn] = (child, start)
+
+    def collect(timeout: float) -> None:
+        ready = multiprocessing.connection.wait(list(running), max(timeout, 0))
+        if not ready:
+            raise multiprocessing.TimeoutError()
+        for conn in ready:
+            child, start = running.pop(conn)
+            value = child.receive()
+            if start is not None:
+                done[start] = value
+            assign(child)
+
+    assign(children[0])
+    for child in children[1:]:
+        child.send(("open", file_bytes))
+        running[child.conn] = (child, None)
+
+    try:
+        next_start = 0
+        while next_start < page_count:
+            if next_start in done:
+                yield from done.pop(next_start)
+                next_start += PDF_PAGES_PER_TASK
+            else:
+                collect(deadline - time.monotonic())
+    finally:
+        ranges.clear()
+        try:
+            while running:
+                collect(deadline - time.monotonic())
+        except Exception:
+            # Children left busy are killed on release
+            pass
+
+
+def extract_pdf(file_bytes: bytes, max_pages: int = PDF_MAX_PAGES,
+                max_chars: int = PDF_MAX_CHARS,
+                time_budget: float = PDF_TIME_BUDGET) -> Dict:
+    """
+    Extract text from a PDF within page, size and time limits
+
+    Args:
+        file_bytes: Raw PDF contents
+        max_pages: Maximum number of pages to read
+        max_chars: Stop once this many characters have been collected
+        time_budget: Maximum seconds to spend on the document
+
+    Returns:
+        Dictionary with the text, page counts, whether extraction stopped
+        early, and per-page timings (also recorded in the
+        skilllens_pdf_page_duration_seconds histogram)
+    """
+    if len(file_bytes) > PDF_MAX_BYTES:
+        raise AnalysisError(
+            413, f"PDF is larger than the {PDF_MAX_BYTES // (1024 * 1024)} MB limit"
+        )
+
+    with metrics.stage("pdf_parse"):
+        result = _extract_pdf(file_bytes, max_pages, max_chars, time_budget)
+
+    metrics.observe("document_bytes", len(file_bytes))
+    metrics.observe("document_pages", result["pages_extracted"])
+    for timing in result["page_timings"]:
+        metrics.observe("pdf_page_seconds", timing["seconds"])
+    return result
+
+
+def _extract_pdf(file_bytes: bytes, max_pages: int, max_chars: int,
+                 time_budget: float) -> Dict:
+    deadline = time.monotonic() + time_budget
+    children: List[_ExtractionChild] = []
+    try:
+        children = [_pool.acquire(deadline)]
+        # The page count comes from the child too: opening a malformed
+        # file can take as long as extracting it
+        total_pages = children[0].call(("open", file_bytes), deadline)
+        page_count = min(total_pages, max_pages)
+
+        if page_count >= PDF_PARALLEL_MIN_PAGES:
+            workers = min(PDF_PARALLEL_WORKERS, _CPUS, -(-page_count // PDF_PAGES_PER_TASK))
+            if workers > 1:
+                children += _pool.take_idle(workers - 1)
+
+        pages = _iter_pages(children, file_bytes, page_count, deadline)
+
+        parts = []
+        page_timings = []
+        chars = 0
+        truncated = page_count < total_pages
+        try:
+            for index, text, seconds in pages:
+                parts.append(text)
+                page_timings.append({
+                    "page": index + 1,
+                    "chars": len(text),
+                    "seconds": round(seconds, 4)
+                })
+                chars += len(text)
+                if chars >= max_chars or time.monotonic() > deadline:
+                    truncated = truncated or index + 1 < page_count
+                    break
+        except multiprocessing.TimeoutError:
+            truncated = True
+        finally:
+            pages.close()
+    except AnalysisError:
+        raise
+    except multiprocessing.TimeoutError:
+        raise AnalysisError(400, "PDF extraction failed: the document could not be opened within the time budget")
+    except Exception as e:
+        raise AnalysisError(400, f"PDF extraction failed: {str(e)}")
+    finally:
+        _pool.release(children)
+
+    if truncated:
+        slowest = max(page_timings, key=lambda timing: timing["seconds"], default=None)
+        logger.info("PDF extraction stopped after %d of %d pages (slowest: %s)",
+                    len(parts), total_pages,
+                    f"page {slowest['page']}, {slowest['seconds']}s" if slowest else "none")
+
+    return {
+        "text": "\n".join(parts) + "\n" if parts else "",
+        "total_pages": total_pages,
+        "pages_extracted": len(parts),
+        "truncated": truncated,
+        "bytes": len(file_bytes),
+        "page_timings": page_timings,
+    }
+
+
+def extract_text_from_pdf(file_bytes: bytes) -> str:
+    """Extract text from PDF file"""
+    return extract_pdf(file_bytes)["text"]
+
+
+def _docx_parts(archive: zipfile.ZipFile) -> List[str]:
+    """Text-bearing parts of a DOCX, body first"""
+    names = set(archive.namelist())
+    if "word/document.xml" not in names:
+        raise ValueError("word/document.xml not found")
+    return ["word/document.xml"] + sorted(
+        name for name in names if _DOCX_EXTRA_PARTS.match(name)
+    )
+
+
+def _stream_docx_part(stream, lines: List[str]) -> None:
+    """
+    Append the paragraph texts of one WordprocessingML part to lines
+
+    Uses expat callbacks, so no element tree is built. Paragraphs nested in
+    text boxes are emitted on their own; the VML fallback copy of a text box
+    (mc:Fallback) is skipped so its text isn't duplicated.
+    """
+    paragraphs: List[List[str]] = []
+    state = {"text": 0, "run": 0, "fallback": 0}
+
+    def start(name: str, attrs) -> None:
+        if name == _W_P:
+            paragraphs.append([])
+        elif name == _W_T:
+            state["text"] += 1
+        elif name == _W_R:
+            state["run"] += 1
+        elif name == _MC_FALLBACK:
+            state["fallback"] += 1
+        elif state["run"] and paragraphs and not state["fallback"]:
+            if name == _W_TAB:
+                paragraphs[-1].append("\t")
+            elif name in _W_LINE_BREAKS:
+                paragraphs[-1].append("\n")
+
+    def end(name: str) -> None:
+        if name == _W_P:
+            text = "".join(paragraphs.pop())
+            if not state["fallback"]:
+                lines.append(text)
+        elif name == _W_T:
+            state["text"] -= 1
+        elif name == _W_R:
+            state["run"] -= 1
+        elif name == _MC_FALLBACK:
+            state["fallback"] -= 1
+
+    def characters(data: str) -> None:
+        if state["text"] and paragraphs and not state["fallback"]:
+            paragraphs[-1].append(data)
+
+    parser = expat.ParserCreate(namespace_separator=" ")
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = characters
+    parser.ParseFile(stream)
+
+
+def extract_text_from_docx(file_bytes: bytes) -> str:
+    """
+    Extract text from DOCX file
+
+    Streams word/document.xml, headers, footers, footnotes and endnotes out
+    of the archive, so text in tables, text boxes and headers is included
+    along with the body paragraphs.
+    """
+    metrics.observe("document_bytes", len(file_bytes))
+    try:
+        with metrics.stage("docx_parse"), zipfile.ZipFile(io.BytesIO(file_bytes)) as archive:
+            parts = _docx_parts(archive)
+            size = sum(archive.getinfo(name).file_size for name in parts)
+            if size > DOCX_MAX_XML_BYTES:
+                raise AnalysisError(413, "DOCX content is too large")
+
+            lines: List[str] = []
+            for name in parts:
+                with archive.open(name) as stream:
+                    _stream_docx_part(stream, lines)
+    except AnalysisError:
+        raise
+    except Exception as e:
+        raise AnalysisError(400, f"DOCX extraction failed: {str(e)}")
+
+    return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,440 @@
+import asyncio
+import contextvars
+import os
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from app import store
+from app.analysis import (
+    AnalysisError,
+    analyze_resume_for_job,
+    analyze_resume_text,
+    assemble_analysis,
+    extract_resume_text,
+    job_similarity,
+)
+from app.cache import (
+    content_hash,
+    job_cache,
+    normalize_text,
+    result_cache,
+    skills_cache,
+    text_cache,
+)
+from app.bitmap import add_to_bitmap, bitmap_enabled, search_candidates
+from app.corpus import CorpusRow, add_to_corpus, corpus_enabled, rank_corpus
+from app.executor import run_cpu_bound
+from app.jobs import job_features, match_jobs
+from app.matcher import calculate_match
+from app.recommender import get_recommendations
+from app.skill_extractor import extract_skills, extract_skills_batch, extract_skills_quick
+from app.taxonomy import taxonomy_version
+from app.vectorizer import model_version
+
+# Newly analyzed resumes are added to the ranking corpus and the skill
+# bitmap in batches, once this many are waiting or the oldest has waited
+# this many seconds
+CORPUS_FLUSH_DOCS = int(os.environ.get("SKILLLENS_CORPUS_FLUSH_DOCS", "32"))
+CORPUS_FLUSH_SECONDS = float(os.environ.get("SKILLLENS_CORPUS_FLUSH_SECONDS", "30"))
+
+_index_pending: List[CorpusRow] = []
+_index_flush_timer: Optional[asyncio.TimerHandle] = None
+_index_lock = asyncio.Lock()
+_index_tasks: Set[asyncio.Task] = set()
+
+
+async def _resume_text(file_key: str, taxonomy: str, filename: Optional[str] = None,
+                       file_bytes: Optional[bytes] = None) -> str:
+    """
+    Get the extracted text of a resume by file hash
+
+    Looks in the in-memory cache, then the persistent document store, and
+    only parses the file when neither has it.
+    """
+    async def load() -> str:
+        document = await asyncio.to_thread(store.get_document, file_key, taxonomy)
+        if document is not None:
+            if document["skills"] is not None:
+                skills_cache.set(("file", file_key, taxonomy), document["skills"])
+            return document["text"]
+
+        if file_bytes is None:
+            raise AnalysisError(404, "Unknown resume hash, upload the file to /analyze")
+
+        resume_text = await run_cpu_bound(extract_resume_text, filename, file_bytes)
+        await asyncio.to_thread(store.put_document, file_key, resume_text)
+        return resume_text
+
+    return await text_cache.get_or_compute(file_key, load)
+
+
+async def get_registered_job(job_id: str) -> Dict:
+    """
+    Look up a job posting registered with /jobs
+
+    Postings whose skills came from an older taxonomy are re-extracted (and
+    updated in the store) first.
+
+    Raises:
+        AnalysisError: 404 if no posting has this id
+    """
+    job_id = job_id.lower()
+    taxonomy = taxonomy_version()
+
+    async def load() -> Dict:
+        job = await asyncio.to_thread(store.get_job, job_id)
+        if job is None:
+            raise AnalysisError(404, "Unknown job_id, register the posting with /jobs")
+        if job["skills_taxonomy"] != taxonomy:
+            features = await run_cpu_bound(job_features, job["text"])
+            await asyncio.to_thread(store.update_job_features, job_id, features)
+            job.update(skills=features["skills"], vector=features["vector"],
+                       skills_taxonomy=features["taxonomy"],
+                       model_version=features["model_version"])
+        return job
+
+    return await job_cache.get_or_compute((job_id, taxonomy), load)
+
+
+def _job_text(job_description: Optional[str], job: Optional[Dict]) -> Tuple[str, str]:
+    """
+    Normalized job description and its hash, for raw text or a registered posting
+
+    The normalized text, not the raw one, is what gets analyzed, so copies
+    differing only in whitespace share cache entries and always get the
+    same result.
+    """
+    if job is not None:
+        # A registered posting: its text is normalized and its skills and
+        # vector are stored, so only the resume needs processing
+        return job["text"], job["sha256"]
+    job_description = normalize_text(job_description)
+    return job_description, content_hash(job_description.encode("utf-8"))
+
+
+def _result_key(file_key: str, job_key: str, taxonomy: str) -> Tuple:
+    # Similarity scores depend on the TF-IDF model, so a refit invalidates them
+    return (file_key, job_key, taxonomy, model_version())
+
+
+async def _analyze(file_key: str, job_description: Optional[str],
+                   filename: Optional[str] = None,
+                   file_bytes: Optional[bytes] = None,
+                   job: Optional[Dict] = None) -> Dict:
+    # Skills and results depend on the taxonomy, so a reload invalidates them
+    taxonomy = taxonomy_version()
+    job_description, job_key = _job_text(job_description, job)
+
+    async def compute() -> Dict:
+        resume_text = await _resume_text(file_key, taxonomy, filename, file_bytes)
+
+        resume_skills = skills_cache.get(("file", file_key, taxonomy))
+        new_resume_skills = resume_skills is None
+
+        if job is not None:
+            # Only the resume is processed; its skills, if not cached, are
+            # extracted in the same executor call
+            analysis = await run_cpu_bound(
+                analyze_resume_for_job, resume_text, job, resume_skills
+            )
+            resume_skills = analysis["resume_skills"]
+            skills_cache.set(("file", file_key, taxonomy), resume_skills)
+        else:
+            job_skills = skills_cache.get(("text", job_key, taxonomy))
+
+            if resume_skills is None and job_skills is None:
+                resume_skills, job_skills = await run_cpu_bound(
+                    extract_skills_batch, [resume_text, job_description]
+                )
+                skills_cache.set(("file", file_key, taxonomy), resume_skills)
+                skills_cache.set(("text", job_key, taxonomy), job_skills)
+            elif resume_skills is None:
+                resume_skills = await skills_cache.get_or_compute(
+                    ("file", file_key, taxonomy), lambda: run_cpu_bound(extract_skills, resume_text)
+                )
+            elif job_skills is None:
+                job_skills = await skills_cache.get_or_compute(
+                    ("text", job_key, taxonomy), lambda: run_cpu_bound(extract_skills, job_description)
+                )
+
+            analysis = await run_cpu_bound(
+                analyze_resume_text, resume_text, job_description,
+                job_skills, None, resume_skills
+            )
+
+        if new_resume_skills:
+            await asyncio.to_thread(store.put_skills, file_key, resume_skills, taxonomy)
+            _queue_for_indexes(file_key, resume_text, resume_skills)
+
+        return analysis
+
+    return await result_cache.get_or_compute(_result_key(file_key, job_key, taxonomy), compute)
+
+
+async def analyze_upload(filename: str, file_bytes: bytes, job_description: Optional[str],
+                         job: Optional[Dict] = None) -> Dict:
+    """
+    Analyze an uploaded resume against a job description, with caching
+
+    The final result, the extracted resume text and the skill lists are
+    cached separately by content hash, so a new job description against a
+    known resume skips parsing and resume skill extraction. Identical
+    requests arriving together share one computation. Extracted text and
+    skills are also kept in the persistent document store.
+
+    Args:
+        filename: Original file name, used to pick the parser
+        file_bytes: Raw file contents
+        job_description: Text of the job posting, or None if job is given
+        job: Registered posting from get_registered_job
+
+    Returns:
+        Analysis payload as returned in the "data" field of /analyze
+    """
+    return await _analyze(content_hash(file_bytes), job_description, filename, file_bytes, job)
+
+
+async def analyze_by_hash(resume_sha256: str, job_description: Optional[str],
+                          job: Optional[Dict] = None) -> Dict:
+    """
+    Analyze a previously uploaded resume identified by its SHA-256
+
+    Raises:
+        AnalysisError: 404 if the resume is not cached or stored
+    """
+    return await _analyze(resume_sha256.lower(), job_description, job=job)
+
+
+def _stage_events(analysis: Dict) -> List[Tuple[str, Dict]]:
+    """The stage events of analyze_stages for a finished analysis"""
+    return [
+        ("resume_skills", {"skills": analysis["resume_skills"], "complete": True}),
+        ("job_skills", {"skills": analysis["job_skills"]}),
+        ("match", {
+            "matched_skills": analysis["matched_skills"],
+            "missing_skills": analysis["missing_skills"],
+            "match_percentage": analysis["match_percentage"],
+        }),
+        ("similarity", {"similarity_score": analysis["similarity_score"]}),
+        ("recommendations", {"recommendations": analysis["recommendations"]}),
+        ("result", analysis),
+    ]
+
+
+async def analyze_stages(filename: str, file_bytes: bytes, job_description: Optional[str],
+                         job: Optional[Dict] = None) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Analyze an uploaded resume, yielding the output of each stage when ready
+
+    Yields (event, payload) pairs in this order:
+
+    - "text": resume_sha256 and the size of the extracted text
+    - "resume_skills": skills and whether the list is complete. Unless the
+      skills are cached, a list from pattern matching alone comes first,
+      then the complete list once the spaCy stage has run
+    - "job_skills", "match", "similarity", "recommendations"
+    - "result": the same payload as /analyze
+
+    The job description's skills are extracted alongside the resume's.
+    Results go to the same caches and document store as analyze_upload.
+    """
+    file_key = content_hash(file_bytes)
+    taxonomy = taxonomy_version()
+    job_description, job_key = _job_text(job_description, job)
+
+    resume_text = await _resume_text(file_key, taxonomy, filename, file_bytes)
+    yield "text", {
+        "resume_sha256": file_key,
+        "characters": len(resume_text),
+        "words": len(resume_text.split()),
+    }
+
+    result_key = _result_key(file_key, job_key, taxonomy)
+    cached = result_cache.get(result_key)
+    if cached is not None:
+        for event in _stage_events(cached):
+            yield event
+        return
+
+    job_skills = job["skills"] if job is not None else skills_cache.get(("text", job_key, taxonomy))
+    job_skills_task = None
+    if job_skills is None:
+        job_skills_task = asyncio.ensure_future(skills_cache.get_or_compute(
+            ("text", job_key, taxonomy), lambda: run_cpu_bound(extract_skills, job_description)
+        ))
+
+    resume_skills = skills_cache.get(("file", file_key, taxonomy))
+    new_resume_skills = resume_skills is None
+    if new_resume_skills:
+        yield "resume_skills", {
+            "skills": await run_cpu_bound(extract_skills_quick, resume_text),
+            "complete": False,
+        }
+        resume_skills = await skills_cache.get_or_compute(
+            ("file", file_key, taxonomy), lambda: run_cpu_bound(extract_skills, resume_text)
+        )
+    yield "resume_skills", {"skills": resume_skills, "complete": True}
+
+    if job_skills_task is not None:
+        job_skills = await job_skills_task
+    yield "job_skills", {"skills": job_skills}
+
+    match_result = calculate_match(resume_skills, job_skills)
+    yield "match", {
+        "matched_skills": match_result["matched_skills"],
+        "missing_skills": match_result["missing_skills"],
+        "match_percentage": match_result["match_percentage"],
+    }
+
+    similarity_score = await run_cpu_bound(job_similarity, resume_text, job_description, job)
+    yield "similarity", {"similarity_score": similarity_score}
+
+    recommendations = get_recommendations(match_result["missing_skills"])
+    yield "recommendations", {"recommendations": recommendations}
+
+    analysis = assemble_analysis(
+        resume_skills, job_skills, match_result, similarity_score, recommendations
+    )
+    result_cache.set(result_key, analysis)
+    if new_resume_skills:
+        await asyncio.to_thread(store.put_skills, file_key, resume_skills, taxonomy)
+        _queue_for_indexes(file_key, resume_text, resume_skills)
+    yield "result", analysis
+
+
+async def extract_text_skills(text: str) -> List[str]:
+    """Extract skills from free text, reusing cached results for repeated text"""
+    return await skills_cache.get_or_compute(
+        ("text", content_hash(text.encode("utf-8")), taxonomy_version()),
+        lambda: run_cpu_bound(extract_skills, text)
+    )
+
+
+def _queue_for_indexes(file_key: str, resume_text: str, resume_skills: List[str]) -> None:
+    """Schedule a newly analyzed resume for the ranking corpus and skill bitmap"""
+    global _index_flush_timer
+
+    if not corpus_enabled() and not bitmap_enabled():
+        return
+    _index_pending.append((file_key, resume_text, resume_skills))
+
+    if len(_index_pending) >= CORPUS_FLUSH_DOCS:
+        _start_index_flush()
+    elif _index_flush_timer is None:
+        # Written after CORPUS_FLUSH_SECONDS even if no other resume arrives
+        _index_flush_timer = asyncio.get_running_loop().call_later(
+            CORPUS_FLUSH_SECONDS, _start_index_flush, context=contextvars.Context()
+        )
+
+
+def _cancel_index_flush_timer() -> None:
+    global _index_flush_timer
+
+    if _index_flush_timer is not None:
+        _index_flush_timer.cancel()
+        _index_flush_timer = None
+
+
+def _start_index_flush() -> None:
+    _cancel_index_flush_timer()
+    # Runs in the background with its own context, so the flush isn't
+    # timed as part of the request that triggered it
+    task = asyncio.create_task(flush_indexes(), context=contextvars.Context())
+    _index_tasks.add(task)
+    task.add_done_callback(_index_tasks.discard)
+
+
+async def flush_indexes() -> None:
+    """
+    Write the resumes waiting for the ranking corpus and skill bitmap
+
+    Called in the background as resumes are queued, and on shutdown.
+    """
+    async with _index_lock:
+        if not _index_pending:
+            return
+        rows = list(_index_pending)
+        _index_pending.clear()
+        _cancel_index_flush_timer()
+        if corpus_enabled():
+            try:
+                await run_cpu_bound(add_to_corpus, rows)
+            except Exception as e:
+                print(f"Error updating corpus index: {e}")
+        if bitmap_enabled():
+            try:
+                await run_cpu_bound(add_to_bitmap, rows)
+            except Exception as e:
+                print(f"Error updating skill bitmap index: {e}")
+
+
+async def rank_resumes(job_description: str, top_k: int) -> Dict:
+    """
+    Rank every indexed resume against a job description
+
+    Resumes analyzed in the last few seconds may not be indexed yet (see
+    CORPUS_FLUSH_DOCS and CORPUS_FLUSH_SECONDS).
+    """
+    job_description = normalize_text(job_description)
+    job_skills = await skills_cache.get_or_compute(
+        ("text", content_hash(job_description.encode("utf-8")), taxonomy_version()),
+        lambda: run_cpu_bound(extract_skills, job_description)
+    )
+    return await run_cpu_bound(rank_corpus, job_description, top_k, job_skills)
+
+
+async def search_resumes(query: Optional[str], match_skills: Optional[List[str]],
+                         min_match: float, limit: int) -> Dict:
+    """
+    Search every indexed resume with a boolean skill query
+
+    Resumes analyzed in the last few seconds may not be indexed yet (see
+    CORPUS_FLUSH_DOCS and CORPUS_FLUSH_SECONDS).
+    """
+    return await run_cpu_bound(search_candidates, query, match_skills, min_match, limit)
+
+
+async def register_job(job_description: str, title: Optional[str] = None) -> Dict:
+    """
+    Add a job posting to the job index
+
+    The posting is identified by the SHA-256 of its normalized text, so
+    registering the same text twice returns the existing posting.
+
+    Raises:
+        AnalysisError: 503 if the document store is disabled
+    """
+    if not store.store_enabled():
+        raise AnalysisError(503, "The job index needs the document store (SKILLLENS_DOCUMENT_STORE)")
+
+    job_description = normalize_text(job_description)
+    job_id = content_hash(job_description.encode("utf-8"))
+
+    job = await asyncio.to_thread(store.get_job, job_id)
+    if job is None:
+        features = await run_cpu_bound(job_features, job_description)
+        await asyncio.to_thread(store.put_job, job_id, title, job_description, features)
+        job = {"title": title, "skills": features["skills"]}
+
+    return {"job_id": job_id, "title": job["title"], "job_skills": job["skills"]}
+
+
+async def match_resume_to_jobs(filename: str, file_bytes: bytes, top_k: int) -> Dict:
+    """
+    Rank every registered job posting for an uploaded resume
+
+    The resume is parsed and its skills extracted once (or taken from the
+    caches and document store), then scored against all postings in one pass.
+    """
+    file_key = content_hash(file_bytes)
+    taxonomy = taxonomy_version()
+    resume_text = await _resume_text(file_key, taxonomy, filename, file_bytes)
+
+    resume_skills = skills_cache.get(("file", file_key, taxonomy))
+    if resume_skills is None:
+        resume_skills = await skills_cache.get_or_compute(
+            ("file", file_key, taxonomy), lambda: run_cpu_bound(extract_skills, resume_text)
+        )
+        await asyncio.to_thread(store.put_skills, file_key, resume_skills, taxonomy)
+        _queue_for_indexes(file_key, resume_text, resume_skills)
+
+    return await run_cpu_bound(match_jobs, resume_text, resume_skills, top_k)
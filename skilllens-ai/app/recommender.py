@@ -1,119 +1,36 @@
-from typing import List, Dict
-
-# Learning resource database
-LEARNING_RESOURCES = {
-    # Programming Languages
-    "python": {
-        "courses": [
-            {"name": "Python for Everybody", "platform": "Coursera", "url": "https://www.coursera.org/specializations/python"},
-            {"name": "Complete Python Bootcamp", "platform": "Udemy", "url": "https://www.udemy.com/course/complete-python-bootcamp/"},
-            {"name": "Python Tutorial", "platform": "W3Schools", "url": "https://www.w3schools.com/python/"}
-        ],
-        "priority": "high"
-    },
-    
-    "javascript": {
-        "courses": [
-            {"name": "JavaScript: The Complete Guide", "platform": "Udemy", "url": "https://www.udemy.com/course/javascript-the-complete-guide-2020-beginner-advanced/"},
-            {"name": "JavaScript Algorithms", "platform": "freeCodeCamp", "url": "https://www.freecodecamp.org/learn/javascript-algorithms-and-data-structures/"},
-            {"name": "Modern JavaScript", "platform": "JavaScript.info", "url": "https://javascript.info/"}
-        ],
-        "priority": "high"
-    },
-    
-    "java": {
-        "courses": [
-            {"name": "Java Programming Masterclass", "platform": "Udemy", "url": "https://www.udemy.com/course/java-the-complete-java-developer-course/"},
-            {"name": "Java Tutorial", "platform": "Oracle", "url": "https://docs.oracle.com/javase/tutorial/"},
-        ],
-        "priority": "high"
-    },
-    
-    # Web Development
-    "react": {
-        "courses": [
-            {"name": "React - The Complete Guide", "platform": "Udemy", "url": "https://www.udemy.com/course/react-the-complete-guide-incl-redux/"},
-            {"name": "React Official Docs", "platform": "React.dev", "url": "https://react.dev/learn"},
-            {"name": "Full Stack Open", "platform": "University of Helsinki", "url": "https://fullstackopen.com/en/"}
-        ],
-        "priority": "high"
-    },
-    
-    "node.js": {
-        "courses": [
-            {"name": "Node.js Complete Guide", "platform": "Udemy", "url": "https://www.udemy.com/course/nodejs-the-complete-guide/"},
-            {"name": "Node.js Documentation", "platform": "Node.js", "url": "https://nodejs.org/en/docs/"}
-        ],
-        "priority": "high"
-    },
-    
-    "typescript": {
-        "courses": [
-            {"name": "Understanding TypeScript", "platform": "Udemy", "url": "https://www.udemy.com/course/understanding-typescript/"},
-            {"name": "TypeScript Handbook", "platform": "TypeScript", "url": "https://www.typescriptlang.org/docs/handbook/intro.html"}
-        ],
-        "priority": "medium"
-    },
-    
-    # Databases
-    "sql": {
-        "courses": [
-            {"name": "SQL for Data Science", "platform": "Coursera", "url": "https://www.coursera.org/learn/sql-for-data-science"},
-            {"name": "SQL Tutorial", "platform": "W3Schools", "url": "https://www.w3schools.com/sql/"}
-        ],
-        "priority": "high"
-    },
-    
-    "mongodb": {
-        "courses": [
-            {"name": "MongoDB University", "platform": "MongoDB", "url": "https://learn.mongodb.com/"},
-            {"name": "MongoDB Complete Guide", "platform": "Udemy", "url": "https://www.udemy.com/course/mongodb-the-complete-developers-guide/"}
-        ],
-        "priority": "medium"
-    },
-    
-    # Cloud & DevOps
-    "aws": {
-        "courses": [
-            {"name": "AWS Certified Solutions Architect", "platform": "AWS Training", "url": "https://aws.amazon.com/training/"},
-            {"name": "AWS Fundamentals", "platform": "Coursera", "url": "https://www.coursera.org/learn/aws-fundamentals-going-cloud-native"}
-        ],
-        "priority": "high"
-    },
-    
-    "docker": {
-        "courses": [
-            {"name": "Docker Mastery", "platform": "Udemy", "url": "https://www.udemy.com/course/docker-mastery/"},
-            {"name": "Docker Documentation", "platform": "Docker", "url": "https://docs.docker.com/get-started/"}
-        ],
-        "priority": "medium"
-    },
-    
-    "git": {
-        "courses": [
-            {"name": "Git & GitHub Crash Course", "platform": "YouTube", "url": "https://www.youtube.com/watch?v=RGOj5yH7evk"},
-            {"name": "Git Documentation", "platform": "Git", "url": "https://git-scm.com/doc"}
-        ],
-        "priority": "high"
-    },
-    
-    # Data Science & AI
-    "machine learning": {
-        "courses": [
-            {"name": "Machine Learning Specialization", "platform": "Coursera", "url": "https://www.coursera.org/specializations/machine-learning-introduction"},
-            {"name": "Machine Learning Crash Course", "platform": "Google", "url": "https://developers.google.com/machine-learning/crash-course"}
-        ],
-        "priority": "high"
+import hashlib
+import json
+from typing import List, Dict, Optional, Tuple
+
+from app.taxonomy import SkillIndex, get_taxonomy
+
+# Courses recommended for a skill without resources in the taxonomy;
+# {skill} is the skill name and {query} the name with spaces as "+"
+GENERIC_PRIORITY = "medium"
+GENERIC_COURSES = [
+    {
+        "name": "Search '{skill}' tutorials",
+        "platform": "YouTube",
+        "url": "https://www.youtube.com/results?search_query={query}+tutorial"
     },
-    
-    "data science": {
-        "courses": [
-            {"name": "Data Science Specialization", "platform": "Coursera", "url": "https://www.coursera.org/specializations/jhu-data-science"},
-            {"name": "Data Science Path", "platform": "Kaggle", "url": "https://www.kaggle.com/learn"}
-        ],
-        "priority": "high"
+    {
+        "name": "Learn {skill}",
+        "platform": "Udemy",
+        "url": "https://www.udemy.com/courses/search/?q={query}"
     }
-}
+]
+
+# Serialized /resources catalog and its ETag, for the taxonomy it was built from
+_catalog: Optional[Tuple[SkillIndex, bytes, str]] = None
+
+
+def generic_courses(skill: str) -> List[Dict]:
+    """GENERIC_COURSES filled in for a skill"""
+    query = skill.replace(' ', '+')
+    return [
+        {key: value.format(skill=skill, query=query) for key, value in course.items()}
+        for course in GENERIC_COURSES
+    ]
 
 
 def get_recommendations(missing_skills: List[str]) -> List[Dict]:
@@ -127,13 +44,14 @@ def get_recommendations(missing_skills: List[str]) -> List[Dict]:
         List of recommended learning resources
     """
     
+    # Learning resources come from the skill taxonomy
+    index = get_taxonomy()
     recommendations = []
     
     for skill in missing_skills:
-        skill_lower = skill.lower()
+        resource = index.resource(skill)
         
-        if skill_lower in LEARNING_RESOURCES:
-            resource = LEARNING_RESOURCES[skill_lower]
+        if resource is not None:
             recommendations.append({
                 "skill": skill,
                 "priority": resource["priority"],
@@ -143,19 +61,8 @@ def get_recommendations(missing_skills: List[str]) -> List[Dict]:
             # Generic recommendation
             recommendations.append({
                 "skill": skill,
-                "priority": "medium",
-                "courses": [
-                    {
-                        "name": f"Search '{skill}' tutorials",
-                        "platform": "YouTube",
-                        "url": f"https://www.youtube.com/results?search_query={skill.replace(' ', '+')}+tutorial"
-                    },
-                    {
-                        "name": f"Learn {skill}",
-                        "platform": "Udemy",
-                        "url": f"https://www.udemy.com/courses/search/?q={skill.replace(' ', '+')}"
-                    }
-                ]
+                "priority": GENERIC_PRIORITY,
+                "courses": generic_courses(skill)
             })
     
     # Sort by priority (high first)
@@ -165,6 +72,63 @@ def get_recommendations(missing_skills: List[str]) -> List[Dict]:
     return recommendations
 
 
+def compact_recommendations(recommendations: List[Dict]) -> List[Dict]:
+    """
+    Recommendations with their courses replaced by a resource id
+
+    The id is a key of the /resources catalog, or None for the generic
+    courses, which clients build from the catalog's templates and the
+    skill name.
+
+    Args:
+        recommendations: Output of get_recommendations
+
+    Returns:
+        List of {"skill", "priority", "resource"}, in the same order
+    """
+    index = get_taxonomy()
+    return [
+        {
+            "skill": recommendation["skill"],
+            "priority": recommendation["priority"],
+            "resource": index.resource_id(recommendation["skill"])
+        }
+        for recommendation in recommendations
+    ]
+
+
+def compact_analysis(analysis: Dict) -> Dict:
+    """
+    An analysis payload (or stage event) with compact recommendations
+
+    Returns a copy; cached analyses are shared and never modified.
+    """
+    return {**analysis, "recommendations": compact_recommendations(analysis["recommendations"])}
+
+
+def resource_catalog() -> Tuple[bytes, str]:
+    """
+    The learning resource catalog served by /resources
+
+    Built once per taxonomy version. The ETag is a digest of the body, so it
+    only changes when the catalog's content does.
+
+    Returns:
+        JSON body and its ETag
+    """
+    global _catalog
+
+    index = get_taxonomy()
+    if _catalog is None or _catalog[0] is not index:
+        body = json.dumps({
+            "resources": index.resource_catalog,
+            "generic": {"priority": GENERIC_PRIORITY, "courses": GENERIC_COURSES},
+        }, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        _catalog = (index, body, etag)
+    return _catalog[1], _catalog[2]
+
+
 def generate_learning_path(missing_skills: List[str]) -> Dict:
     """
     Generate a structured learning path based on missing skills
@@ -180,10 +144,12 @@ def generate_learning_path(missing_skills: List[str]) -> Dict:
     medium_priority = []
     low_priority = []
     
+    index = get_taxonomy()
+    
     for skill in missing_skills:
-        skill_lower = skill.lower()
-        if skill_lower in LEARNING_RESOURCES:
-            priority = LEARNING_RESOURCES[skill_lower]["priority"]
+        resource = index.resource(skill)
+        if resource is not None:
+            priority = resource["priority"]
             if priority == "high":
                 high_priority.append(skill)
             elif priority == "medium":
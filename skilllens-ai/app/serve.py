@@ -0,0 +1,272 @@
+"""
+Multi-worker server with models preloaded once and shared copy-on-write
+
+    python -m app.serve --workers 4 --port 8000
+
+The parent process loads the spaCy pipeline, the skill taxonomy and its
+compiled matchers and the TF-IDF model, runs a warm-up analysis, then
+freezes the garbage collector so those objects are never touched again by
+a collection. Workers are forked from it and serve the shared listening
+socket with uvicorn; the model memory stays shared between them until a
+worker writes to it, so each extra worker only costs its private pages.
+
+Each worker runs analyses on one thread next to its event loop
+(SKILLLENS_EXECUTOR=thread) instead of starting its own process pool;
+scale with --workers. The parent restarts workers that exit, recycles each
+worker after --max-requests requests, and on SIGHUP replaces all workers
+without dropping connections. Per-worker memory is printed every
+--report-seconds, and each worker exports its own in /metrics.
+"""
+
+import argparse
+import gc
+import os
+import random
+import signal
+import socket
+import sys
+import time
+import traceback
+from typing import Dict, List, Optional, Set
+
+from app.metrics import process_memory
+
+SERVE_WORKERS = int(os.environ.get("SKILLLENS_SERVE_WORKERS", "0")) or os.cpu_count() or 1
+
+# Restart a worker after this many requests (0 disables), plus up to
+# MAX_REQUESTS_JITTER more so workers don't all restart at once
+MAX_REQUESTS = int(os.environ.get("SKILLLENS_MAX_REQUESTS", "0"))
+MAX_REQUESTS_JITTER = int(os.environ.get("SKILLLENS_MAX_REQUESTS_JITTER", "0"))
+
+# Seconds a stopping worker gets to finish its requests before it is killed
+GRACEFUL_TIMEOUT = float(os.environ.get("SKILLLENS_GRACEFUL_TIMEOUT", "30"))
+
+REPORT_SECONDS = float(os.environ.get("SKILLLENS_SERVE_REPORT_SECONDS", "300"))
+
+# A worker exiting sooner than this after it started is restarted after a
+# pause, so a worker that can't start doesn't spin
+MIN_WORKER_SECONDS = 5.0
+
+
+def _megabytes(value: int) -> str:
+    return f"{value / 1_048_576:.1f} MB"
+
+
+def _run_worker(app, sock: socket.socket, max_requests: Optional[int], args: argparse.Namespace) -> None:
+    """Serve requests in a forked worker until uvicorn stops"""
+    import uvicorn
+
+    from app import warmup
+
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP, signal.SIGCHLD):
+        signal.signal(signum, signal.SIG_DFL)
+
+    # The models are already loaded; this only records this worker's status
+    warmup.warm_up()
+
+    config = uvicorn.Config(
+        app,
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=int(args.graceful_timeout),
+        log_level=args.log_level,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Arbiter:
+    """Parent process: forks, watches and replaces the workers"""
+
+    def __init__(self, app, sock: socket.socket, args: argparse.Namespace):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers: Dict[int, float] = {}
+        self.retiring: Set[int] = set()
+        self.stopping = False
+        self.reloading = False
+        # First report once the workers have started
+        self.last_report = time.monotonic() - args.report_seconds + MIN_WORKER_SECONDS
+
+    def spawn(self) -> int:
+        max_requests = None
+        if self.args.max_requests > 0:
+            max_requests = self.args.max_requests + random.randint(0, self.args.max_requests_jitter)
+
+        # Otherwise output still buffered here is written again by every child
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(self.app, self.sock, max_requests, self.args)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+
+        self.workers[pid] = time.monotonic()
+        return pid
+
+    def reap(self) -> None:
+        """Collect workers that have exited"""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            if not self.stopping:
+                print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+                if started is not None and time.monotonic() - started < MIN_WORKER_SECONDS:
+                    time.sleep(1)
+
+    def report(self) -> None:
+        """Print the memory of every worker"""
+        parent = process_memory()
+        if not parent:
+            return
+        lines = [f"Memory: parent {os.getpid()} rss {_megabytes(parent['rss'])}"]
+        private: List[int] = []
+        for pid in sorted(self.workers):
+            memory = process_memory(pid)
+            if not memory:
+                continue
+            private.append(memory["private"])
+            lines.append(
+                f"  worker {pid}: rss {_megabytes(memory['rss'])}, "
+                f"pss {_megabytes(memory['pss'])}, shared {_megabytes(memory['shared'])}, "
+                f"private {_megabytes(memory['private'])}"
+            )
+        if private:
+            lines.append(f"  each extra worker costs about {_megabytes(max(private))}")
+        print("\n".join(lines))
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._reload)
+
+        for _ in range(self.args.workers):
+            self.spawn()
+        print(f"Started {self.args.workers} workers on {self.args.host}:{self.args.port}")
+
+        while not self.stopping:
+            self.reap()
+
+            if self.reloading:
+                # New workers first, so the socket never goes unserved
+                self.reloading = False
+                old = [pid for pid in self.workers if pid not in self.retiring]
+                for _ in range(self.args.workers):
+                    self.spawn()
+                for pid in old:
+                    self.retire(pid)
+                print(f"Replaced {len(old)} workers")
+
+            while len(self.workers) - len(self.retiring) < self.args.workers and not self.stopping:
+                self.spawn()
+
+            if self.args.report_seconds > 0 and time.monotonic() - self.last_report >= self.args.report_seconds:
+                self.last_report = time.monotonic()
+                self.report()
+
+            time.sleep(0.5)
+
+        self.shutdown()
+
+    def retire(self, pid: int) -> None:
+        """Ask a worker to finish its requests and exit"""
+        self.retiring.add(pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def shutdown(self) -> None:
+        for pid in list(self.workers):
+            self.retire(pid)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            print(f"Worker {pid} did not stop in time, killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            os.waitpid(pid, 0)
+        self.workers.clear()
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def _reload(self, signum, frame) -> None:
+        self.reloading = True
+
+
+def preload():
+    """
+    Import the app and load every model in this process, then freeze the
+    garbage collector so forked workers share the loaded objects
+
+    Returns:
+        The FastAPI app
+    """
+    # Workers analyze on a thread of their own; a process pool per worker
+    # would load the models again in every pool process
+    os.environ.setdefault("SKILLLENS_EXECUTOR", "thread")
+    os.environ.setdefault("SKILLLENS_EXECUTOR_WORKERS", "1")
+
+    from app import warmup
+    from app.main import app
+
+    started = time.perf_counter()
+    status = warmup.warm_up()
+    gc.collect()
+    gc.freeze()
+    print(f"Preloaded models in {time.perf_counter() - started:.2f}s "
+          f"(spaCy loaded: {status['nlp']['loaded']}, "
+          f"TF-IDF model loaded: {status['tfidf_model_loaded']}, "
+          f"taxonomy {status['taxonomy_version']}), "
+          f"rss {_megabytes(process_memory().get('rss', 0))}")
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the API with preloaded, forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS,
+                        help="Restart a worker after this many requests (0 = never)")
+    parser.add_argument("--max-requests-jitter", type=int, default=MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT)
+    parser.add_argument("--report-seconds", type=float, default=REPORT_SECONDS,
+                        help="Print per-worker memory this often (0 = never)")
+    parser.add_argument("--log-level", default="info")
+
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    app = preload()
+
+    sock = socket.create_server((args.host, args.port), backlog=2048)
+    sock.set_inheritable(True)
+
+    arbiter = Arbiter(app, sock, args)
+    arbiter.run()
+
+
+if __name__ == "__main__":
+    main()
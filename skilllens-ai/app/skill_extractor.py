@@ -1,51 +1,202 @@
-import spacy
-import re
-from typing import List
-
-# Load spaCy model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except:
-    print("spaCy model not found. Run: python -m spacy download en_core_web_sm")
-    nlp = None
-
-# Comprehensive skill database
-SKILL_PATTERNS = [
-    # Programming Languages
-    "python", "java", "javascript", "typescript", "c++", "c#", "php", "ruby",
-    "go", "golang", "rust", "swift", "kotlin", "scala", "r", "matlab",
-    
-    # Web Development
-    "html", "css", "react", "angular", "vue", "vue.js", "svelte", "next.js",
-    "node.js", "express", "django", "flask", "fastapi", "spring boot",
-    "asp.net", ".net", "laravel", "jquery", "bootstrap", "tailwind css",
-    
-    # Mobile Development
-    "react native", "flutter", "ios", "android", "xamarin", "ionic",
-    
-    # Databases
-    "sql", "mysql", "postgresql", "mongodb", "redis", "sqlite", "oracle",
-    "cassandra", "dynamodb", "firebase", "supabase", "prisma",
+import os
+from typing import Dict, List, Optional, Set
+
+from app import metrics
+from app.document import Document
+from app.taxonomy import SkillIndex, get_taxonomy
+
+# spaCy pipeline mode: "trimmed" loads only the components extract_skills
+# uses (tagger/attribute_ruler/parser for noun chunks, ner for entities),
+# "full" loads the whole en_core_web_sm pipeline
+SPACY_MODE = os.environ.get("SKILLLENS_SPACY_MODE", "trimmed")
+SPACY_UNUSED_COMPONENTS = ["lemmatizer", "senter"]
+
+# Texts longer than this are split into segments before going through spaCy,
+# so long resumes never hit nlp.max_length
+NLP_SEGMENT_CHARS = int(os.environ.get("SKILLLENS_NLP_SEGMENT_CHARS", "100000"))
+NLP_BATCH_SIZE = int(os.environ.get("SKILLLENS_NLP_BATCH_SIZE", "16"))
+
+# Entity labels that may name a skill
+SKILL_ENTITY_LABELS = frozenset(["PRODUCT", "ORG", "TECH"])
+
+
+def load_nlp(mode: str = SPACY_MODE):
+    """
+    Load the spaCy model used for skill extraction
+
+    spaCy itself is only imported here, so importing this module stays cheap.
+
+    Args:
+        mode: "trimmed" to skip components the extractor never reads, or "full"
+
+    Returns:
+        spaCy Language object, or None if the model is not installed
+    """
+    exclude = SPACY_UNUSED_COMPONENTS if mode == "trimmed" else []
+    try:
+        import spacy
+
+        return spacy.load("en_core_web_sm", exclude=exclude)
+    except Exception:
+        print("spaCy model not found. Run: python -m spacy download en_core_web_sm")
+        return None
+
+
+_nlp = None
+_nlp_loaded = False
+
+
+def get_nlp():
+    """
+    Return the spaCy pipeline, loading it on first use
+
+    Returns:
+        spaCy Language object, or None if the model is not installed
+    """
+    global _nlp, _nlp_loaded
+    if not _nlp_loaded:
+        _nlp = load_nlp()
+        _nlp_loaded = True
+    return _nlp
+
+
+def nlp_status() -> Dict[str, Optional[object]]:
+    """Load state of the spaCy pipeline, for readiness reporting"""
+    return {
+        "loaded": _nlp is not None,
+        "attempted": _nlp_loaded,
+        "mode": SPACY_MODE,
+        "components": list(_nlp.pipe_names) if _nlp is not None else None,
+    }
+
+
+def match_known_skills(text_lower: str) -> Set[str]:
+    """
+    Find all known skills and their aliases in one pass over the text
+
+    Args:
+        text_lower: Lowercased input text
+
+    Returns:
+        Set of canonical skills found
+    """
+    return get_taxonomy().match(text_lower)
+
+
+def extract_skills_quick(text: str) -> List[str]:
+    """
+    Skills found by pattern matching alone, without the spaCy stage
+
+    A subset of extract_skills, available in a fraction of the time.
+    """
+    with metrics.stage("skill_regex"):
+        return sorted(match_known_skills(text.lower()))
+
+
+def _split_for_nlp(text: str, max_chars: int = NLP_SEGMENT_CHARS) -> List[str]:
+    """
+    Split text into segments no longer than max_chars for spaCy
+
+    Segments are cut at the last line break (or whitespace) before the limit
+    so noun chunks and entities are rarely split across segments.
+    """
+    segments = []
+    while len(text) > max_chars:
+        cut = text.rfind("\n", 0, max_chars)
+        if cut <= 0:
+            cut = max(text.rfind(" ", 0, max_chars), 0)
+        if cut == 0:
+            cut = max_chars
+        segments.append(text[:cut])
+        text = text[cut:]
+    segments.append(text)
+    return segments
+
+
+def _skills_from_doc(doc, index: SkillIndex) -> Set[str]:
+    """Collect known skills mentioned in a spaCy doc's noun chunks and entities"""
+    found_skills = set()
     
-    # Cloud & DevOps
-    "aws", "azure", "google cloud", "gcp", "docker", "kubernetes", "jenkins",
-    "git", "github", "gitlab", "ci/cd", "terraform", "ansible",
+    # Extract noun chunks (potential skills)
+    for chunk in doc.noun_chunks:
+        chunk_text = chunk.text.lower().strip()
+        if len(chunk_text) > 2:
+            # Known skills inside the chunk, and skills containing the chunk
+            for match in index.substring_regex.finditer(chunk_text):
+                found_skills.update(index.contained[match.group(1)])
+            found_skills.update(index.skills_by_substring.get(chunk_text, ()))
+    
+    # Extract named entities (organizations, products)
+    for ent in doc.ents:
+        if ent.label_ in SKILL_ENTITY_LABELS:
+            ent_text = ent.text.lower().strip()
+            if ent_text in index.names:
+                found_skills.add(ent_text)
+    
+    return found_skills
+
+
+def extract_document_skills(documents: List[Document]) -> List[List[str]]:
+    """
+    Extract skills from several documents, running spaCy over them in one batch
+
+    Documents whose skills are already known are left as they are. The
+    others get their skills and, when the spaCy model is loaded, their
+    spaCy docs set.
+
+    Args:
+        documents: Input documents (e.g. a resume and a job description)
+        
+    Returns:
+        List of skill lists, one per document
+    """
+    pending = [document for document in documents if document.skills is None]
+    if not pending:
+        return [document.skills for document in documents]
     
-    # Data Science & AI
-    "machine learning", "deep learning", "artificial intelligence", "ai",
-    "nlp", "natural language processing", "computer vision", "data science",
-    "data analysis", "tensorflow", "pytorch", "keras", "scikit-learn",
-    "pandas", "numpy", "matplotlib", "tableau", "power bi",
+    # The whole batch uses one taxonomy, even if it is reloaded meanwhile
+    index = get_taxonomy()
     
-    # Other Technical Skills
-    "api", "rest api", "graphql", "microservices", "agile", "scrum",
-    "unit testing", "integration testing", "selenium", "jest", "pytest",
-    "linux", "bash", "shell scripting", "excel", "powerpoint",
+    # Method 1: Pattern matching with the taxonomy's skills and their
+    # aliases, in a single pass over each text
+    with metrics.stage("skill_regex"):
+        results = [index.match(document.lower) for document in pending]
     
-    # Soft Skills
-    "communication", "leadership", "teamwork", "problem solving",
-    "critical thinking", "time management", "project management"
-]
+    # Method 2: spaCy NLP extraction
+    nlp = get_nlp()
+    if nlp:
+        with metrics.stage("spacy"):
+            segments = []
+            owners = []
+            for owner, document in enumerate(pending):
+                document.nlp_docs = []
+                for segment in _split_for_nlp(document.text):
+                    segments.append(segment)
+                    owners.append(owner)
+            
+            docs = nlp.pipe(segments, batch_size=NLP_BATCH_SIZE)
+            for owner, doc in zip(owners, docs):
+                pending[owner].nlp_docs.append(doc)
+                results[owner].update(_skills_from_doc(doc, index))
+    
+    for document, found_skills in zip(pending, results):
+        metrics.observe("skills_found", len(found_skills))
+        document.skills = sorted(found_skills)
+    
+    return [document.skills for document in documents]
+
+
+def extract_skills_batch(texts: List[str]) -> List[List[str]]:
+    """
+    Extract skills from several texts, running spaCy over them in one batch
+
+    Args:
+        texts: Input texts (e.g. a resume and a job description)
+        
+    Returns:
+        List of skill lists, one per input text
+    """
+    return extract_document_skills([Document(text) for text in texts])
 
 
 def extract_skills(text: str) -> List[str]:
@@ -58,54 +209,7 @@ def extract_skills(text: str) -> List[str]:
     Returns:
         List of unique skills found
     """
-    text_lower = text.lower()
-    found_skills = set()
-    
-    # Method 1: Pattern matching with predefined skills
-    for skill in SKILL_PATTERNS:
-        # Use word boundaries to avoid partial matches
-        pattern = r'\b' + re.escape(skill) + r'\b'
-        if re.search(pattern, text_lower):
-            found_skills.add(skill)
-    
-    # Method 2: spaCy NLP extraction
-    if nlp:
-        doc = nlp(text)
-        
-        # Extract noun chunks (potential skills)
-        for chunk in doc.noun_chunks:
-            chunk_text = chunk.text.lower().strip()
-            if len(chunk_text) > 2 and chunk_text in text_lower:
-                # Check if it matches any known skill
-                for skill in SKILL_PATTERNS:
-                    if skill in chunk_text or chunk_text in skill:
-                        found_skills.add(skill)
-        
-        # Extract named entities (organizations, products)
-        for ent in doc.ents:
-            if ent.label_ in ["PRODUCT", "ORG", "TECH"]:
-                ent_text = ent.text.lower().strip()
-                if ent_text in [s.lower() for s in SKILL_PATTERNS]:
-                    found_skills.add(ent_text)
-    
-    # Method 3: Common abbreviations and variations
-    skill_variations = {
-        "js": "javascript",
-        "ts": "typescript",
-        "py": "python",
-        "ml": "machine learning",
-        "dl": "deep learning",
-        "k8s": "kubernetes",
-        "reactjs": "react",
-        "nodejs": "node.js",
-        "vuejs": "vue.js",
-    }
-    
-    for abbr, full_name in skill_variations.items():
-        if re.search(r'\b' + abbr + r'\b', text_lower):
-            found_skills.add(full_name)
-    
-    return sorted(list(found_skills))
+    return extract_skills_batch([text])[0]
 
 
 def categorize_skills(skills: List[str]) -> dict:
@@ -113,39 +217,17 @@ def categorize_skills(skills: List[str]) -> dict:
     Categorize skills into groups
     
     Args:
-        skills: List of skills
+        skills: List of skills (canonical names or aliases)
         
     Returns:
-        Dictionary with categorized skills
-    """
-    categories = {
-        "programming": [],
-        "web_development": [],
-        "database": [],
-        "cloud_devops": [],
-        "data_science": [],
-        "soft_skills": []
-    }
-    
-    programming_keywords = ["python", "java", "javascript", "c++", "c#", "php"]
-    web_keywords = ["react", "angular", "vue", "html", "css", "node"]
-    db_keywords = ["sql", "mysql", "mongodb", "postgresql", "redis"]
-    cloud_keywords = ["aws", "azure", "docker", "kubernetes", "git"]
-    ds_keywords = ["machine learning", "ai", "data science", "tensorflow"]
-    soft_keywords = ["communication", "leadership", "teamwork"]
+        Dictionary with categorized skills, one list per taxonomy category
+    """
+    index = get_taxonomy()
+    categories = {category: [] for category in index.categories}
     
     for skill in skills:
-        if any(kw in skill for kw in programming_keywords):
-            categories["programming"].append(skill)
-        elif any(kw in skill for kw in web_keywords):
-            categories["web_development"].append(skill)
-        elif any(kw in skill for kw in db_keywords):
-            categories["database"].append(skill)
-        elif any(kw in skill for kw in cloud_keywords):
-            categories["cloud_devops"].append(skill)
-        elif any(kw in skill for kw in ds_keywords):
-            categories["data_science"].append(skill)
-        elif any(kw in skill for kw in soft_keywords):
-            categories["soft_skills"].append(skill)
+        category = index.category(skill)
+        if category is not None:
+            categories[category].append(skill)
     
-    return categories
\ No newline at end of file
+    return categories
@@ -0,0 +1,360 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# SQLite file holding extracted resume text and skills by SHA-256 of the
+# uploaded file, registered job postings and the queue of asynchronous
+# analyses. Shared by every worker; set to an empty string to disable.
+STORE_PATH = os.environ.get(
+    "SKILLLENS_DOCUMENT_STORE",
+    str(Path(__file__).resolve().parent.parent / "data" / "documents.db")
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    sha256 TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    skills TEXT,
+    skills_taxonomy TEXT,
+    created_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sha256 TEXT NOT NULL UNIQUE,
+    title TEXT,
+    text TEXT NOT NULL,
+    skills TEXT NOT NULL,
+    skills_taxonomy TEXT,
+    vector_indices BLOB,
+    vector_data BLOB,
+    model_version TEXT,
+    created_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    file BLOB,
+    job_description TEXT,
+    job_id TEXT,
+    result TEXT,
+    error TEXT,
+    error_status INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+
+CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (status, created_at);
+"""
+
+_JOB_COLUMNS = (
+    "id, sha256, title, text, skills, skills_taxonomy, "
+    "vector_indices, vector_data, model_version"
+)
+
+_local = threading.local()
+
+
+def store_enabled() -> bool:
+    return bool(STORE_PATH)
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Add columns introduced after the table was first created"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+    if "skills_taxonomy" not in columns:
+        try:
+            conn.execute("ALTER TABLE documents ADD COLUMN skills_taxonomy TEXT")
+        except sqlite3.OperationalError:
+            pass  # Added concurrently by another worker
+
+
+def _connection() -> sqlite3.Connection:
+    """Per-thread connection; WAL lets workers read while another writes"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        Path(STORE_PATH).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(STORE_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _migrate(conn)
+        _local.conn = conn
+    return conn
+
+
+def get_document(sha256: str, taxonomy: Optional[str] = None) -> Optional[Dict]:
+    """
+    Look up a stored resume
+
+    Args:
+        sha256: Hex digest of the uploaded file
+        taxonomy: Version of the skill taxonomy the skills must come from
+
+    Returns:
+        Dictionary with "text" and "skills" (None if not extracted yet, or
+        extracted with another taxonomy), or None if the document is unknown
+    """
+    if not store_enabled():
+        return None
+    row = _connection().execute(
+        "SELECT text, skills, skills_taxonomy FROM documents WHERE sha256 = ?", (sha256,)
+    ).fetchone()
+    if row is None:
+        return None
+    text, skills, skills_taxonomy = row
+    if skills and skills_taxonomy == taxonomy:
+        return {"text": text, "skills": json.loads(skills)}
+    return {"text": text, "skills": None}
+
+
+def put_document(sha256: str, text: str) -> None:
+    """Store the extracted text of a resume"""
+    if not store_enabled():
+        return
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO documents (sha256, text, created_at) VALUES (?, ?, ?)",
+            (sha256, text, time.time())
+        )
+
+
+def iter_documents() -> Iterator[Tuple[str, str, Optional[List[str]], Optional[str]]]:
+    """
+    Iterate over every stored resume
+
+    Yields:
+        (sha256, text, skills or None, taxonomy version of the skills)
+    """
+    if not store_enabled():
+        return
+    rows = _connection().execute(
+        "SELECT sha256, text, skills, skills_taxonomy FROM documents ORDER BY created_at"
+    )
+    for sha256, text, skills, skills_taxonomy in rows:
+        yield sha256, text, json.loads(skills) if skills else None, skills_taxonomy
+
+
+def put_skills(sha256: str, skills: List[str], taxonomy: Optional[str] = None) -> None:
+    """Store the skills extracted from a stored resume with a given taxonomy version"""
+    if not store_enabled():
+        return
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "UPDATE documents SET skills = ?, skills_taxonomy = ? WHERE sha256 = ?",
+            (json.dumps(skills), taxonomy, sha256)
+        )
+
+
+def _job_row(row: Tuple) -> Dict:
+    (job_id, sha256, title, text, skills, skills_taxonomy,
+     vector_indices, vector_data, model_version) = row
+    return {
+        "id": job_id,
+        "sha256": sha256,
+        "title": title,
+        "text": text,
+        "skills": json.loads(skills),
+        "skills_taxonomy": skills_taxonomy,
+        "vector": (vector_indices, vector_data) if vector_indices is not None else None,
+        "model_version": model_version,
+    }
+
+
+def put_job(sha256: str, title: Optional[str], text: str, features: Dict) -> None:
+    """
+    Register a job posting; registering the same text again is a no-op
+
+    Args:
+        sha256: Hex digest of the normalized job description
+        title: Optional display title
+        text: Normalized job description
+        features: Skills, vector and versions as returned by
+            app.jobs.job_features
+    """
+    if not store_enabled():
+        return
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO jobs (sha256, title, text, skills, skills_taxonomy, "
+            "vector_indices, vector_data, model_version, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (sha256, title, text, *_job_features(features), time.time())
+        )
+
+
+def update_job_features(sha256: str, features: Dict) -> None:
+    """Replace the skills and vector of a job, e.g. after a taxonomy or model change"""
+    if not store_enabled():
+        return
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "UPDATE jobs SET skills = ?, skills_taxonomy = ?, vector_indices = ?, "
+            "vector_data = ?, model_version = ? WHERE sha256 = ?",
+            (*_job_features(features), sha256)
+        )
+
+
+def _job_features(features: Dict) -> Tuple:
+    vector = features["vector"] or (None, None)
+    return (json.dumps(features["skills"]), features["taxonomy"],
+            vector[0], vector[1], features["model_version"])
+
+
+def get_job(sha256: str) -> Optional[Dict]:
+    """Look up a registered job posting by the SHA-256 of its normalized text"""
+    if not store_enabled():
+        return None
+    row = _connection().execute(
+        f"SELECT {_JOB_COLUMNS} FROM jobs WHERE sha256 = ?", (sha256,)
+    ).fetchone()
+    return _job_row(row) if row is not None else None
+
+
+def iter_jobs(after_id: int = 0) -> Iterator[Dict]:
+    """
+    Iterate over job postings in registration order
+
+    Args:
+        after_id: Only return jobs registered after the job with this id
+    """
+    if not store_enabled():
+        return
+    rows = _connection().execute(
+        f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id > ? ORDER BY id", (after_id,)
+    )
+    for row in rows:
+        yield _job_row(row)
+
+
+def put_task(task_id: str, filename: str, file_bytes: bytes,
+             job_description: Optional[str], job_id: Optional[str]) -> None:
+    """Queue an asynchronous analysis"""
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "INSERT INTO tasks (id, status, filename, file, job_description, job_id, created_at) "
+            "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+            (task_id, filename, file_bytes, job_description, job_id, time.time())
+        )
+
+
+def claim_task(lease_seconds: float, max_attempts: int) -> Optional[Dict]:
+    """
+    Take the oldest queued analysis and mark it running
+
+    Analyses left running for longer than lease_seconds (their worker
+    crashed or was killed) are taken again, up to max_attempts times.
+
+    Returns:
+        Dictionary with id, filename, file, job_description, job_id and
+        created_at, or None if nothing is queued
+    """
+    now = time.time()
+    conn = _connection()
+    with conn:
+        rows = conn.execute(
+            "UPDATE tasks SET status = 'running', started_at = ?, attempts = attempts + 1 "
+            "WHERE id = (SELECT id FROM tasks WHERE status = 'queued' "
+            "OR (status = 'running' AND started_at < ? AND attempts < ?) "
+            "ORDER BY created_at LIMIT 1) "
+            "RETURNING id, filename, file, job_description, job_id, created_at",
+            (now, now - lease_seconds, max_attempts)
+        ).fetchall()
+    if not rows:
+        return None
+    task_id, filename, file_bytes, job_description, job_id, created_at = rows[0]
+    return {"id": task_id, "filename": filename, "file": file_bytes,
+            "job_description": job_description, "job_id": job_id, "created_at": created_at}
+
+
+def finish_task(task_id: str, result: Optional[Dict] = None,
+                error: Optional[str] = None, error_status: Optional[int] = None) -> None:
+    """Record the result (or error) of an analysis and drop its file"""
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "UPDATE tasks SET status = ?, result = ?, error = ?, error_status = ?, "
+            "file = NULL, finished_at = ? WHERE id = ?",
+            ("failed" if error is not None else "done",
+             json.dumps(result) if result is not None else None,
+             error, error_status, time.time(), task_id)
+        )
+
+
+def requeue_task(task_id: str) -> None:
+    """Put a running analysis back in the queue, e.g. on shutdown"""
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "UPDATE tasks SET status = 'queued', started_at = NULL, attempts = attempts - 1 "
+            "WHERE id = ? AND status = 'running'",
+            (task_id,)
+        )
+
+
+def get_task(task_id: str) -> Optional[Dict]:
+    """
+    Look up an asynchronous analysis
+
+    Returns:
+        Dictionary with status, result, error and error_status, and for
+        queued analyses the number queued ahead of it, or None if unknown
+    """
+    conn = _connection()
+    row = conn.execute(
+        "SELECT status, result, error, error_status, created_at FROM tasks WHERE id = ?",
+        (task_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    status, result, error, error_status, created_at = row
+    task = {
+        "status": status,
+        "result": json.loads(result) if result is not None else None,
+        "error": error,
+        "error_status": error_status,
+    }
+    if status == "queued":
+        task["position"] = conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status = 'queued' AND created_at < ?",
+            (created_at,)
+        ).fetchone()[0]
+    return task
+
+
+def count_queued_tasks() -> int:
+    return _connection().execute(
+        "SELECT COUNT(*) FROM tasks WHERE status = 'queued'"
+    ).fetchone()[0]
+
+
+def purge_tasks(finished_before: float, stale_before: float, max_attempts: int) -> None:
+    """
+    Delete analyses finished before a cutoff, and fail those that ran out
+    of attempts without finishing
+    """
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "UPDATE tasks SET status = 'failed', error = 'Analysis did not finish', "
+            "error_status = 500, file = NULL, finished_at = ? "
+            "WHERE status = 'running' AND started_at < ? AND attempts >= ?",
+            (time.time(), stale_before, max_attempts)
+        )
+        conn.execute(
+            "DELETE FROM tasks WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (finished_before,)
+        )
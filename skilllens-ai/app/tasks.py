@@ -0,0 +1,188 @@
+"""
+Asynchronous analyses backed by a queue in the document store
+
+POST /analyze/async stores the upload in the tasks table and returns a task
+id at once. Background workers in every API process take queued analyses
+in arrival order and run them through the same pipeline as /analyze, so
+the cost of an analysis no longer counts against the client's request
+timeout. Clients poll GET /tasks/{task_id}, optionally waiting for the
+result.
+
+Queued analyses survive a restart. One that was running when its process
+died is taken again once its lease expires.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from app import store
+from app.errors import AnalysisError
+from app.metrics import TASK_QUEUE_SECONDS, TASKS
+from app.pipeline import analyze_upload, get_registered_job
+
+# Analyses run at the same time by each API process
+TASK_WORKERS = int(os.environ.get("SKILLLENS_TASK_WORKERS", "2"))
+
+# Submissions are refused while this many analyses are waiting
+TASK_QUEUE_DEPTH = int(os.environ.get("SKILLLENS_TASK_QUEUE_DEPTH", "1000"))
+
+# A running analysis not finished after this long is assumed lost and
+# queued again, at most TASK_MAX_ATTEMPTS times in all
+TASK_LEASE_SECONDS = float(os.environ.get("SKILLLENS_TASK_LEASE_SECONDS", "300"))
+TASK_MAX_ATTEMPTS = 3
+
+# Finished analyses are kept this long for clients to collect
+TASK_TTL_SECONDS = float(os.environ.get("SKILLLENS_TASK_TTL_SECONDS", "3600"))
+
+# Longest wait a client can ask for, below the backend's 30 s HTTP timeout
+MAX_WAIT_SECONDS = 25.0
+
+# Idle workers check the queue this often for analyses submitted to
+# other processes
+POLL_SECONDS = 1.0
+PURGE_SECONDS = 60.0
+
+_workers: List[asyncio.Task] = []
+_submitted = asyncio.Event()
+_finished = asyncio.Condition()
+_last_purge = 0.0
+
+
+def _require_store() -> None:
+    if not store.store_enabled():
+        raise AnalysisError(503, "Asynchronous analysis needs the document store (SKILLLENS_DOCUMENT_STORE)")
+
+
+async def submit_analysis(filename: str, file_bytes: bytes,
+                          job_description: Optional[str], job_id: Optional[str]) -> Dict:
+    """
+    Queue an analysis of an uploaded resume
+
+    Args:
+        filename: Original file name, used to pick the parser
+        file_bytes: Raw file contents
+        job_description: Text of the job posting, or None if job_id is given
+        job_id: Id of a posting registered with /jobs
+
+    Returns:
+        Dictionary with the task id, status and queue position
+
+    Raises:
+        AnalysisError: 503 if the queue is full or the store is disabled
+    """
+    _require_store()
+
+    queued = await asyncio.to_thread(store.count_queued_tasks)
+    if queued >= TASK_QUEUE_DEPTH:
+        raise AnalysisError(503, "Too many analyses queued, retry later")
+
+    task_id = uuid.uuid4().hex
+    await asyncio.to_thread(store.put_task, task_id, filename, file_bytes, job_description, job_id)
+    _submitted.set()
+    return {"task_id": task_id, "status": "queued", "position": queued}
+
+
+async def get_task_status(task_id: str, wait: float = 0.0) -> Dict:
+    """
+    Status of an asynchronous analysis, with its result once finished
+
+    Args:
+        task_id: Id returned by submit_analysis
+        wait: Seconds to wait for the analysis to finish before answering
+
+    Raises:
+        AnalysisError: 404 if the task is unknown or has expired
+    """
+    _require_store()
+
+    deadline = time.monotonic() + min(wait, MAX_WAIT_SECONDS)
+    while True:
+        task = await asyncio.to_thread(store.get_task, task_id)
+        if task is None:
+            raise AnalysisError(404, "Unknown task_id, it may have expired")
+
+        remaining = deadline - time.monotonic()
+        if task["status"] in ("done", "failed") or remaining <= 0:
+            return task
+
+        # Woken when a worker of this process finishes; analyses finished
+        # by other processes are seen at the next poll
+        async with _finished:
+            try:
+                await asyncio.wait_for(_finished.wait(), min(remaining, POLL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+
+
+async def _run(task: Dict) -> None:
+    TASK_QUEUE_SECONDS.observe(max(time.time() - task["created_at"], 0.0))
+    try:
+        job = await get_registered_job(task["job_id"]) if task["job_id"] else None
+        analysis = await analyze_upload(task["filename"], task["file"], task["job_description"], job)
+        await asyncio.to_thread(store.finish_task, task["id"], analysis)
+        TASKS.inc(status="done")
+    except asyncio.CancelledError:
+        await asyncio.shield(asyncio.to_thread(store.requeue_task, task["id"]))
+        raise
+    except AnalysisError as ae:
+        await asyncio.to_thread(store.finish_task, task["id"], None, ae.detail, ae.status_code)
+        TASKS.inc(status="failed")
+    except Exception as e:
+        await asyncio.to_thread(store.finish_task, task["id"], None, f"Analysis failed: {str(e)}", 500)
+        TASKS.inc(status="failed")
+
+    async with _finished:
+        _finished.notify_all()
+
+
+async def _purge() -> None:
+    global _last_purge
+
+    now = time.time()
+    if now - _last_purge < PURGE_SECONDS:
+        return
+    _last_purge = now
+    await asyncio.to_thread(store.purge_tasks, now - TASK_TTL_SECONDS,
+                            now - TASK_LEASE_SECONDS, TASK_MAX_ATTEMPTS)
+
+
+async def _worker() -> None:
+    while True:
+        try:
+            task = await asyncio.to_thread(store.claim_task, TASK_LEASE_SECONDS, TASK_MAX_ATTEMPTS)
+        except Exception as e:
+            print(f"Error reading the task queue: {e}")
+            task = None
+
+        if task is not None:
+            await _run(task)
+            continue
+
+        try:
+            await _purge()
+        except Exception as e:
+            print(f"Error purging finished tasks: {e}")
+        _submitted.clear()
+        try:
+            await asyncio.wait_for(_submitted.wait(), POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_task_workers(workers: int = TASK_WORKERS) -> None:
+    """Start the background workers that run queued analyses"""
+    if _workers or not store.store_enabled():
+        return
+    for _ in range(workers):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop_task_workers() -> None:
+    """Stop the workers; analyses they were running go back to the queue"""
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,295 @@
+"""
+Skill taxonomy: canonical skills, aliases, categories and learning resources
+
+The taxonomy lives in one JSON file (app/taxonomy.json by default):
+
+    {
+      "version": 1,
+      "categories": {"programming": "Programming Languages", ...},
+      "skills": [
+        {"name": "python", "category": "programming",
+         "aliases": ["py"], "resources": "python"},
+        ...
+      ],
+      "resources": {"python": {"priority": "high", "courses": [...]}, ...}
+    }
+
+It is compiled into a SkillIndex with dictionary lookups for alias to
+canonical skill, skill to category and skill to resources, plus the regexes
+used by the extractor. Replace the file atomically (write a copy, then
+rename it over the original) and every worker swaps in the new index on its
+next call. Validate a file before deploying it with:
+
+    python -m app.taxonomy check path/to/taxonomy.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+TAXONOMY_PATH = Path(os.environ.get(
+    "SKILLLENS_TAXONOMY",
+    Path(__file__).resolve().parent / "taxonomy.json"
+))
+
+# Chunks shorter than this are never looked up in the spaCy stage
+MIN_SUBSTRING_CHARS = 3
+
+_WORD_CHAR = re.compile(r'\w')
+
+
+def _is_boundary(term: str, index: int) -> bool:
+    """Check whether a regex word boundary (\\b) falls at index inside term"""
+    before = bool(_WORD_CHAR.match(term[index - 1]))
+    after = bool(_WORD_CHAR.match(term[index]))
+    return before != after
+
+
+def _trie_pattern(node: Dict) -> str:
+    """Render a character trie as a regex that prefers the longest term"""
+    branches = [
+        re.escape(char) + _trie_pattern(child)
+        for char, child in sorted(node.items()) if char != ""
+    ]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # Greedy optional: try the longer terms first, fall back to this one
+        if len(branches) == 1:
+            pattern = "(?:" + pattern + ")"
+        pattern += "?"
+    return pattern
+
+
+def _compile_skill_matcher(terms: Dict[str, str],
+                           word_boundaries: bool = True) -> Tuple[re.Pattern, Dict[str, Set[str]]]:
+    """
+    Compile skills and aliases into a single trie-shaped regex
+
+    The regex is a zero-width lookahead, so it is tried at every position of
+    the text and reports the longest term starting there. Shorter terms that
+    start at the same position are recovered from a precomputed table of the
+    terms each term contains, which gives exactly the same set of skills as
+    searching every term separately.
+
+    Args:
+        terms: Mapping of lowercase term (skill or alias) to canonical skill
+        word_boundaries: Only match terms delimited by word boundaries (\\b)
+
+    Returns:
+        Compiled regex and mapping of matched term to the skills it implies
+    """
+    trie: Dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    boundary = r'\b' if word_boundaries else ''
+    regex = re.compile(r'(?=' + boundary + '(' + _trie_pattern(trie) + ')' + boundary + ')')
+
+    # Look up each slice of a term instead of searching for every other
+    # term in it, so this grows with the number of terms, not its square
+    implied: Dict[str, Set[str]] = {}
+    for term in terms:
+        if word_boundaries:
+            cuts = [0] + [i for i in range(1, len(term)) if _is_boundary(term, i)] + [len(term)]
+        else:
+            cuts = list(range(len(term) + 1))
+        implied[term] = {
+            terms[term[start:end]]
+            for i, start in enumerate(cuts) for end in cuts[i + 1:]
+            if term[start:end] in terms
+        }
+
+    return regex, implied
+
+
+class SkillIndex:
+    """
+    Compiled, read-only form of the taxonomy
+
+    Never modified after construction; a reload builds a new index and
+    replaces the reference, so callers holding an index keep a consistent
+    view for the rest of their call.
+    """
+
+    def __init__(self, data: Dict, version: str):
+        self.version = version
+        self.categories: Dict[str, str] = dict(data.get("categories", {}))
+        resources = data.get("resources", {})
+
+        self.skills: List[str] = []
+        self.canonical: Dict[str, str] = {}
+        self.category_of: Dict[str, Optional[str]] = {}
+        self.resources: Dict[str, Dict] = {}
+        self.resource_ids: Dict[str, str] = {}
+
+        # Every learning resource entry by its id, as served by /resources
+        self.resource_catalog: Dict[str, Dict] = dict(resources)
+
+        for entry in data.get("skills", []):
+            name = str(entry.get("name", "")).strip().lower()
+            if not name:
+                raise ValueError(f"Skill without a name: {entry}")
+            if name in self.category_of:
+                raise ValueError(f"Duplicate skill: {name}")
+
+            category = entry.get("category")
+            if category is not None and category not in self.categories:
+                raise ValueError(f"Unknown category {category!r} for skill {name!r}")
+
+            resource = entry.get("resources")
+            if resource is not None:
+                if resource not in resources:
+                    raise ValueError(f"Unknown resources {resource!r} for skill {name!r}")
+                self.resources[name] = resources[resource]
+                self.resource_ids[name] = resource
+
+            self.skills.append(name)
+            self.category_of[name] = category
+            for term in [name] + [alias.strip().lower() for alias in entry.get("aliases", [])]:
+                if self.canonical.get(term, name) != name:
+                    raise ValueError(
+                        f"{term!r} is used by both {self.canonical[term]!r} and {name!r}"
+                    )
+                self.canonical[term] = name
+
+        # Dense integer id of each skill, in file order; bit positions in
+        # the skill bitmap index
+        self.skill_ids: Dict[str, int] = {skill: i for i, skill in enumerate(self.skills)}
+
+        # Skills and aliases anywhere in a text
+        self.regex, self.implied = _compile_skill_matcher(self.canonical)
+
+        # Lookup structures for the spaCy stage: skills occurring anywhere
+        # inside a noun chunk, skills that contain a noun chunk, and exact
+        # entity names
+        self.substring_regex, self.contained = _compile_skill_matcher(
+            {skill: skill for skill in self.skills}, word_boundaries=False
+        )
+        self.skills_by_substring: Dict[str, Set[str]] = {}
+        for skill in self.skills:
+            for start in range(len(skill)):
+                for end in range(start + MIN_SUBSTRING_CHARS, len(skill) + 1):
+                    self.skills_by_substring.setdefault(skill[start:end], set()).add(skill)
+        self.names = frozenset(self.skills)
+
+    def canonicalize(self, term: str) -> Optional[str]:
+        """Canonical skill for a skill name or alias, or None if unknown"""
+        return self.canonical.get(term.strip().lower())
+
+    def category(self, skill: str) -> Optional[str]:
+        canonical = self.canonicalize(skill)
+        return self.category_of.get(canonical) if canonical else None
+
+    def resource(self, skill: str) -> Optional[Dict]:
+        canonical = self.canonicalize(skill)
+        return self.resources.get(canonical) if canonical else None
+
+    def resource_id(self, skill: str) -> Optional[str]:
+        """Id of the skill's entry in resource_catalog, or None if it has none"""
+        canonical = self.canonicalize(skill)
+        return self.resource_ids.get(canonical) if canonical else None
+
+    def match(self, text_lower: str) -> Set[str]:
+        """Canonical skills whose name or alias occurs in the lowercased text"""
+        found_skills = set()
+        for match in self.regex.finditer(text_lower):
+            found_skills.update(self.implied[match.group(1)])
+        return found_skills
+
+    def stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "skills": len(self.skills),
+            "aliases": len(self.canonical) - len(self.skills),
+            "categories": len(self.categories),
+            "resources": len(self.resources),
+        }
+
+
+def compile_taxonomy(raw: bytes) -> SkillIndex:
+    """
+    Parse and compile a taxonomy file
+
+    Args:
+        raw: Contents of the JSON file
+
+    Returns:
+        Compiled index, versioned by a hash of the file contents
+
+    Raises:
+        ValueError: If the file is not valid JSON or is inconsistent
+    """
+    return SkillIndex(json.loads(raw), hashlib.sha256(raw).hexdigest()[:16])
+
+
+def load_taxonomy(path: Path = TAXONOMY_PATH) -> SkillIndex:
+    return compile_taxonomy(Path(path).read_bytes())
+
+
+_index: Optional[SkillIndex] = None
+_loaded_mtime: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_taxonomy() -> SkillIndex:
+    """
+    Return the current skill index
+
+    The file is compiled on first use and recompiled whenever it is
+    replaced. If a new file fails to load, the previous index stays in use.
+    """
+    global _index, _loaded_mtime
+
+    try:
+        mtime = os.stat(TAXONOMY_PATH).st_mtime_ns
+    except OSError:
+        mtime = _loaded_mtime
+
+    if mtime != _loaded_mtime or _index is None:
+        with _lock:
+            if mtime != _loaded_mtime or _index is None:
+                try:
+                    _index = load_taxonomy(TAXONOMY_PATH)
+                    _loaded_mtime = mtime
+                except Exception as e:
+                    if _index is None:
+                        raise
+                    print(f"Error loading skill taxonomy: {e}")
+                    _loaded_mtime = mtime
+
+    return _index
+
+
+def taxonomy_version() -> str:
+    """Version of the current taxonomy, for keying cached skill lists"""
+    return get_taxonomy().version
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the skill taxonomy")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    check = subparsers.add_parser("check", help="Validate and compile a taxonomy file")
+    check.add_argument("path", type=Path, nargs="?", default=TAXONOMY_PATH)
+
+    args = parser.parse_args(argv)
+
+    try:
+        index = load_taxonomy(args.path)
+    except (OSError, ValueError) as e:
+        parser.error(f"{args.path}: {e}")
+    print(json.dumps(index.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Shared TF-IDF model for text similarity
+
+The vocabulary and IDF weights are fitted offline on a local corpus of
+resumes and job descriptions, so requests only ever call transform():
+
+    python -m app.vectorizer fit path/to/corpus [--output models/tfidf.joblib]
+
+The fitted model is written next to the target and atomically renamed over
+it; running workers notice the new file and reload it on their next call.
+"""
+
+import argparse
+import os
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional
+
+from app.parsers import extract_text_from_docx, extract_text_from_pdf
+
+MODEL_PATH = Path(os.environ.get(
+    "SKILLLENS_TFIDF_MODEL",
+    Path(__file__).resolve().parent.parent / "models" / "tfidf.joblib"
+))
+
+# Vocabulary size of the corpus model; the per-pair fallback keeps using 500
+CORPUS_MAX_FEATURES = 20000
+
+CORPUS_EXTENSIONS = ('.txt', '.pdf', '.docx')
+
+# scikit-learn and joblib are imported on first use to keep startup fast
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+_vectorizer: Optional["TfidfVectorizer"] = None
+_loaded_mtime: Optional[int] = None
+
+# Parameters that decide how a vectorizer turns text into n-grams
+ANALYZER_PARAMS = (
+    "input", "encoding", "decode_error", "strip_accents", "lowercase", "preprocessor",
+    "tokenizer", "analyzer", "stop_words", "token_pattern", "ngram_range",
+)
+
+_ngram_analyzer: Optional[Callable[[str], List[str]]] = None
+_ngram_model: Optional["TfidfVectorizer"] = None
+_ngram_model_source: Optional["TfidfVectorizer"] = None
+
+
+def build_vectorizer(max_features: int = 500) -> "TfidfVectorizer":
+    """Create an unfitted vectorizer with the settings used for similarity"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    return TfidfVectorizer(
+        max_features=max_features,
+        stop_words='english',
+        ngram_range=(1, 2)  # Consider unigrams and bigrams
+    )
+
+
+def _identity(ngrams: List[str]) -> List[str]:
+    return ngrams
+
+
+def ngram_analyzer() -> Callable[[str], List[str]]:
+    """
+    Tokenizer and n-gram builder of build_vectorizer, for text that is
+    already lowercased (see app.document.Document.ngrams)
+    """
+    global _ngram_analyzer
+
+    if _ngram_analyzer is None:
+        _ngram_analyzer = build_vectorizer().set_params(lowercase=False).build_analyzer()
+    return _ngram_analyzer
+
+
+def build_ngram_vectorizer(max_features: int = 500) -> "TfidfVectorizer":
+    """build_vectorizer for documents given as their ngram_analyzer output"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    return TfidfVectorizer(max_features=max_features, analyzer=_identity)
+
+
+def ngram_model(vectorizer: "TfidfVectorizer") -> Optional["TfidfVectorizer"]:
+    """
+    A fitted vectorizer's vocabulary and IDF weights, applied to documents
+    given as their ngram_analyzer output
+
+    Built once per loaded model. Its transform() returns exactly what the
+    fitted vectorizer's transform() returns for the original texts.
+
+    Returns:
+        The n-gram model, or None if the fitted vectorizer was not made
+        with build_vectorizer's analyzer settings and IDF weighting
+    """
+    global _ngram_model, _ngram_model_source
+
+    if _ngram_model_source is vectorizer:
+        return _ngram_model
+
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    fitted = vectorizer.get_params()
+    expected = build_vectorizer().get_params()
+    model = None
+    if vectorizer.use_idf and all(fitted[name] == expected[name] for name in ANALYZER_PARAMS):
+        model = TfidfVectorizer(
+            analyzer=_identity,
+            vocabulary=vectorizer.vocabulary_,
+            binary=vectorizer.binary,
+            dtype=vectorizer.dtype,
+            norm=vectorizer.norm,
+            smooth_idf=vectorizer.smooth_idf,
+            sublinear_tf=vectorizer.sublinear_tf,
+        )
+        model.idf_ = vectorizer.idf_
+
+    _ngram_model, _ngram_model_source = model, vectorizer
+    return model
+
+
+def fit_vectorizer(documents: List[str],
+                   max_features: int = CORPUS_MAX_FEATURES) -> "TfidfVectorizer":
+    """
+    Fit vocabulary and IDF weights on a corpus
+
+    Args:
+        documents: Resume and job description texts
+        max_features: Maximum vocabulary size
+
+    Returns:
+        Fitted vectorizer
+    """
+    vectorizer = build_vectorizer(max_features)
+    vectorizer.fit(documents)
+    # Only needed for introspection and can be huge; drop before saving
+    vectorizer.stop_words_ = None
+    return vectorizer
+
+
+def save_vectorizer(vectorizer: "TfidfVectorizer", path: Path = MODEL_PATH) -> None:
+    """Write a fitted vectorizer to path, atomically replacing any old model"""
+    import joblib
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            joblib.dump(vectorizer, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_vectorizer(path: Path = MODEL_PATH) -> "TfidfVectorizer":
+    """
+    Load a fitted vectorizer
+
+    Only the IDF diagonal's arrays are memory-mapped; the vocabulary, by
+    far the larger part, is an ordinary dict in each process. Workers share
+    it only by loading the model before they fork (see app.serve).
+    """
+    import joblib
+
+    return joblib.load(path, mmap_mode='r')
+
+
+def get_vectorizer() -> Optional["TfidfVectorizer"]:
+    """
+    Return the shared fitted vectorizer
+
+    The model is loaded on first use and reloaded whenever the file on disk
+    is replaced.
+
+    Returns:
+        Fitted vectorizer, or None if no model has been fitted
+    """
+    global _vectorizer, _loaded_mtime
+
+    try:
+        mtime = os.stat(MODEL_PATH).st_mtime_ns
+    except OSError:
+        return _vectorizer
+
+    if mtime != _loaded_mtime:
+        try:
+            _vectorizer = load_vectorizer(MODEL_PATH)
+            _loaded_mtime = mtime
+        except Exception as e:
+            print(f"Error loading TF-IDF model: {e}")
+
+    return _vectorizer
+
+
+def model_version() -> Optional[str]:
+    """
+    Identifies the loaded model, so vectors from different fits are never mixed
+
+    Returns:
+        Modification time of the loaded model file, or None without a model
+    """
+    vectorizer = get_vectorizer()
+    return str(_loaded_mtime) if vectorizer is not None else None
+
+
+def iter_corpus(directory: Path) -> Iterator[str]:
+    """Yield the text of every resume or job description under directory"""
+    for path in sorted(Path(directory).rglob("*")):
+        suffix = path.suffix.lower()
+        if not path.is_file() or suffix not in CORPUS_EXTENSIONS:
+            continue
+        try:
+            if suffix == '.txt':
+                yield path.read_text(encoding="utf-8", errors="ignore")
+            elif suffix == '.pdf':
+                yield extract_text_from_pdf(path.read_bytes())
+            else:
+                yield extract_text_from_docx(path.read_bytes())
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the shared TF-IDF model")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fit = subparsers.add_parser("fit", help="Fit the model on a corpus directory")
+    fit.add_argument("corpus", type=Path, help="Directory of .txt, .pdf and .docx files")
+    fit.add_argument("--output", type=Path, default=MODEL_PATH)
+    fit.add_argument("--max-features", type=int, default=CORPUS_MAX_FEATURES)
+
+    args = parser.parse_args(argv)
+
+    documents = list(iter_corpus(args.corpus))
+    if not documents:
+        parser.error(f"No documents found in {args.corpus}")
+
+    vectorizer = fit_vectorizer(documents, args.max_features)
+    save_vectorizer(vectorizer, args.output)
+    print(f"Fitted TF-IDF model on {len(documents)} documents "
+          f"({len(vectorizer.vocabulary_)} terms) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
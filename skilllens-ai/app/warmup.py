@@ -0,0 +1,105 @@
+import os
+import time
+from typing import Dict, List, Optional
+
+# Report not ready when the spaCy model failed to load (set to 0 to serve
+# with regex-only extraction)
+REQUIRE_NLP = os.environ.get("SKILLLENS_REQUIRE_NLP", "1") == "1"
+
+SAMPLE_RESUME = (
+    "Software engineer with five years of experience in Python, JavaScript "
+    "and React. Built REST API services on AWS with Docker and PostgreSQL, "
+    "and led an agile team delivering machine learning features."
+)
+
+SAMPLE_JOB_DESCRIPTION = (
+    "We are hiring a backend engineer with Python, Kubernetes, AWS and "
+    "PostgreSQL experience. Knowledge of machine learning is a plus."
+)
+
+# Warm-up result of this process (set in each executor worker)
+_worker_status: Optional[Dict] = None
+
+# Readiness of the service as seen by the API process
+_readiness: Dict = {
+    "ready": False,
+    "import_seconds": None,
+    "warmup_seconds": None,
+    "workers": [],
+}
+
+
+def warm_up() -> Dict:
+    """
+    Load the models and run a dummy analysis so the first request is fast
+
+    Loads the spaCy pipeline, the skill taxonomy and the TF-IDF model, then
+    pushes a small resume through the full analysis path (matchers,
+    similarity, recommendations).
+
+    Returns:
+        Load state of each component and the time taken
+    """
+    global _worker_status
+
+    from app.analysis import analyze_resume_text
+    from app.skill_extractor import get_nlp, nlp_status
+    from app.taxonomy import get_taxonomy
+    from app.vectorizer import get_vectorizer
+
+    started = time.perf_counter()
+    get_nlp()
+    taxonomy = get_taxonomy()
+    vectorizer = get_vectorizer()
+    analyze_resume_text(SAMPLE_RESUME, SAMPLE_JOB_DESCRIPTION)
+
+    _worker_status = {
+        "pid": os.getpid(),
+        "nlp": nlp_status(),
+        "tfidf_model_loaded": vectorizer is not None,
+        "matchers_compiled": True,
+        "taxonomy_version": taxonomy.version,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    return _worker_status
+
+
+def worker_status() -> Optional[Dict]:
+    """Warm-up result of this process, warming it up first if needed"""
+    return _worker_status if _worker_status is not None else warm_up()
+
+
+def record_startup(import_seconds: Optional[float] = None,
+                   warmup_seconds: Optional[float] = None,
+                   workers: Optional[List[Dict]] = None) -> None:
+    """Record startup timings and warm-up results for /ready"""
+    if import_seconds is not None:
+        _readiness["import_seconds"] = round(import_seconds, 3)
+    if warmup_seconds is not None:
+        _readiness["warmup_seconds"] = round(warmup_seconds, 3)
+    if workers is not None:
+        _readiness["workers"] = workers
+        _readiness["ready"] = True
+
+
+def reset_readiness() -> None:
+    _readiness["ready"] = False
+    _readiness["workers"] = []
+
+
+def readiness() -> Dict:
+    """
+    Readiness of the service
+
+    Ready once every worker has warmed up; if REQUIRE_NLP is set, the spaCy
+    model must also have loaded in every worker.
+    """
+    workers = _readiness["workers"]
+    nlp_loaded = bool(workers) and all(w["nlp"]["loaded"] for w in workers)
+    return {
+        **_readiness,
+        "ready": _readiness["ready"] and (nlp_loaded or not REQUIRE_NLP),
+        "warmed_up": _readiness["ready"],
+        "nlp_loaded": nlp_loaded,
+        "tfidf_model_loaded": bool(workers) and all(w["tfidf_model_loaded"] for w in workers),
+    }
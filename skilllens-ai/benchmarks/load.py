@@ -0,0 +1,366 @@
+"""
+Load test: throughput and latency of the running service as concurrency grows
+
+    python -m benchmarks.load                            # 1 worker, default levels
+    python -m benchmarks.load --workers 4 --levels 1,4,8,16,32 --duration 30
+    python -m benchmarks.load --url http://127.0.0.1:8000   # an already running server
+
+Starts the API locally with python -m app.serve, then replays a weighted mix
+of synthetic requests (/analyze with PDF and DOCX resumes, /extract-skills
+with job descriptions) from a fixed number of concurrent clients, each
+sending its next request as soon as the previous one returns. For every
+concurrency level it reports requests/sec, p50/p95/p99 latency, the error
+rate and the memory of the server process tree, and writes them to
+results.json and results.csv in the output directory.
+
+The result, text and skill caches and the document store are disabled in
+the started server, so every request pays for the full analysis. The
+saturation point is the lowest level reaching 95% of the peak throughput;
+past it, more clients only add queueing delay.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from app.metrics import process_memory
+from benchmarks.synthetic import job_description, make_docx, make_pdf, resume_pages
+
+DEFAULT_LEVELS = [1, 2, 4, 8, 16, 32]
+DEFAULT_MIX = "analyze_pdf=4,analyze_docx=3,extract_skills=3"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Distinct documents per request kind, and their size in pages
+DOCUMENTS = 16
+RESUME_PAGES = 2
+
+# Share of the peak throughput that counts as saturated
+SATURATION_SHARE = 0.95
+
+STARTUP_TIMEOUT = 120.0
+MEMORY_SAMPLE_SECONDS = 1.0
+
+# Environment of the started server: no caching, nothing written to disk
+SERVER_ENV = {
+    "SKILLLENS_RESULT_CACHE_SIZE": "0",
+    "SKILLLENS_TEXT_CACHE_SIZE": "0",
+    "SKILLLENS_SKILLS_CACHE_SIZE": "0",
+    "SKILLLENS_JOB_CACHE_SIZE": "0",
+    "SKILLLENS_DOCUMENT_STORE": "",
+    "SKILLLENS_CORPUS_INDEX": "",
+    "SKILLLENS_SKILL_BITMAP": "",
+}
+
+Request = Tuple[str, Dict]
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse "kind=weight,..." into weights per request kind"""
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in ("analyze_pdf", "analyze_docx", "extract_skills"):
+            raise ValueError(f"Unknown request kind {kind!r}")
+        weights[kind] = float(weight or 1)
+    return weights
+
+
+def build_requests(seed: int = 0) -> Dict[str, List[Request]]:
+    """Synthetic requests of each kind, as (path, httpx keyword arguments)"""
+    requests: Dict[str, List[Request]] = {"analyze_pdf": [], "analyze_docx": [], "extract_skills": []}
+    for n in range(DOCUMENTS):
+        pages = resume_pages(RESUME_PAGES, seed + n)
+        jd = job_description(seed + n)
+        requests["analyze_pdf"].append(("/analyze", {
+            "files": {"resume": (f"resume{n}.pdf", make_pdf(pages), "application/pdf")},
+            "data": {"job_description": jd},
+        }))
+        requests["analyze_docx"].append(("/analyze", {
+            "files": {"resume": (f"resume{n}.docx", make_docx(pages, seed + n))},
+            "data": {"job_description": jd},
+        }))
+        requests["extract_skills"].append(("/extract-skills", {"data": {"text": jd}}))
+    return requests
+
+
+def _process_tree(pid: int) -> List[int]:
+    """pid and all of its descendants"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields after it don't
+                parent = int(f.read().rpartition(")")[2].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    tree = [pid]
+    for current in tree:
+        tree.extend(children.get(current, []))
+    return tree
+
+
+def tree_memory(pid: int) -> Dict[str, int]:
+    """Summed rss and pss of a process and its descendants, in bytes"""
+    total = {"rss": 0, "pss": 0, "processes": 0}
+    for member in _process_tree(pid):
+        memory = process_memory(member)
+        if memory:
+            total["rss"] += memory["rss"]
+            total["pss"] += memory["pss"]
+            total["processes"] += 1
+    return total
+
+
+class Server:
+    """The API started in a child process for the duration of the test"""
+
+    def __init__(self, port: int, workers: int, log_path: Path):
+        self.port = port
+        self.workers = workers
+        self.log_path = log_path
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> None:
+        env = dict(os.environ, **SERVER_ENV)
+        log = open(self.log_path, "w")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(self.port),
+             "--workers", str(self.workers), "--report-seconds", "0", "--log-level", "warning"],
+            cwd=Path(__file__).resolve().parent.parent, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        log.close()
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited during startup, see {self.log_path}")
+            try:
+                if httpx.get(f"{self.url}/health", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.5)
+        raise RuntimeError(f"Server did not start within {STARTUP_TIMEOUT:.0f}s, see {self.log_path}")
+
+    def stop(self) -> None:
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+async def _client(client: httpx.AsyncClient, requests: Dict[str, List[Request]],
+                  weights: Dict[str, float], stop_at: float, rng: random.Random,
+                  samples: List[Tuple[str, float, bool]]) -> None:
+    kinds = list(weights)
+    kind_weights = [weights[kind] for kind in kinds]
+    while time.perf_counter() < stop_at:
+        kind = rng.choices(kinds, kind_weights)[0]
+        path, kwargs = rng.choice(requests[kind])
+        started = time.perf_counter()
+        try:
+            response = await client.post(path, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        samples.append((kind, time.perf_counter() - started, ok))
+
+
+async def _sample_memory(pid: int, peak: Dict[str, int]) -> None:
+    while True:
+        memory = await asyncio.to_thread(tree_memory, pid)
+        for key, value in memory.items():
+            peak[key] = max(peak.get(key, 0), value)
+        await asyncio.sleep(MEMORY_SAMPLE_SECONDS)
+
+
+def summarize(samples: List[Tuple[str, float, bool]], seconds: float) -> Dict:
+    """Throughput, latency percentiles and error rate of a set of samples"""
+    latencies = [latency for _, latency, ok in samples if ok]
+    errors = sum(1 for _, _, ok in samples if not ok)
+    summary = {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "rps": round(len(latencies) / seconds, 2),
+    }
+    for percent in (50, 95, 99):
+        summary[f"p{percent}_ms"] = round(_percentile(latencies, percent) * 1000, 1) if latencies else None
+    return summary
+
+
+async def run_level(url: str, concurrency: int, duration: float, warmup: float,
+                    requests: Dict[str, List[Request]], weights: Dict[str, float],
+                    server_pid: Optional[int], timeout: float, seed: int) -> Dict:
+    """Run one concurrency level; samples taken during the warm-up are discarded"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        if warmup > 0:
+            stop_at = time.perf_counter() + warmup
+            await asyncio.gather(*[
+                _client(client, requests, weights, stop_at, random.Random(seed + n), [])
+                for n in range(concurrency)
+            ])
+
+        peak: Dict[str, int] = {}
+        sampler = asyncio.create_task(_sample_memory(server_pid, peak)) if server_pid else None
+        samples: List[Tuple[str, float, bool]] = []
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            _client(client, requests, weights, started + duration, random.Random(seed + n), samples)
+            for n in range(concurrency)
+        ])
+        # Requests in flight at the deadline finish after it
+        seconds = time.perf_counter() - started
+        if sampler is not None:
+            sampler.cancel()
+
+    result = {"concurrency": concurrency, "seconds": round(seconds, 3), **summarize(samples, seconds)}
+    result["by_kind"] = {
+        kind: summarize([s for s in samples if s[0] == kind], seconds) for kind in weights
+    }
+    if peak:
+        result["server_rss_mb"] = round(peak["rss"] / 1_048_576, 1)
+        result["server_pss_mb"] = round(peak["pss"] / 1_048_576, 1)
+        result["server_processes"] = peak["processes"]
+    return result
+
+
+def saturation(levels: List[Dict]) -> Optional[Dict]:
+    """The lowest concurrency level reaching SATURATION_SHARE of the peak throughput"""
+    if not levels:
+        return None
+    peak = max(level["rps"] for level in levels)
+    return next(level for level in levels if level["rps"] >= SATURATION_SHARE * peak)
+
+
+def write_results(output_dir: Path, report: Dict) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / "results.json").write_text(json.dumps(report, indent=2))
+
+    columns = ["concurrency", "rps", "p50_ms", "p95_ms", "p99_ms", "error_rate",
+               "requests", "errors", "server_rss_mb", "server_pss_mb"]
+    with open(output_dir / "results.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(report["levels"])
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return f"{value:>9.1f}" if value is not None else f"{'-':>9}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the SkillLens API at increasing concurrency")
+    parser.add_argument("--levels", default=",".join(map(str, DEFAULT_LEVELS)),
+                        help="Comma-separated numbers of concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before each level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Request kinds and their weights")
+    parser.add_argument("--workers", type=int, default=1, help="Server worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="Test this running server instead of starting one (no memory figures)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Client timeout per request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", type=Path,
+                        help=f"Where to write the results (default: a new directory under {RESULTS_DIR})")
+    args = parser.parse_args(argv)
+
+    try:
+        levels = [int(level) for level in args.levels.split(",") if level]
+        weights = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if not levels or min(levels) < 1:
+        parser.error("levels must be positive")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    output_dir = args.output_dir or RESULTS_DIR / f"load-{datetime.now():%Y%m%d-%H%M%S}"
+    requests = build_requests(args.seed)
+
+    server = None
+    if args.url:
+        url, server_pid = args.url.rstrip("/"), None
+    else:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        server = Server(args.port, args.workers, output_dir / "server.log")
+        print(f"Starting {args.workers} server workers on port {args.port}...")
+        server.start()
+        url, server_pid = server.url, server.process.pid
+
+    report = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "url": url,
+        "workers": args.workers if server else None,
+        "cpu_count": os.cpu_count(),
+        "mix": weights,
+        "duration": args.duration,
+        "levels": [],
+    }
+    try:
+        print(f"{'clients':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'errors':>7} {'rss MB':>8}")
+        for concurrency in levels:
+            level = asyncio.run(run_level(
+                url, concurrency, args.duration, args.warmup, requests, weights,
+                server_pid, args.timeout, args.seed,
+            ))
+            report["levels"].append(level)
+            rss = level.get("server_rss_mb")
+            print(f"{concurrency:>7} {level['rps']:>9.2f} {_format_ms(level['p50_ms'])} "
+                  f"{_format_ms(level['p95_ms'])} {_format_ms(level['p99_ms'])} "
+                  f"{level['error_rate']:>7.1%} {rss if rss is not None else '-':>8}")
+    finally:
+        if server is not None:
+            server.stop()
+
+    knee = saturation(report["levels"])
+    if knee is not None:
+        report["saturation"] = {
+            "concurrency": knee["concurrency"],
+            "rps": knee["rps"],
+            "rps_per_worker": round(knee["rps"] / args.workers, 2) if server else None,
+            "rps_per_core": round(knee["rps"] / (os.cpu_count() or 1), 2),
+        }
+        print(f"\nSaturated at {knee['concurrency']} clients: {knee['rps']:.2f} req/s"
+              + (f", {report['saturation']['rps_per_worker']:.2f} per worker" if server else "")
+              + f", {report['saturation']['rps_per_core']:.2f} per core")
+
+    write_results(output_dir, report)
+    print(f"Results written to {output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
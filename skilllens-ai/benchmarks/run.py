@@ -0,0 +1,200 @@
+"""
+Offline benchmarks for the extraction, matching and recommendation hot paths
+
+    python -m benchmarks.run                    # run and compare to baseline
+    python -m benchmarks.run --save-baseline    # record a new baseline
+    python -m benchmarks.run --no-baseline      # only report the results
+    python -m benchmarks.run --tiers 1,10 --iterations 5
+
+Each case is timed over several iterations (mean and p95) and then run once
+more under tracemalloc for peak memory. Results are compared with the
+baseline file: any case whose mean, p95 or peak memory exceeds the
+baseline by more than the tolerance, or that has no baseline entry, is
+reported as a regression and the exit status is 1. A missing baseline
+file exits with status 2 unless --no-baseline is given.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Measure the uncached pipeline, on the calling thread, without touching disk
+os.environ.setdefault("SKILLLENS_EXECUTOR", "inline")
+os.environ.setdefault("SKILLLENS_RESULT_CACHE_SIZE", "0")
+os.environ.setdefault("SKILLLENS_TEXT_CACHE_SIZE", "0")
+os.environ.setdefault("SKILLLENS_SKILLS_CACHE_SIZE", "0")
+os.environ.setdefault("SKILLLENS_DOCUMENT_STORE", "")
+os.environ.setdefault("SKILLLENS_CORPUS_INDEX", "")
+os.environ.setdefault("SKILLLENS_SKILL_BITMAP", "")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.matcher import calculate_match, text_similarity  # noqa: E402
+from app.parsers import extract_text_from_docx, iter_pdf_pages  # noqa: E402
+from app.recommender import get_recommendations  # noqa: E402
+from app.skill_extractor import extract_skills  # noqa: E402
+from benchmarks.synthetic import build_tier  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_TIERS = [1, 10, 50]
+COMPARED_METRICS = {"mean_ms": "ms", "p95_ms": "ms", "peak_kib": "KiB"}
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(func: Callable[[], object], iterations: int) -> Dict:
+    """Time func over several iterations, then record its peak memory"""
+    func()  # warm-up
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "mean_ms": round(statistics.mean(samples) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def tier_cases(tier: Dict, client: TestClient) -> Dict[str, Callable[[], object]]:
+    resume_text = tier["resume_text"]
+    job_description = tier["job_description"]
+    resume_skills = extract_skills(resume_text)
+    job_skills = extract_skills(job_description)
+    missing_skills = calculate_match(resume_skills, job_skills)["missing_skills"]
+
+    def analyze() -> None:
+        response = client.post(
+            "/analyze",
+            files={"resume": ("resume.pdf", tier["pdf"], "application/pdf")},
+            data={"job_description": job_description},
+        )
+        response.raise_for_status()
+
+    return {
+        "extract_skills": lambda: extract_skills(resume_text),
+        "text_similarity": lambda: text_similarity(resume_text, job_description),
+        "calculate_match": lambda: calculate_match(resume_skills, job_skills),
+        "get_recommendations": lambda: get_recommendations(missing_skills),
+        # extract_text_from_pdf parses in a child process, out of
+        # tracemalloc's sight, so the same page-by-page parse is run here
+        "iter_pdf_pages": lambda: [text for _, text, _ in iter_pdf_pages(tier["pdf"])],
+        "extract_text_from_docx": lambda: extract_text_from_docx(tier["docx"]),
+        # Peak memory covers the API side only; PDF parsing is in iter_pdf_pages
+        "analyze_endpoint": analyze,
+    }
+
+
+def run(tiers: List[int], iterations: int) -> Dict[str, Dict]:
+    results = {}
+    with TestClient(app) as client:
+        for pages in tiers:
+            tier = build_tier(pages)
+            for name, func in tier_cases(tier, client).items():
+                key = f"{name}[{pages}p]"
+                results[key] = measure(func, iterations)
+                print(f"{key:34} mean {results[key]['mean_ms']:>10.3f} ms   "
+                      f"p95 {results[key]['p95_ms']:>10.3f} ms   "
+                      f"peak {results[key]['peak_kib']:>10.1f} KiB")
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict],
+            tolerance: float) -> List[str]:
+    """
+    Describe every case that is slower or uses more memory than the
+    baseline beyond tolerance, and every case the two don't share
+
+    Baseline cases of tiers that were not run are ignored.
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            regressions.append(f"{key}: not in the baseline, run with --save-baseline to record it")
+            continue
+        for metric, unit in COMPARED_METRICS.items():
+            limit = previous[metric] * (1 + tolerance)
+            if current[metric] > limit:
+                regressions.append(
+                    f"{key} {metric}: {current[metric]:.3f} {unit} > "
+                    f"{previous[metric]:.3f} {unit} baseline (+{tolerance:.0%} allowed)"
+                )
+
+    tiers_run = {key[key.rindex("["):] for key in results}
+    for key in baseline:
+        if key not in results and key[key.rindex("["):] in tiers_run:
+            regressions.append(f"{key}: in the baseline but no longer measured")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the SkillLens benchmarks")
+    parser.add_argument("--tiers", default=",".join(map(str, DEFAULT_TIERS)),
+                        help="Comma-separated resume sizes in pages (1-50)")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown relative to the baseline")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Write the results as the new baseline")
+    parser.add_argument("--no-baseline", action="store_true",
+                        help="Only report the results, without comparing to a baseline")
+    parser.add_argument("--output", type=Path, help="Also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    tiers = [int(t) for t in args.tiers.split(",") if t]
+    if any(t < 1 or t > 50 for t in tiers):
+        parser.error("tiers must be between 1 and 50 pages")
+
+    results = run(tiers, args.iterations)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if args.no_baseline:
+        return 0
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one "
+              f"on this machine, or --no-baseline to skip the comparison")
+        return 2
+
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+
+    print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
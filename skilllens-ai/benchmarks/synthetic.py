@@ -0,0 +1,135 @@
+"""
+Deterministic synthetic resumes and job descriptions for benchmarking
+
+Everything is generated from a seed, so repeated runs measure the same
+documents. PDFs are written directly (a single Helvetica font, one text
+stream per page); DOCX files are built with python-docx and include a
+header and a skills table like common resume templates.
+"""
+
+import io
+import random
+from typing import Dict, List
+
+import docx
+
+from app.taxonomy import get_taxonomy
+
+LINES_PER_PAGE = 50
+WORDS_PER_LINE = 14
+
+_FILLER = (
+    "designed built delivered maintained improved led mentored migrated "
+    "optimized shipped scalable reliable services platform features team "
+    "customers pipeline latency throughput production releases reviews "
+    "stakeholders roadmap documentation on-call incidents dashboards "
+    "reporting analytics integration testing deployment automation"
+).split()
+
+_SECTIONS = ["Summary", "Experience", "Projects", "Education", "Skills"]
+
+SKILLS = get_taxonomy().skills
+
+
+def _line(rng: random.Random, skill_rate: float = 0.12) -> str:
+    words = []
+    for _ in range(WORDS_PER_LINE):
+        if rng.random() < skill_rate:
+            words.append(rng.choice(SKILLS).title())
+        else:
+            words.append(rng.choice(_FILLER))
+    return " ".join(words)
+
+
+def resume_pages(pages: int, seed: int = 0) -> List[str]:
+    """Text of a synthetic resume, one string per page"""
+    rng = random.Random(seed)
+    result = []
+    for page in range(pages):
+        lines = [f"{_SECTIONS[page % len(_SECTIONS)]} - page {page + 1}"]
+        lines.extend(_line(rng) for _ in range(LINES_PER_PAGE - 1))
+        result.append("\n".join(lines))
+    return result
+
+
+def resume_text(pages: int, seed: int = 0) -> str:
+    return "\n".join(resume_pages(pages, seed)) + "\n"
+
+
+def job_description(seed: int = 0, skills: int = 12) -> str:
+    """A job posting asking for a random sample of known skills"""
+    rng = random.Random(seed + 1_000_003)
+    wanted = rng.sample(SKILLS, skills)
+    lines = ["We are hiring a Senior Software Engineer.", "Requirements:"]
+    lines.extend(f"- Experience with {skill}" for skill in wanted)
+    lines.extend(_line(rng, skill_rate=0.0) for _ in range(15))
+    return "\n".join(lines)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """Write a minimal PDF with one page per string"""
+    count = len(pages)
+    font_id = 3 + 2 * count
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(count))
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {count} >>",
+    ]
+    for i, text in enumerate(pages):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Contents {4 + 2 * i} 0 R /Resources << /Font << /F1 {font_id} 0 R >> >> >>"
+        )
+        lines = " ".join(f"({_pdf_escape(line)}) '" for line in text.split("\n"))
+        stream = f"BT /F1 9 Tf 40 770 Td 14 TL {lines} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n".encode()
+    )
+    return out.getvalue()
+
+
+def make_docx(pages: List[str], seed: int = 0) -> bytes:
+    """Write a DOCX with a header, body paragraphs and a skills table"""
+    rng = random.Random(seed + 7)
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "Jane Doe - Software Engineer"
+    for text in pages:
+        for line in text.split("\n"):
+            document.add_paragraph(line)
+    table = document.add_table(rows=4, cols=3)
+    for row in table.rows:
+        for cell in row.cells:
+            cell.text = ", ".join(rng.sample(SKILLS, 3))
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def build_tier(pages: int, seed: int = 0) -> Dict:
+    """All synthetic inputs for one size tier"""
+    page_texts = resume_pages(pages, seed)
+    return {
+        "pages": pages,
+        "resume_text": "\n".join(page_texts) + "\n",
+        "job_description": job_description(seed),
+        "pdf": make_pdf(page_texts),
+        "docx": make_docx(page_texts, seed),
+    }
@@ -0,0 +1,24 @@
+"""
+Shared test setup
+
+The app reads its configuration from SKILLLENS_* variables at import
+time, so they are set here, before any test imports it: analysis runs
+inline, and nothing is read from or written to models/ or data/.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+_state = tempfile.mkdtemp(prefix="skilllens-tests-")
+os.environ.update({
+    "SKILLLENS_EXECUTOR": "inline",
+    "SKILLLENS_DOCUMENT_STORE": "",
+    "SKILLLENS_CORPUS_INDEX": "",
+    "SKILLLENS_SKILL_BITMAP": "",
+    "SKILLLENS_TFIDF_MODEL": os.path.join(_state, "tfidf.joblib"),
+})
@@ -0,0 +1,46 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from benchmarks.synthetic import make_docx, resume_pages
+
+# Multi-word skills split across lines, as pasted from a posting
+JOB_DESCRIPTION = """Backend engineer
+Must know Python, machine
+learning and spring
+boot.
+   Docker is a plus.
+"""
+
+
+def test_batch_matches_analyze_for_multiline_job_description():
+    resumes = [
+        (f"resume{seed}.docx", make_docx(resume_pages(1, seed), seed)) for seed in range(3)
+    ]
+
+    with TestClient(app) as client:
+        single = {}
+        for filename, file_bytes in resumes:
+            response = client.post(
+                "/analyze",
+                files={"resume": (filename, file_bytes)},
+                data={"job_description": JOB_DESCRIPTION},
+            )
+            assert response.status_code == 200
+            single[filename] = response.json()["data"]
+
+        response = client.post(
+            "/analyze/batch",
+            files=[("resumes", (filename, file_bytes)) for filename, file_bytes in resumes],
+            data={"job_description": JOB_DESCRIPTION},
+        )
+        assert response.status_code == 200
+        batch = response.json()["data"]
+
+    job_skills = next(iter(single.values()))["job_skills"]
+    assert {"machine learning", "spring boot", "python", "docker"} <= set(job_skills)
+    assert batch["job_skills"] == job_skills
+
+    assert len(batch["results"]) == len(resumes)
+    for result in batch["results"]:
+        assert result["success"]
+        assert result["data"] == single[result["filename"]]
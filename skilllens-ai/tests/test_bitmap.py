@@ -0,0 +1,138 @@
+import hashlib
+import random
+
+import pytest
+
+from app import bitmap
+from app.matcher import calculate_match
+
+# A small vocabulary so that every query matches a fair share of resumes
+SKILLS = ["python", "java", "docker", "kubernetes", "sql", "aws", "react", "git", "linux", "go"]
+
+QUERIES = [
+    "python",
+    "python AND docker",
+    "python OR java",
+    "NOT sql",
+    "python AND NOT java",
+    "(docker OR kubernetes) AND NOT sql",
+    "NOT (aws OR react) OR (git AND linux AND go)",
+]
+
+MATCH_SKILLS = [["python", "docker", "sql", "aws"], ["java", "git", "react"]]
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(bitmap, "BITMAP_PATH", str(tmp_path / "skills.bitmap"))
+    monkeypatch.setattr(bitmap, "_bitmap", None)
+    monkeypatch.setattr(bitmap, "_loaded_mtime", None)
+
+    rng = random.Random(7)
+    hashes = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(300)]
+    latest = {}
+
+    def add(batch_size):
+        rows = [
+            (rng.choice(hashes), "", rng.sample(SKILLS, rng.randint(0, len(SKILLS))))
+            for _ in range(batch_size)
+        ]
+        for sha256, _, skills in rows:
+            latest[sha256] = set(skills)
+        assert bitmap.add_to_bitmap(rows, bitmap.BITMAP_PATH) == len(latest)
+        # File mtimes can be coarser than the time between two adds
+        bitmap._loaded_mtime = None
+        return latest
+
+    return add
+
+
+def _matches(node, skills):
+    kind = node[0]
+    if kind == "skill":
+        return node[1] in skills
+    if kind == "not":
+        return not _matches(node[1], skills)
+    found = [_matches(child, skills) for child in node[1]]
+    return all(found) if kind == "and" else any(found)
+
+
+def _check_query(latest, query):
+    node = bitmap.parse_query(query)
+    expected = {sha256 for sha256, skills in latest.items() if _matches(node, skills)}
+
+    found = bitmap.search_candidates(query, limit=10000)
+
+    assert found["index_size"] == len(latest)
+    assert found["total"] == len(expected), query
+    assert {r["resume_sha256"] for r in found["results"]} == expected, query
+    for result in found["results"]:
+        assert set(result["skills"]) == latest[result["resume_sha256"]]
+
+
+def _check_match(latest, match_skills, min_match, query=None):
+    node = bitmap.parse_query(query) if query else None
+    expected = {}
+    for sha256, skills in latest.items():
+        match = calculate_match(list(skills), match_skills)
+        if match["match_percentage"] >= min_match and (node is None or _matches(node, skills)):
+            expected[sha256] = match
+
+    found = bitmap.search_candidates(query, match_skills, min_match, limit=10000)
+
+    assert found["index_size"] == len(latest)
+    assert found["total"] == len(expected), (match_skills, min_match, query)
+    assert {r["resume_sha256"] for r in found["results"]} == set(expected)
+    percentages = [r["match_percentage"] for r in found["results"]]
+    assert percentages == sorted(percentages, reverse=True)
+    for result in found["results"]:
+        match = expected[result["resume_sha256"]]
+        assert result["match_percentage"] == match["match_percentage"]
+        assert result["matched_skills"] == match["matched_skills"]
+        assert result["missing_skills"] == match["missing_skills"]
+
+
+def test_queries_match_brute_force(index):
+    for batch_size in [1, 5, 40, 3, 120, 60, 200]:
+        latest = index(batch_size)
+        for query in QUERIES:
+            _check_query(latest, query)
+
+
+@pytest.mark.parametrize("min_match", [0, 25, 50, 75, 100])
+def test_min_match_agrees_with_calculate_match(index, min_match):
+    for batch_size in [10, 80, 250]:
+        latest = index(batch_size)
+        for match_skills in MATCH_SKILLS:
+            _check_match(latest, match_skills, min_match)
+            _check_match(latest, match_skills, min_match, "NOT kubernetes OR linux")
+
+
+def test_replaced_resumes_are_searched_with_their_new_skills(index):
+    latest = dict(index(200))
+    sha256 = next(iter(latest))
+
+    rows = [(sha256, "", ["go"])]
+    bitmap.add_to_bitmap(rows, bitmap.BITMAP_PATH)
+    bitmap._loaded_mtime = None
+    latest[sha256] = {"go"}
+
+    found = bitmap.search_candidates("go AND NOT python", limit=10000)
+    assert sha256 in {r["resume_sha256"] for r in found["results"]}
+    assert found["index_size"] == len(latest)
+    for query in QUERIES:
+        _check_query(latest, query)
+    _check_match(latest, ["go", "python"], 50)
+
+
+def test_limit_keeps_the_best_matches(index):
+    latest = index(250)
+    match_skills = MATCH_SKILLS[0]
+
+    everything = bitmap.search_candidates(None, match_skills, 25, limit=10000)
+    first = bitmap.search_candidates(None, match_skills, 25, limit=10)
+
+    assert first["total"] == everything["total"]
+    assert len(first["results"]) == 10
+    assert [r["match_percentage"] for r in first["results"]] == \
+        [r["match_percentage"] for r in everything["results"][:10]]
@@ -0,0 +1,112 @@
+import hashlib
+import random
+
+import pytest
+
+from app import corpus
+from app.matcher import SKILL_WEIGHT, calculate_match
+
+SKILLS = ["python", "java", "docker", "kubernetes", "sql", "aws", "react", "git", "linux", "go"]
+
+JOB_SKILLS = ["python", "docker", "sql", "aws", "git", "react", "linux"]
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(corpus, "CORPUS_PATH", str(tmp_path / "corpus"))
+    monkeypatch.setattr(corpus, "_corpus", None)
+    monkeypatch.setattr(corpus, "_segments", {})
+    monkeypatch.setattr(corpus, "_loaded_mtime", None)
+
+    latest = {}
+
+    def add(rows):
+        for sha256, _, skills in rows:
+            latest[sha256] = set(skills)
+        assert corpus.add_to_corpus(rows, corpus.CORPUS_PATH) == len(latest)
+        # File mtimes can be coarser than the time between two adds
+        corpus._loaded_mtime = None
+        return latest
+
+    return add
+
+
+def _sha256(i: int) -> str:
+    return hashlib.sha256(str(i).encode()).hexdigest()
+
+
+def _segment_rows():
+    return [segment["rows"] for segment in corpus.read_manifest(corpus.CORPUS_PATH)["segments"]]
+
+
+def _check_ranking(latest, job_skills=JOB_SKILLS):
+    # No TF-IDF model is fitted in the tests, so scores are skills only
+    ranked = corpus.rank_corpus("job description", len(latest) + 5, job_skills)
+
+    assert not ranked["text_similarity"]
+    assert ranked["corpus_size"] == len(latest)
+    assert sorted(r["resume_sha256"] for r in ranked["results"]) == sorted(latest)
+
+    overall = [r["overall_score"] for r in ranked["results"]]
+    assert overall == sorted(overall, reverse=True)
+    for result in ranked["results"]:
+        match = calculate_match(list(latest[result["resume_sha256"]]), job_skills)
+        assert result["skill_match_score"] == match["match_percentage"]
+        assert result["overall_score"] == round(match["match_percentage"] * SKILL_WEIGHT, 2)
+        assert result["matched_skills"] == match["matched_skills"]
+        assert result["missing_skills"] == match["missing_skills"]
+
+
+def test_ranking_matches_brute_force_while_segments_merge(index):
+    rng = random.Random(11)
+    segment_counts = []
+    for _ in range(40):
+        rows = [
+            (_sha256(rng.randrange(150)), "", rng.sample(SKILLS, rng.randint(0, len(SKILLS))))
+            for _ in range(rng.randint(1, 8))
+        ]
+        latest = index(rows)
+
+        # Like a binary counter, every segment is larger than the next
+        rows_per_segment = _segment_rows()
+        assert rows_per_segment == sorted(set(rows_per_segment), reverse=True)
+        segment_counts.append(len(rows_per_segment))
+
+        _check_ranking(latest)
+
+    assert max(segment_counts) > 1
+    assert len(segment_counts) > max(segment_counts)
+
+
+def test_readded_resume_replaces_its_row_in_an_older_segment(index):
+    index([(_sha256(i), "", ["java"]) for i in range(8)])
+    latest = index([(_sha256(3), "", ["python", "docker", "sql"])])
+
+    # The new row is a segment of its own, the old one is only masked
+    assert _segment_rows() == [8, 1]
+    ranked = corpus.rank_corpus("job description", 3, ["python", "docker", "sql"])
+    assert ranked["corpus_size"] == 8
+    assert ranked["results"][0]["resume_sha256"] == _sha256(3)
+    assert ranked["results"][0]["skill_match_score"] == 100.0
+    assert [r["resume_sha256"] for r in ranked["results"]].count(_sha256(3)) == 1
+    _check_ranking(latest)
+    _check_ranking(latest, ["java"])
+
+
+def test_merging_drops_replaced_rows(index):
+    index([(_sha256(i), "", ["java"]) for i in range(4)])
+    index([(_sha256(1), "", ["go"])])
+    latest = index([(_sha256(i), "", ["python", "go"]) for i in range(2, 7)])
+
+    # Both newer batches were merged into the first segment
+    assert _segment_rows() == [7]
+    _check_ranking(latest)
+    _check_ranking(latest, ["go"])
+
+
+def test_duplicate_rows_in_one_batch_keep_the_last(index):
+    rows = [(_sha256(0), "", ["java"]), (_sha256(1), "", ["sql"]), (_sha256(0), "", ["python"])]
+    latest = index(rows)
+
+    assert latest[_sha256(0)] == {"python"}
+    _check_ranking(latest, ["python", "java"])
@@ -0,0 +1,38 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.parsers import extract_pdf
+from benchmarks.synthetic import make_pdf, resume_pages
+
+PAGE_COUNT = re.compile(r'^skilllens_pdf_page_duration_seconds_count (\S+)$', re.MULTILINE)
+
+
+def _page_observations(client: TestClient) -> float:
+    match = PAGE_COUNT.search(client.get("/metrics").text)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_extract_pdf_times_every_page():
+    pages = resume_pages(3, seed=1)
+    result = extract_pdf(make_pdf(pages))
+
+    assert result["total_pages"] == result["pages_extracted"] == 3
+    assert not result["truncated"]
+    assert [timing["page"] for timing in result["page_timings"]] == [1, 2, 3]
+    assert all(timing["seconds"] >= 0 for timing in result["page_timings"])
+
+
+def test_page_timings_reach_the_metrics():
+    pdf = make_pdf(resume_pages(4, seed=2))
+
+    with TestClient(app) as client:
+        before = _page_observations(client)
+        response = client.post(
+            "/analyze",
+            files={"resume": ("resume.pdf", pdf, "application/pdf")},
+            data={"job_description": "Python developer with Docker"},
+        )
+        assert response.status_code == 200
+        assert _page_observations(client) == before + 4